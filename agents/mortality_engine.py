@@ -8,6 +8,7 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from memory.db import db
+from memory.query_client import memory
 
 
 class MortalityEngine:
@@ -354,6 +355,7 @@ class MortalityEngine:
                 new_bio,
                 json.dumps(inherited_data['traits'])
             ))
+            memory.invalidate_persona(new_agent_id)
             
             # Initialize new agent systems
             self.initialize_mortality(new_agent_id, units=ancestor_mortality[0]['lifespan_units'])
@@ -7,6 +7,7 @@ import re
 import random
 from typing import Dict, List, Any, Optional, Tuple
 from memory.db import db
+from memory.profile_cache import profile_cache, TRAITS
 from agents.trait_drift import TraitDriftEngine
 
 
@@ -83,10 +84,11 @@ class PersonalityEngine:
         persona_id = persona.get('id')
         if persona_id:
             try:
-                evolving_profile = self.db.query("""
+                # Cached per persona; trait writers invalidate it
+                evolving_profile = profile_cache.get_or_load(TRAITS, persona_id, lambda: self.db.query("""
                     SELECT base_traits, evolving_traits FROM agent_personality_profiles
                     WHERE persona_id = %s
-                """, (persona_id,))
+                """, (persona_id,)))
                 
                 if evolving_profile:
                     base_traits = evolving_profile[0]['base_traits'] or {}
@@ -431,6 +433,7 @@ class PersonalityEngine:
                 SET learned_modifiers = %s, last_updated = CURRENT_TIMESTAMP
                 WHERE persona_id = %s
             """, (json.dumps(learned_mods), persona_id))
+            profile_cache.invalidate(TRAITS, persona_id)
             
         except Exception as e:
             print(f"[-] Failed to update learned modifiers: {e}")
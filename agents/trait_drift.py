@@ -8,6 +8,7 @@ import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from memory.db import db
+from memory.profile_cache import profile_cache, TRAITS
 
 
 class TraitDriftEngine:
@@ -352,6 +353,7 @@ class TraitDriftEngine:
                 SET base_traits = %s, last_updated = CURRENT_TIMESTAMP
                 WHERE persona_id = %s
             """, (json.dumps(updated_traits), persona_id))
+            profile_cache.invalidate(TRAITS, persona_id)
             
             print(f"[+] Updated traits for {persona_id}")
             
@@ -437,6 +439,7 @@ class TraitDriftEngine:
                 SET learned_modifiers = %s, last_updated = CURRENT_TIMESTAMP
                 WHERE persona_id = %s
             """, (json.dumps(updated_modifiers), persona_id))
+            profile_cache.invalidate(TRAITS, persona_id)
             
             print(f"[+] Applied decay to unused modifiers for {persona_id}")
             
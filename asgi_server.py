@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+VALIS 2.0 ASGI Server
+Async serving mode: /api/chat runs end to end on the event loop,
+every other route and blueprint is served by the Flask app mounted underneath
+
+Run with:
+    uvicorn asgi_server:app --host 0.0.0.0 --port 3001 --workers 2
+"""
+
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import server as wsgi_server
+from inference import run_inference_async, stream_inference_async, initialize, shutdown as shutdown_inference
+from memory.query_client import memory
+from core.async_runtime import run_blocking, shutdown_blocking_executor, shutdown_background_loop
+from core.health_monitor import health_monitor
+from core.lazy_init import startup
+from core import telemetry
+from core.deadline import start_deadline, request_budget
+from memory.profile_cache import profile_cache
+from providers.http_client import aclose_http_clients
+
+logger = logging.getLogger("VALIS_ASGI")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bootstrap VALIS once per worker, off the event loop"""
+    logger.info("Starting VALIS 2.0 ASGI worker...")
+    # Worker count as passed to uvicorn (VALIS_WORKERS, or WEB_CONCURRENCY for the uvicorn CLI)
+    profile_cache.check_workers(int(os.getenv('VALIS_WORKERS') or os.getenv('WEB_CONCURRENCY') or '1'))
+    if await run_blocking(initialize):
+        logger.info("VALIS system initialized successfully")
+    else:
+        logger.error("Failed to initialize VALIS system")
+    health_monitor.start()
+    # Lifespan startup runs before uvicorn binds; warm-up waits for the port
+    startup.after_bind(int(os.getenv('VALIS_PORT', '3001')))
+    yield
+    health_monitor.stop()
+    shutdown_inference()
+    await aclose_http_clients()
+    shutdown_blocking_executor()
+    shutdown_background_loop()
+
+
+app = FastAPI(title="VALIS 2.0", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['http://localhost:3001', 'http://127.0.0.1:3001'],
+    allow_origin_regex=r'http://localhost:\d+',
+    allow_methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+    allow_headers=['Content-Type', 'X-Admin-Key', 'Authorization', 'X-Request-Timeout'],
+    allow_credentials=True
+)
+
+
+@app.middleware("http")
+async def add_request_id(request: Request, call_next):
+    """Assign a request ID for log correlation and time natively served routes"""
+    request_id = str(uuid.uuid4())[:8]
+    request.state.request_id = request_id
+    wsgi_server.current_request_id.set(request_id)
+    request_start = time.perf_counter()
+    spans = telemetry.start_request()
+    start_deadline(request_budget(request.headers.get('x-request-timeout')))
+    response = await call_next(request)
+    # Routes served by the mounted Flask app report their own timing
+    if 'server-timing' not in response.headers:
+        duration = time.perf_counter() - request_start
+        response.headers['Server-Timing'] = telemetry.server_timing_header(spans, total=duration)
+        route = request.scope.get('route')
+        endpoint = route.path if route else 'unmatched'
+        telemetry.observe_request(endpoint, request.method, response.status_code, duration)
+    return response
+
+
+def _error(message: str, request_id: str, status_code: int, **extra) -> JSONResponse:
+    body = {'success': False, 'error': message, 'request_id': request_id}
+    body.update(extra)
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post('/api/chat')
+async def chat(request: Request):
+    """Main chat endpoint - async pipeline, same contract as server.chat"""
+    request_start = time.time()
+    request_id = request.state.request_id
+    client_host = request.client.host if request.client else 'unknown'
+
+    try:
+        logger.info(f"Chat request received from {client_host}")
+
+        client_ip = request.headers.get('x-forwarded-for', client_host)
+        decision = wsgi_server.check_rate_limit(client_ip)
+        if not decision['allowed']:
+            return JSONResponse({
+                'success': False,
+                'error': 'Rate limit exceeded',
+                'retry_after': decision['retry_after']
+            }, status_code=429, headers={'Retry-After': str(decision['retry_after'])})
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        # Field checks plus client/persona lookups (blocking DB calls)
+        with telemetry.span('validate'):
+            fields, error = await run_blocking(wsgi_server.validate_chat_request, data, request_id)
+        if error:
+            body, status_code = error
+            return JSONResponse(body, status_code=status_code)
+
+        message = fields['message']
+        client_id = fields['client_id']
+        persona_id = fields['persona_id']
+        persona = fields['persona']
+
+        logger.info(f"Processing chat: {message[:50]}... (client: {client_id[:8]}, persona: {persona['name']})")
+
+        # Run inference on the event loop
+        try:
+            with telemetry.span('inference'):
+                result = await run_inference_async(
+                    prompt=message,
+                    client_id=client_id,
+                    persona_id=persona_id
+                )
+        except Exception as e:
+            logger.error(f"Inference failed for client {client_id}: {e}")
+            return _error('AI processing failed', request_id, 500)
+
+        # Log session turn to database
+        if result.get('success'):
+            try:
+                with telemetry.span('log_turn'):
+                    await run_blocking(
+                        memory.log_session_turn,
+                        client_id=client_id,
+                        persona_id=persona_id,
+                        user_input=message,
+                        assistant_reply=result.get('response', ''),
+                        session_id=f"public_chat_{client_id}",
+                        metadata={
+                            'request_id': request_id,
+                            'provider_used': result.get('provider_used'),
+                            'processing_time': time.time() - request_start
+                        }
+                    )
+            except Exception as e:
+                logger.warning(f"Failed to log session turn: {e}")
+
+        response = {
+            'success': result.get('success', False),
+            'response': result.get('response', ''),
+            'provider_used': result.get('provider_used', 'unknown'),
+            'client_id': client_id,
+            'persona_id': persona_id,
+            'persona_name': persona['name'],
+            'timestamp': result.get('timestamp'),
+            'request_id': request_id,
+            'processing_time': round(time.time() - request_start, 3)
+        }
+
+        if not result.get('success'):
+            response['error'] = result.get('error', 'Unknown error')
+
+        logger.info(f"Chat response: {result.get('success')} in {response['processing_time']}s")
+        return JSONResponse(response)
+
+    except Exception as e:
+        processing_time = time.time() - request_start
+        logger.error(f"Chat endpoint error after {processing_time:.3f}s: {e}")
+        return _error('Internal server error', request_id, 500,
+                      processing_time=round(processing_time, 3))
+
+
+@app.post('/api/chat/stream')
+async def chat_stream(request: Request):
+    """Streaming chat endpoint - relays provider tokens as server-sent events"""
+    request_start = time.time()
+    request_id = request.state.request_id
+    client_host = request.client.host if request.client else 'unknown'
+
+    logger.info(f"Streaming chat request received from {client_host}")
+
+    client_ip = request.headers.get('x-forwarded-for', client_host)
+    decision = wsgi_server.check_rate_limit(client_ip)
+    if not decision['allowed']:
+        return JSONResponse({
+            'success': False,
+            'error': 'Rate limit exceeded',
+            'retry_after': decision['retry_after']
+        }, status_code=429, headers={'Retry-After': str(decision['retry_after'])})
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    try:
+        with telemetry.span('validate'):
+            fields, error = await run_blocking(wsgi_server.validate_chat_request, data, request_id)
+    except Exception as e:
+        logger.error(f"Streaming chat validation error: {e}")
+        return _error('Internal server error', request_id, 500)
+    if error:
+        body, status_code = error
+        return JSONResponse(body, status_code=status_code)
+
+    async def generate():
+        done = None
+        try:
+            async for event in stream_inference_async(
+                prompt=fields['message'],
+                client_id=fields['client_id'],
+                persona_id=fields['persona_id']
+            ):
+                if event['event'] == 'token':
+                    yield wsgi_server.format_sse('token', {'content': event['content']})
+                else:
+                    done = event
+        except Exception as e:
+            logger.error(f"Streaming inference failed for client {fields['client_id']}: {e}")
+            done = {'success': False, 'error': 'AI processing failed'}
+
+        payload = await run_blocking(
+            wsgi_server.finalize_stream_turn, fields, done or {}, request_id, request_start
+        )
+        logger.info(f"Chat stream complete: {payload['success']} in {payload['processing_time']}s")
+        yield wsgi_server.format_sse('done', payload)
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=wsgi_server.SSE_HEADERS)
+
+
+# Everything else (health, session/admin blueprints, frontend) is served by the Flask app
+app.mount('/', WSGIMiddleware(wsgi_server.app))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info("Starting VALIS 2.0 ASGI Chat Server...")
+    # Inherited by the worker processes, whose lifespan reads it
+    os.environ.setdefault('VALIS_WORKERS', '2')
+    uvicorn.run(
+        'asgi_server:app',
+        host='0.0.0.0',
+        port=int(os.getenv('VALIS_PORT', '3001')),
+        workers=int(os.environ['VALIS_WORKERS'])
+    )
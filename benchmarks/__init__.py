@@ -0,0 +1 @@
+"""VALIS 2.0 benchmarks (run as python -m benchmarks.<name>)"""
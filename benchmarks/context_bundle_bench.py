@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Memory layer loading benchmark: per-layer getters vs load_context_bundle
+
+Loads the four memory layers of a turn (persona, canon, working memory,
+client) the way MCPRuntime used to - one getter and one database round
+trip per layer - and with MemoryQueryClient.load_context_bundle, and
+reports database round trips and latency per turn for both. Runs with
+the profile cache disabled (cold) and enabled (warm: profiles cached, as
+after server.chat has looked them up).
+
+By default the database is simulated: every round trip sleeps --rtt-ms,
+which is the cost the bundle saves. Against a real PostgreSQL (DB_* env
+vars as for the server) pass --db with ids that exist:
+
+    python -m benchmarks.context_bundle_bench [--rtt-ms 1.5] [--turns 200]
+    python -m benchmarks.context_bundle_bench --db --persona-id <uuid> --client-id <uuid>
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.load_bench import summarise
+from core.model_caps import get_context_limits
+
+LIMITS = get_context_limits("balanced")
+
+
+class CountingDatabase:
+    """Wraps the database client and counts query() round trips"""
+
+    def __init__(self, database):
+        self.database = database
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def query(self, sql: str, params=None):
+        with self._lock:
+            self.round_trips += 1
+        return self.database.query(sql, params)
+
+    def __getattr__(self, name: str):
+        return getattr(self.database, name)
+
+
+class SimulatedDatabase:
+    """Answers the memory queries with synthetic rows after rtt seconds"""
+
+    def __init__(self, rtt: float, persona_id: str, client_id: str):
+        self.rtt = rtt
+        self.persona = {"id": persona_id, "name": "Jane", "role": "HR Business Partner",
+                        "bio": "Experienced HR professional", "system_prompt": None,
+                        "traits": {"warm": True}, "default_context_mode": "balanced", "created_at": None}
+        self.client = {"id": client_id, "name": "Sam", "traits": {"goal": "promotion", "style": "direct"}}
+        self.canon = [{"content": f"Canon memory {i}", "tags": [], "category": "core",
+                       "relevance_score": 1.0 - i / 100, "token_estimate": 12} for i in range(20)]
+        self.working = [{"content": f"Working memory {i}", "importance": 5, "decay_score": 1.0 - i / 100,
+                         "token_estimate": 8, "created_at": None} for i in range(20)]
+
+    def query(self, sql: str, params=None) -> List[Dict[str, Any]]:
+        time.sleep(self.rtt)
+        if "AS canon_memory" in sql:
+            row = {"canon_memory": self.canon[:params["canon_limit"]],
+                   "working_memory": self.working[:params["working_limit"]]}
+            if "AS persona" in sql:
+                row["persona"] = self.persona
+            if "AS client" in sql:
+                row["client"] = self.client
+            return [row]
+        if "FROM persona_profiles" in sql:
+            return [self.persona]
+        if "FROM client_profiles" in sql:
+            return [self.client]
+        if "FROM canon_memories" in sql:
+            return self.canon[:params[-1]]
+        if "FROM working_memory" in sql:
+            return self.working[:params[-1]]
+        raise ValueError(f"Unexpected query: {sql[:60]}")
+
+
+def per_layer(memory, persona_id: str, client_id: str):
+    """The layers as MCPRuntime loaded them before load_context_bundle"""
+    memory.get_persona(persona_id)
+    memory.get_top_canon(persona_id, LIMITS["canon_memory"])
+    memory.get_recent_working(persona_id, client_id, LIMITS["working_memory"])
+    memory.get_client(client_id)
+
+
+def bundled(memory, persona_id: str, client_id: str):
+    memory.load_context_bundle(persona_id, client_id, LIMITS)
+
+
+def measure(loader: Callable, memory, counter: CountingDatabase, persona_id: str, client_id: str,
+            turns: int) -> Dict[str, Any]:
+    loader(memory, persona_id, client_id)   # warm the profile cache when enabled
+    counter.round_trips = 0
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        loader(memory, persona_id, client_id)
+        samples.append(time.perf_counter() - start)
+    return {"round_trips_per_turn": round(counter.round_trips / turns, 2), "latency_ms": summarise(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", action="store_true", help="Use the configured PostgreSQL instead of a simulation")
+    parser.add_argument("--persona-id", default=str(uuid.uuid4()))
+    parser.add_argument("--client-id", default=str(uuid.uuid4()))
+    parser.add_argument("--rtt-ms", type=float, default=1.5, help="Simulated round-trip time")
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    import memory.query_client as query_client
+    from memory.profile_cache import profile_cache
+
+    if args.db:
+        database = query_client.db
+    else:
+        database = SimulatedDatabase(args.rtt_ms / 1000, args.persona_id, args.client_id)
+    counter = CountingDatabase(database)
+    query_client.db = counter
+    memory = query_client.memory
+
+    results = {}
+    for cache in ("cold", "warm"):
+        profile_cache.enabled = cache == "warm"
+        results[cache] = {}
+        for name, loader in (("per_layer", per_layer), ("bundle", bundled)):
+            profile_cache.clear()
+            results[cache][name] = measure(loader, memory, counter, args.persona_id, args.client_id, args.turns)
+
+    print(json.dumps({
+        "database": "postgresql" if args.db else f"simulated ({args.rtt_ms}ms round trip)",
+        "turns": args.turns,
+        "limits": {"canon_memory": LIMITS["canon_memory"], "working_memory": LIMITS["working_memory"]},
+        "results": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Intent detection microbenchmark
+
+Compares the compiled single-pass engines in core/intent_engine.py with
+the original per-pattern loops (re.search per pattern string, keyword
+scans) on a mixed corpus, after checking both agree on every prompt.
+
+    python -m benchmarks.intent_bench [--iterations 2000]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.intent_engine import (COMMAND_INTENTS, PLANNING_TRIGGERS, MULTI_ACTION_INDICATORS,
+                                COMPLEX_WORD_SETS, command_intent_engine, planning_engine)
+
+CORPUS = [
+    "Hi, how are you today?",
+    "Can you help me write a cover letter for a marketing role?",
+    "I had a rough week at work and could use some advice.",
+    "What's the difference between a Roth IRA and a traditional IRA?",
+    "Please give me some feedback on my presentation outline.",
+    "Tell me about the onboarding process",
+    "What do you remember about my goals?",
+    "list files in the projects folder",
+    "show me the contents of notes.txt",
+    "find files named report",
+    "show running processes",
+    "Create a plan to learn Spanish in three months",
+    "First check my calendar, and then draft an email",
+    "search the logs and analyze the errors",
+    "Walk me through it step by step",
+    "I'm feeling anxious about my performance review next week, any tips?",
+]
+
+
+def legacy_command_intent(prompt: str):
+    """MCPExecutionProvider.detect_command_intent matching, as originally written"""
+    prompt_lower = prompt.lower().strip()
+    for intent, config in COMMAND_INTENTS.items():
+        for pattern in config["patterns"]:
+            if re.search(pattern, prompt_lower):
+                return intent
+    return None
+
+
+def legacy_should_plan(prompt: str) -> bool:
+    """AutonomousAgentProvider.should_use_autonomous_mode, as originally written"""
+    prompt_lower = prompt.lower()
+    if any(trigger in prompt_lower for trigger in PLANNING_TRIGGERS):
+        return True
+    if any(indicator in prompt_lower for indicator in MULTI_ACTION_INDICATORS):
+        return True
+    for pattern in COMPLEX_WORD_SETS:
+        if all(word in prompt_lower for word in pattern):
+            return True
+    return False
+
+
+def timed(fn, iterations: int) -> float:
+    """Mean microseconds per prompt over the corpus"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for prompt in CORPUS:
+            fn(prompt)
+    return (time.perf_counter() - start) / (iterations * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    commands = command_intent_engine()
+    planning = planning_engine()
+
+    def compiled_command(prompt):
+        return commands.match(prompt.strip())
+
+    def compiled_plan(prompt):
+        return planning.match(prompt) is not None
+
+    mismatches = [p for p in CORPUS if legacy_command_intent(p) != compiled_command(p)
+                  or legacy_should_plan(p) != compiled_plan(p)]
+    if mismatches:
+        print(f"Engines disagree on: {mismatches}")
+        sys.exit(1)
+
+    results = {}
+    for name, legacy, compiled in (("command_intent", legacy_command_intent, compiled_command),
+                                   ("planning", legacy_should_plan, compiled_plan)):
+        legacy_us = timed(legacy, args.iterations)
+        compiled_us = timed(compiled, args.iterations)
+        results[name] = {
+            "legacy_us": round(legacy_us, 2),
+            "compiled_us": round(compiled_us, 2),
+            "speedup": round(legacy_us / compiled_us, 2)
+        }
+
+    print(json.dumps({"prompts": len(CORPUS), "iterations": args.iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
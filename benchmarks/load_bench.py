@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the chat path
+
+Drives either the HTTP endpoint (/api/chat on a running server) or
+run_inference() in-process at a fixed concurrency, and reports throughput
+plus p50/p95/p99 latency per stage. Stages come from the request spans:
+the Server-Timing header over HTTP, telemetry.get_request_spans()
+in-process (validate, inference, provider.*, persona, memory_layers,
+db.*, ...), alongside the client-observed total.
+
+Results are written as JSON (one file per run, tagged with the git
+commit) so runs can be diffed between commits:
+
+    # Stub llama.cpp on :8080, then load run_inference in-process
+    python -m benchmarks.load_bench run --target inference --stub --concurrency 8 --requests 400
+
+    # Against a running server
+    python -m benchmarks.load_bench run --target http --url http://localhost:3001 \\
+        --client-id <uuid> --persona-id <uuid>
+
+    python -m benchmarks.load_bench compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.stub_llama_server import add_behaviour_arguments, behaviour_from_args, start_stub_server
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+DEFAULT_MESSAGES = [
+    "Hi, how are you today?",
+    "Can you help me prepare for a job interview?",
+    "What should I focus on this week?",
+    "Give me three tips for better sleep.",
+]
+
+SERVER_TIMING_ENTRY = re.compile(r'\s*([^;,\s]+)\s*;\s*dur=([\d.]+)')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+    }
+
+
+def collapse_spans(spans: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Sum repeated spans within one request (e.g. several db.query calls)"""
+    totals = defaultdict(float)
+    for name, duration in spans:
+        totals[name] += duration
+    return dict(totals)
+
+
+def http_caller(args) -> Callable[[int], Tuple[bool, Dict[str, float]]]:
+    """One /api/chat request per call; stages parsed from Server-Timing (ms)"""
+    import requests
+
+    session = requests.Session()
+    url = args.url.rstrip("/") + "/api/chat"
+
+    def call(i: int):
+        body = {
+            "message": args.messages[i % len(args.messages)],
+            "client_id": args.client_id,
+            "persona_id": args.persona_id
+        }
+        response = session.post(url, json=body, timeout=args.timeout)
+        stages = {name: float(dur) / 1000
+                  for name, dur in SERVER_TIMING_ENTRY.findall(response.headers.get("Server-Timing", ""))}
+        ok = response.status_code == 200 and response.json().get("success", False)
+        return ok, stages
+
+    return call
+
+
+def inference_caller(args) -> Callable[[int], Tuple[bool, Dict[str, float]]]:
+    """One in-process run_inference() per call; stages from telemetry spans"""
+    import inference
+    from core import telemetry
+
+    if not inference.initialize():
+        raise SystemExit("VALIS failed to initialise (database and providers must be reachable)")
+
+    def call(i: int):
+        spans = telemetry.start_request()
+        result = inference.run_inference(args.messages[i % len(args.messages)],
+                                         args.client_id, args.persona_id)
+        return bool(result.get("success")), collapse_spans(spans)
+
+    return call
+
+
+def run_load(call: Callable[[int], Tuple[bool, Dict[str, float]]], concurrency: int,
+             total_requests: int, warmup: int = 0) -> Dict[str, Any]:
+    """Issue total_requests calls from `concurrency` workers; returns throughput and per-stage stats"""
+    for i in range(warmup):
+        call(i)
+
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+    stage_samples: Dict[str, List[float]] = defaultdict(list)
+    outcome = {"ok": 0, "failed": 0, "errors": 0}
+    error_messages: Dict[str, int] = defaultdict(int)
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok, stages = call(i)
+            except Exception as e:
+                with lock:
+                    outcome["errors"] += 1
+                    error_messages[type(e).__name__ + ": " + str(e)[:120]] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                outcome["ok" if ok else "failed"] += 1
+                stage_samples["client_total"].append(elapsed)
+                for name, duration in stages.items():
+                    stage_samples[name].append(duration)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, name=f"load-{n}") for n in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    completed = outcome["ok"] + outcome["failed"]
+    return {
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(completed / wall, 2) if wall else 0.0,
+        **outcome,
+        "error_messages": dict(error_messages),
+        "stages": {name: summarise(samples) for name, samples in sorted(stage_samples.items())}
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def command_run(args):
+    if args.stub:
+        stub = start_stub_server(args.stub_port, **behaviour_from_args(args))
+    call = http_caller(args) if args.target == "http" else inference_caller(args)
+
+    results = run_load(call, args.concurrency, args.requests, args.warmup)
+    report = {
+        "name": args.name,
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": args.target,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "stub": behaviour_from_args(args) if args.stub else None,
+        **results
+    }
+    if args.stub:
+        report["stub_stats"] = stub.RequestHandlerClass.behaviour.stats
+        stub.shutdown()
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{args.name}-{args.target}-{report['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print(json.dumps({k: report[k] for k in ("commit", "throughput_rps", "ok", "failed", "errors")}))
+    for name, stats in report["stages"].items():
+        print(f"  {name:<24} n={stats['count']:<6} p50={stats['p50_ms']:>9.1f}ms  "
+              f"p95={stats['p95_ms']:>9.1f}ms  p99={stats['p99_ms']:>9.1f}ms")
+    print(f"Results written to {output}")
+
+
+def command_compare(args):
+    """Per-stage p50/p95/p99 and throughput deltas between two result files"""
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    print(f"{base.get('commit')} -> {head.get('commit')}")
+    print(f"  throughput_rps {base['throughput_rps']:>10.2f} -> {head['throughput_rps']:>10.2f}"
+          f"  ({_change(base['throughput_rps'], head['throughput_rps'])})")
+    for name in sorted(set(base["stages"]) | set(head["stages"])):
+        before, after = base["stages"].get(name), head["stages"].get(name)
+        if not before or not after:
+            print(f"  {name:<24} only in {'head' if after else 'base'}")
+            continue
+        cells = [f"{key[:-3]} {before[key]:.1f}->{after[key]:.1f}ms ({_change(before[key], after[key])})"
+                 for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"  {name:<24} " + "  ".join(cells))
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run a load test and store the results as JSON")
+    run.add_argument("--target", choices=("http", "inference"), default="inference")
+    run.add_argument("--url", default="http://localhost:3001")
+    run.add_argument("--client-id", default=os.getenv("VALIS_BENCH_CLIENT_ID", "default"))
+    run.add_argument("--persona-id", default=os.getenv("VALIS_BENCH_PERSONA_ID", "kai"))
+    run.add_argument("--message", dest="messages", action="append",
+                     help="message to send (repeatable; defaults to a small built-in set)")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--requests", type=int, default=200)
+    run.add_argument("--warmup", type=int, default=5)
+    run.add_argument("--timeout", type=float, default=60.0)
+    run.add_argument("--name", default="chat")
+    run.add_argument("--output", help="result file (default benchmarks/results/<name>-<target>-<commit>-<time>.json)")
+    run.add_argument("--stub", action="store_true", help="serve a stub llama.cpp /completion in-process")
+    run.add_argument("--stub-port", type=int, default=8080)
+    add_behaviour_arguments(run)
+
+    compare = commands.add_parser("compare", help="diff two result files")
+    compare.add_argument("base")
+    compare.add_argument("head")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        args.messages = args.messages or DEFAULT_MESSAGES
+        command_run(args)
+    else:
+        command_compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Stub llama.cpp completion server
+
+Speaks the subset of the llama.cpp server protocol LocalMistralProvider
+and the context packer use, so the chat path can be load-tested without a model:
+
+    POST /completion   {"prompt", "n_predict", "stream", "cache_prompt", "id_slot", ...}
+                       -> {"content", "stop", "tokens_cached", "tokens_evaluated", "timings"}
+                       or, with "stream": true, SSE "data: {...}" chunks ending in "stop": true
+                       or, with a list of prompts, a list of results (with "index")
+    POST /tokenize     {"content"} -> {"tokens": [...]} (4 chars/token)
+    GET  /health       -> {"status": "ok"}
+
+Latency is time-to-first-token drawn from a configurable distribution plus
+generation time at a configurable token rate. Errors (HTTP 500) and hangs
+(no response until the client times out) can be injected at given rates.
+Per-slot prompt caching is simulated: the tokens shared with the previous
+prompt on the same slot are reported as cached and cost no prompt time.
+A batch of prompts is decoded together, costing one generation time plus
+batch_overhead of it per additional prompt. With parallel > 0 at most
+that many requests (single or batch) are processed at once and the rest
+queue, like a llama.cpp server started with -np.
+
+    python -m benchmarks.stub_llama_server --port 8080 --latency lognormal:400:0.5 --tokens-per-second 40
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("StubLlamaServer")
+
+WORDS = ("the quick brown fox jumps over a lazy dog while thinking about memory "
+         "persona context and helpful answers to every question").split()
+
+
+def parse_latency(spec: str):
+    """
+    Time-to-first-token sampler from "fixed:MS", "uniform:LO:HI",
+    "exponential:MEAN" or "lognormal:MEDIAN:SIGMA" (milliseconds)
+    """
+    kind, *values = spec.split(":")
+    values = [float(v) for v in values]
+    samplers = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "exponential": lambda rng: rng.expovariate(1 / values[0]),
+        "lognormal": lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'")
+    return samplers[kind]
+
+
+class StubBehaviour:
+    """Shared, thread-safe knobs and state for the stub"""
+
+    def __init__(self, latency: str = "fixed:50", tokens_per_second: float = 50.0,
+                 n_tokens: int = 48, prompt_tokens_per_second: float = 2000.0,
+                 error_rate: float = 0.0, hang_rate: float = 0.0, batch_overhead: float = 0.1,
+                 parallel: int = 0, seed: int = None):
+        self.sample_latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.n_tokens = n_tokens
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.batch_overhead = batch_overhead
+        self.parallel = parallel
+        self.slots = threading.BoundedSemaphore(parallel) if parallel > 0 else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slot_prompts: Dict[int, str] = {}
+        self.stats = {"requests": 0, "errors": 0, "hangs": 0, "streams": 0, "batches": 0, "batched_prompts": 0}
+
+    def roll(self) -> Dict[str, Any]:
+        """Decide one request's fate: (error, hang, ttft seconds)"""
+        with self._lock:
+            self.stats["requests"] += 1
+            r = self._rng.random()
+            error = r < self.error_rate
+            hang = not error and r < self.error_rate + self.hang_rate
+            ttft = max(self.sample_latency(self._rng), 0.0) / 1000
+            if error:
+                self.stats["errors"] += 1
+            if hang:
+                self.stats["hangs"] += 1
+        return {"error": error, "hang": hang, "ttft": ttft}
+
+    def prompt_cache(self, prompt: str, slot: Optional[int], cache_prompt: bool) -> Dict[str, int]:
+        """Simulated KV reuse: common prefix with the slot's previous prompt (4 chars/token)"""
+        total = max(len(prompt) // 4, 1)
+        slot = 0 if slot is None or slot < 0 else slot
+        with self._lock:
+            previous = self._slot_prompts.get(slot, "")
+            self._slot_prompts[slot] = prompt
+        if not cache_prompt:
+            return {"prompt_n": total, "cache_n": 0}
+        shared = 0
+        for a, b in zip(previous, prompt):
+            if a != b:
+                break
+            shared += 1
+        cached = min(shared // 4, total - 1)
+        return {"prompt_n": total - cached, "cache_n": cached}
+
+    def completion_text(self) -> list:
+        return [WORDS[i % len(WORDS)] + " " for i in range(self.n_tokens)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    behaviour: StubBehaviour = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/completion", "/tokenize"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/tokenize":
+            # Same 4 chars/token as the prompt timings
+            self._send_json(200, {"tokens": list(range(max(len(payload.get("content", "")) // 4, 1)))})
+            return
+
+        fate = self.behaviour.roll()
+        if fate["hang"]:
+            time.sleep(3600)
+            return
+        if fate["error"]:
+            self._send_json(500, {"error": "injected failure"})
+            return
+
+        if self.behaviour.slots is None:
+            self._complete(payload, fate)
+        else:
+            with self.behaviour.slots:
+                self._complete(payload, fate)
+
+    def _complete(self, payload: Dict[str, Any], fate: Dict[str, Any]):
+        tokens = self.behaviour.completion_text()[:payload.get("n_predict", self.behaviour.n_tokens)]
+        if isinstance(payload.get("prompt"), list):
+            self._batch(payload, tokens, fate["ttft"])
+            return
+
+        prompt_timing = self.behaviour.prompt_cache(
+            payload.get("prompt", ""), payload.get("id_slot"), payload.get("cache_prompt", False)
+        )
+        # Only uncached prompt tokens cost prompt-processing time
+        time.sleep(fate["ttft"] + prompt_timing["prompt_n"] / self.behaviour.prompt_tokens_per_second)
+
+        final = self._final(prompt_timing, tokens)
+        if payload.get("stream"):
+            self._stream(tokens, final)
+        else:
+            time.sleep(len(tokens) / self.behaviour.tokens_per_second)
+            self._send_json(200, {"content": "".join(tokens).strip(), **final})
+
+    def _batch(self, payload: Dict[str, Any], tokens: list, ttft: float):
+        """Several prompts decoded together (one slot each), one result per prompt"""
+        prompts = payload["prompt"]
+        with self.behaviour._lock:
+            self.behaviour.stats["batches"] += 1
+            self.behaviour.stats["batched_prompts"] += len(prompts)
+        timings = [self.behaviour.prompt_cache(prompt, slot, payload.get("cache_prompt", False))
+                   for slot, prompt in enumerate(prompts)]
+        prompt_n = sum(t["prompt_n"] for t in timings)
+        generation = len(tokens) / self.behaviour.tokens_per_second
+        time.sleep(ttft + prompt_n / self.behaviour.prompt_tokens_per_second
+                   + generation * (1 + self.behaviour.batch_overhead * (len(prompts) - 1)))
+        content = "".join(tokens).strip()
+        self._send_json(200, [{"index": i, "content": content, **self._final(t, tokens)}
+                              for i, t in enumerate(timings)])
+
+    @staticmethod
+    def _final(prompt_timing: Dict[str, int], tokens: list) -> Dict[str, Any]:
+        return {
+            "stop": True,
+            "tokens_cached": prompt_timing["cache_n"],
+            "tokens_evaluated": prompt_timing["cache_n"] + prompt_timing["prompt_n"],
+            "timings": {**prompt_timing, "predicted_n": len(tokens)}
+        }
+
+    def _stream(self, tokens: list, final: Dict[str, Any]):
+        with self.behaviour._lock:
+            self.behaviour.stats["streams"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delay = 1 / self.behaviour.tokens_per_second
+        for token in tokens:
+            self._chunk(f"data: {json.dumps({'content': token, 'stop': False})}\n\n")
+            time.sleep(delay)
+        self._chunk(f"data: {json.dumps({'content': '', **final})}\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text: str):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections (or timing out on a hang) are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub_server(port: int = 8080, host: str = "127.0.0.1", **behaviour) -> StubServer:
+    """Serve the stub on a daemon thread (used by benchmarks.load_bench --stub)"""
+    handler = type("BoundStubHandler", (StubHandler,), {"behaviour": StubBehaviour(**behaviour)})
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="stub-llama", daemon=True).start()
+    logger.info(f"Stub llama.cpp server on http://{host}:{port}")
+    return server
+
+
+def add_behaviour_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", default="fixed:50",
+                        help="time to first token: fixed:MS | uniform:LO:HI | exponential:MEAN | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--n-tokens", type=int, default=48)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--batch-overhead", type=float, default=0.1,
+                        help="extra generation time per additional prompt in a batch (fraction)")
+    parser.add_argument("--parallel", type=int, default=0,
+                        help="requests processed at once, the rest queue (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def behaviour_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency": args.latency,
+        "tokens_per_second": args.tokens_per_second,
+        "n_tokens": args.n_tokens,
+        "prompt_tokens_per_second": args.prompt_tokens_per_second,
+        "error_rate": args.error_rate,
+        "hang_rate": args.hang_rate,
+        "batch_overhead": args.batch_overhead,
+        "parallel": args.parallel,
+        "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_behaviour_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = start_stub_server(args.port, args.host, **behaviour_from_args(args))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import uuid
 from typing import Dict, Any, Optional
 from datetime import datetime, timezone
 
+from core.rate_limiter import RateLimiter
+
 class VALISWatermarkEngine:
     """
     Embeds cryptographic signatures and symbolic traces in VALIS outputs
@@ -205,7 +207,7 @@ class VALISProtectionLayer:
     
     def __init__(self):
         self.watermark_engine = VALISWatermarkEngine()
-        self.rate_limits = {}  # token -> rate limit data
+        self.rate_limiter = RateLimiter(100, 3600, name="api_token")  # 100 requests per hour per token
         self.blacklisted_tokens = set()
         
     def authenticate_request(self, token: str) -> Dict[str, Any]:
@@ -229,31 +231,15 @@ class VALISProtectionLayer:
     
     def check_rate_limit(self, token: str, operation: str) -> Dict[str, Any]:
         """Check if request exceeds rate limits"""
-        current_time = time.time()
-        
-        if token not in self.rate_limits:
-            self.rate_limits[token] = {"requests": [], "last_reset": current_time}
-        
-        rate_data = self.rate_limits[token]
+        decision = self.rate_limiter.check(token)
         
-        # Remove requests older than 1 hour
-        rate_data["requests"] = [
-            req_time for req_time in rate_data["requests"]
-            if current_time - req_time < 3600
-        ]
-        
-        # Check limits (100 requests per hour by default)
-        max_requests = 100
-        if len(rate_data["requests"]) >= max_requests:
+        if not decision["allowed"]:
             return {
                 "allowed": False,
-                "reason": f"Rate limit exceeded: {max_requests} requests per hour",
-                "reset_time": min(rate_data["requests"]) + 3600
+                "reason": f"Rate limit exceeded: {self.rate_limiter.limit} requests per hour",
+                "reset_time": decision["reset_time"]
             }
         
-        # Add current request
-        rate_data["requests"].append(current_time)
-        
         return {"allowed": True}
     
     def filter_output(self, content: str, agent_id: str, 
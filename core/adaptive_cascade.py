@@ -0,0 +1,134 @@
+"""
+VALIS 2.0 Adaptive Cascade Ordering
+Reorders the provider cascade per request intent from live outcomes
+
+Every provider attempt is recorded against the request's intent (chat,
+plan, or an execution intent such as list_files) as success, declined or
+failed, with its latency. Once a provider has enough samples for an
+intent:
+    - it is skipped when it almost always falls through (declines or
+      fails), except for a small exploration share that keeps its
+      statistics fresh (an exploring request keeps the configured order,
+      so the provider is actually tried rather than ranked last)
+    - the remaining providers are ordered by expected cost to an answer,
+      mean attempt latency / success rate (cheapest first)
+Providers listed in "pinned_last" keep their configured place at the end
+of the cascade, and "never_skip" providers are always tried.
+
+Configured by "adaptive_cascade" in config/providers.json.
+"""
+
+import contextvars
+import random
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.hedging import LatencyTracker
+
+DEFAULT_ADAPTIVE_CONFIG = {
+    "enabled": False,
+    "window": 200,                  # outcomes kept per provider and intent
+    "min_samples": 30,              # before a provider may be reordered or skipped
+    "skip_fallthrough_rate": 0.95,  # skip providers that fall through at least this often
+    "explore_rate": 0.05,           # share of requests that still try a skipped provider
+    "pinned_last": [],              # fallbacks kept at the end in configured order
+    "never_skip": []
+}
+
+SUCCESS = "success"
+DECLINED = "declined"
+FAILED = "failed"
+
+# Intent of the request being routed, read when attempts are recorded
+current_intent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("valis_intent", default=None)
+
+
+class AdaptiveCascade:
+    """Rolling per-provider, per-intent outcome stats and the ordering derived from them"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**DEFAULT_ADAPTIVE_CONFIG, **(config or {})}
+        self._outcomes = defaultdict(lambda: deque(maxlen=self.config["window"]))  # (provider, intent) -> (outcome, latency)
+        self._latency: Dict[str, LatencyTracker] = defaultdict(lambda: LatencyTracker(self.config["window"]))
+        self._lock = threading.Lock()
+        self.stats = {"reordered": 0, "skipped": 0, "explored": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config["enabled"])
+
+    def record(self, provider_name: str, intent: str, outcome: str, latency: float):
+        with self._lock:
+            self._outcomes[(provider_name, intent)].append((outcome, latency))
+        if outcome == SUCCESS:
+            self._latency[intent].record(provider_name, latency)
+
+    def summary(self, provider_name: str, intent: str) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = list(self._outcomes.get((provider_name, intent), ()))
+        samples = len(outcomes)
+        if not samples:
+            return {"samples": 0}
+        successes = sum(1 for outcome, _ in outcomes if outcome == SUCCESS)
+        declined = sum(1 for outcome, _ in outcomes if outcome == DECLINED)
+        tracker = self._latency.get(intent)
+        return {
+            "samples": samples,
+            "success_rate": round(successes / samples, 3),
+            "decline_rate": round(declined / samples, 3),
+            "fallthrough_rate": round((samples - successes) / samples, 3),
+            "attempt_latency": round(sum(latency for _, latency in outcomes) / samples, 4),
+            "p50": tracker.percentile(provider_name, 50) if tracker else None,
+            "p95": tracker.percentile(provider_name, 95) if tracker else None
+        }
+
+    def order(self, cascade: List[str], intent: str) -> Tuple[List[str], List[str]]:
+        """(providers to try in order, providers skipped) for one request"""
+        pinned = [name for name in cascade if name in self.config["pinned_last"]]
+        movable = [name for name in cascade if name not in pinned]
+        summaries = {name: self.summary(name, intent) for name in movable}
+        ready = {name for name, s in summaries.items() if s["samples"] >= self.config["min_samples"]}
+
+        skipped, exploring = [], False
+        for name in movable:
+            if (name in ready and name not in self.config["never_skip"]
+                    and summaries[name]["fallthrough_rate"] >= self.config["skip_fallthrough_rate"]):
+                if random.random() < self.config["explore_rate"]:
+                    self._count("explored")
+                    exploring = True
+                    continue
+                skipped.append(name)
+        kept = [name for name in movable if name not in skipped]
+
+        # Reorder only when every remaining provider has a track record
+        if kept and not exploring and all(name in ready for name in kept):
+            by_cost = sorted(kept, key=lambda name: self._expected_cost(summaries[name]))
+            if by_cost != kept:
+                self._count("reordered")
+            kept = by_cost
+
+        ordered = kept + pinned
+        if not ordered:
+            # Never skip everything - fall back to the configured order
+            return list(cascade), []
+        if skipped:
+            self._count("skipped", len(skipped))
+        return ordered, skipped
+
+    def _expected_cost(self, summary: Dict[str, Any]) -> float:
+        """Mean attempt latency per success: the cheapest way to an answer goes first"""
+        return summary["attempt_latency"] / max(summary["success_rate"], 0.001)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._outcomes)
+            stats = dict(self.stats)
+        by_intent: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for provider_name, intent in keys:
+            by_intent[intent][provider_name] = self.summary(provider_name, intent)
+        return {"enabled": self.enabled, **stats, "intents": dict(by_intent), "config": self.config}
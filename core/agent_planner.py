@@ -15,6 +15,9 @@ import os
 from pathlib import Path
 
 from core.tool_manager import tool_manager
+from core.async_runtime import run_blocking
+from core.lazy_init import lazy
+from core.deadline import exceeded, has_budget, within_deadline
 from memory.query_client import memory
 from memory.db import db
 from core.synthetic_cognition_manager import SyntheticCognitionManager
@@ -168,7 +171,7 @@ class AgentPlanner:
         
         # Get persona for strategy
         try:
-            persona = memory.get_persona(persona_id)
+            persona = await run_blocking(memory.get_persona, persona_id)
             if not persona:
                 raise ValueError(f"Persona {persona_id} not found")
         except Exception as e:
@@ -396,7 +399,7 @@ class AgentPlanner:
     async def _persist_plan(self, plan: AgentPlan):
         """Save plan to database for monitoring"""
         try:
-            db.execute("""
+            await run_blocking(db.execute, """
                 INSERT INTO agent_plans 
                 (plan_id, client_id, persona_id, goal, status, plan_data, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
@@ -444,6 +447,12 @@ class AgentPlanner:
                     # No more steps to execute
                     break
                 
+                # Remaining steps are skipped once the request is out of time
+                if not has_budget():
+                    exceeded("plan_step")
+                    logger.warning(f"Plan {plan_id} stopped before {len(pending_steps)} pending steps: deadline exceeded")
+                    break
+                
                 # Execute next pending step
                 for step in pending_steps:
                     result = await self._execute_step(step, plan)
@@ -531,14 +540,16 @@ class AgentPlanner:
         
         try:
             if step.step_type == PlanStepType.TOOL_CALL:
-                # Execute tool via ToolManager
-                result = tool_manager.execute_tool(
+                # Execute tool via ToolManager (off the loop so other plans keep running),
+                # no longer than the request deadline allows
+                result = await within_deadline(run_blocking(
+                    tool_manager.execute_tool,
                     tool_name=step.tool_name,
                     parameters=step.parameters,
                     client_id=plan.client_id,
                     persona_id=plan.persona_id,
                     request_id=f"plan_{plan.plan_id}_{step.step_id}"
-                )
+                ), f"tool.{step.tool_name}")
                 
                 if result['success']:
                     step.status = PlanStepStatus.COMPLETED
@@ -551,12 +562,13 @@ class AgentPlanner:
                 
             elif step.step_type == PlanStepType.QUERY_MEMORY:
                 # Execute memory query
-                result = tool_manager.execute_tool(
+                result = await within_deadline(run_blocking(
+                    tool_manager.execute_tool,
                     tool_name="query_memory",
                     parameters=step.parameters,
                     client_id=plan.client_id,
                     persona_id=plan.persona_id
-                )
+                ), "tool.query_memory")
                 
                 step.status = PlanStepStatus.COMPLETED if result['success'] else PlanStepStatus.FAILED
                 step.result = result
@@ -657,7 +669,7 @@ class AgentPlanner:
     async def _update_plan_status(self, plan: AgentPlan):
         """Update plan status in database"""
         try:
-            db.execute("""
+            await run_blocking(db.execute, """
                 UPDATE agent_plans 
                 SET status = %s, plan_data = %s, completed_at = %s
                 WHERE plan_id = %s
@@ -696,4 +708,4 @@ class AgentPlanner:
 
 
 # Global instance for use across VALIS
-agent_planner = AgentPlanner()
+agent_planner = lazy("agent_planner", AgentPlanner)
@@ -0,0 +1,165 @@
+"""
+VALIS 2.0 Async Runtime Helpers
+Bridges blocking components (psycopg2, sync providers) onto the event loop,
+and coroutines (agent planning) onto sync callers via a background loop
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+logger = logging.getLogger("AsyncRuntime")
+
+# Sized to the DatabaseClient pool max so blocking DB calls never queue on the pool itself
+BLOCKING_WORKERS = int(os.getenv('VALIS_BLOCKING_WORKERS', '20'))
+
+_blocking_executor = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the shared executor for blocking calls"""
+    global _blocking_executor
+    if _blocking_executor is None:
+        _blocking_executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_WORKERS,
+            thread_name_prefix="valis-blocking"
+        )
+        logger.info(f"Blocking executor started with {BLOCKING_WORKERS} workers")
+    return _blocking_executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the shared executor without stalling the loop
+
+    The caller's context variables (request id, spans, deadlines) are copied
+    into the worker thread so they behave as if the call ran inline.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
+
+
+def shutdown_blocking_executor():
+    """Stop the shared executor (called on server shutdown)"""
+    global _blocking_executor
+    if _blocking_executor is not None:
+        _blocking_executor.shutdown(wait=False)
+        _blocking_executor = None
+
+
+class BackgroundLoop:
+    """
+    Long-lived event loop on a daemon thread
+
+    Sync code (Flask workers, hedge threads) submits coroutines here instead
+    of creating a loop per call, so coroutines from concurrent requests
+    share one loop and overlap while they await.
+    """
+
+    def __init__(self, name: str = "valis-async"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread (idempotent) and return the loop"""
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                logger.info(f"Background event loop '{self.name}' started")
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is threading.current_thread()
+
+    def submit(self, coro: Coroutine, timeout: float = None) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the loop from any thread
+
+        The caller's context variables are carried into the task. With a
+        timeout the task is cancelled on the loop once it expires, and
+        cancelling the returned future cancels the task.
+        """
+        loop = self.start()
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        ctx = contextvars.copy_context()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def schedule():
+            if future.cancelled():
+                coro.close()
+                return
+            task = asyncio.ensure_future(coro)
+            task.add_done_callback(lambda t: _copy_outcome(t, future))
+            future.add_done_callback(
+                lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel)
+            )
+
+        loop.call_soon_threadsafe(ctx.run, schedule)
+        return future
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """Submit and block the calling thread for the result (raises TimeoutError at the deadline)"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError(f"run() called from the '{self.name}' loop itself would deadlock")
+        return self.submit(coro, timeout).result()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+def _copy_outcome(task: asyncio.Future, future: concurrent.futures.Future):
+    """Mirror a finished loop task onto the thread-side future"""
+    if task.cancelled():
+        future.cancel()
+        return
+    try:
+        if task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+    except concurrent.futures.InvalidStateError:
+        pass  # the caller cancelled the future first
+
+
+_background_loop = BackgroundLoop()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Shared background loop for running coroutines from sync code"""
+    return _background_loop
+
+
+def shutdown_background_loop():
+    """Stop the shared background loop (called on server shutdown)"""
+    _background_loop.stop()
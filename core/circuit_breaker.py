@@ -0,0 +1,164 @@
+"""
+VALIS 2.0 Circuit Breaker
+Per-provider breakers so the cascade skips providers that are failing
+
+States:
+    closed     - calls flow; outcomes feed a rolling window
+    open       - calls are skipped; the provider is probed in the background
+    half_open  - a probe succeeded (or the provider has no probe); one live
+                 trial call at a time decides between closed and open
+
+The breaker trips when, over the rolling window and with enough calls to
+judge, either the error rate or the slow-call rate crosses its threshold.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("CircuitBreaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_BREAKER_CONFIG = {
+    "window_seconds": 60,           # rolling window for error/latency rates
+    "min_calls": 5,                 # calls in window before the breaker may trip
+    "error_rate_threshold": 0.5,    # fraction of failed calls that trips it
+    "slow_call_seconds": 10.0,      # a call slower than this counts as slow
+    "slow_rate_threshold": 0.8,     # fraction of slow calls that trips it
+    "open_seconds": 30,             # time open before the first probe
+    "probe_interval_seconds": 5     # background probe cadence while open
+}
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by rolling error rate and latency"""
+
+    def __init__(self, name: str, config: Dict[str, Any] = None):
+        self.name = name
+        self.config = {**DEFAULT_BREAKER_CONFIG, **(config or {})}
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._opened_at: Optional[float] = None
+        self._last_probe: float = 0.0
+        self._trial_in_flight = False
+        self._trial_started: float = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            "times_opened": 0,
+            "skipped_calls": 0,
+            "probes": 0,
+            "last_error": None,
+            "last_state_change": time.time()
+        }
+
+    def allow_request(self) -> bool:
+        """Whether a live call may go to the provider now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            # A trial whose caller never reported back (e.g. abandoned stream)
+            # expires after open_seconds so the breaker cannot wedge half-open
+            if self.state == HALF_OPEN and (not self._trial_in_flight
+                                            or time.time() - self._trial_started >= self.config["open_seconds"]):
+                self._trial_in_flight = True
+                self._trial_started = time.time()
+                return True
+            self.stats["skipped_calls"] += 1
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+                return
+            self._add_call(failed=False, latency=latency)
+
+    def record_failure(self, latency: float, error: str = None):
+        with self._lock:
+            self._trial_in_flight = False
+            self.stats["last_error"] = error
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._add_call(failed=True, latency=latency)
+
+    def release(self):
+        """The provider declined the request (neither success nor failure)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _add_call(self, failed: bool, latency: float):
+        now = time.time()
+        self._calls.append((now, failed, latency >= self.config["slow_call_seconds"]))
+        cutoff = now - self.config["window_seconds"]
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+        if self.state != CLOSED or len(self._calls) < self.config["min_calls"]:
+            return
+        error_rate, slow_rate = self._rates()
+        if error_rate >= self.config["error_rate_threshold"] or slow_rate >= self.config["slow_rate_threshold"]:
+            logger.warning(f"Circuit '{self.name}' opened: error_rate={error_rate:.2f}, slow_rate={slow_rate:.2f}")
+            self._transition(OPEN)
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failed = sum(1 for _, f, _ in self._calls if f)
+        slow = sum(1 for _, _, s in self._calls if s)
+        return failed / total, slow / total
+
+    def _transition(self, state: str):
+        self.state = state
+        self.stats["last_state_change"] = time.time()
+        if state == OPEN:
+            self._opened_at = time.time()
+            self.stats["times_opened"] += 1
+        else:
+            self._opened_at = None
+        if state == CLOSED:
+            self._calls.clear()
+        logger.info(f"Circuit '{self.name}' -> {state}")
+
+    def due_for_probe(self) -> bool:
+        """Open long enough, and not probed too recently"""
+        with self._lock:
+            if self.state != OPEN:
+                return False
+            now = time.time()
+            return (now - self._opened_at >= self.config["open_seconds"]
+                    and now - self._last_probe >= self.config["probe_interval_seconds"])
+
+    def record_probe(self, healthy: bool):
+        """Background probe result: healthy moves open -> half_open"""
+        with self._lock:
+            self._last_probe = time.time()
+            self.stats["probes"] += 1
+            if self.state == OPEN and healthy:
+                self._transition(HALF_OPEN)
+
+    def force(self, state: str):
+        """Admin override: force closed (reset) or open"""
+        with self._lock:
+            self._trial_in_flight = False
+            self._transition(state)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            error_rate, slow_rate = self._rates()
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._calls),
+                "error_rate": round(error_rate, 3),
+                "slow_rate": round(slow_rate, 3),
+                "opened_at": self._opened_at,
+                **self.stats,
+                "config": self.config
+            }
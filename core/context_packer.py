@@ -0,0 +1,286 @@
+"""
+VALIS 2.0 Context Packer
+Token-budgeted selection of memory items for the composed prompt
+
+The packer decides which memory items actually fit the model.
+Every candidate (persona bio line, canon fact, client fact, working
+memory entry) gets a score from its relevance, recency, importance and
+emotion weight, and a cost in tokens measured with the model's tokenizer.
+Candidates are packed greedily, best score first, into
+
+    input_token_limit - generation_reserve - tokens of the rest of the prompt
+
+(MODEL_CAPS), and the chosen items keep their original order in the
+prompt. Candidates are drawn from the largest count any context mode
+allows, so spare budget is filled rather than only trimmed. Token counts
+are cached per text, so stable items (bio, canon, client facts, the
+persona's template) are tokenized once; tokenizer calls are bounded by
+the request deadline.
+
+Environment:
+    VALIS_CONTEXT_PACKING   "false" keeps every candidate (count limits only)
+    VALIS_TOKENIZER         "llama" (llama.cpp /tokenize for local models,
+                            estimate as fallback) or "estimate" (4 chars/token)
+    VALIS_TOKENIZER_URL     llama.cpp tokenize endpoint
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from core.deadline import cap_timeout, has_budget
+from core.model_caps import get_model_caps
+
+logger = logging.getLogger("ContextPacker")
+
+CONTEXT_PACKING_ENABLED = os.getenv('VALIS_CONTEXT_PACKING', 'true').lower() != 'false'
+TOKENIZER = os.getenv('VALIS_TOKENIZER', 'llama')
+TOKENIZER_URL = os.getenv('VALIS_TOKENIZER_URL', 'http://localhost:8080/tokenize')
+
+# Models whose tokenizer is llama.cpp's (others are estimated)
+LLAMA_TOKENIZER_MODELS = {"local_mistral"}
+
+# Seconds the llama tokenizer is skipped after a failure
+TOKENIZER_RETRY_SECONDS = 30.0
+
+# Seconds of request budget below which counts are estimated instead of tokenized
+TOKENIZE_MIN_BUDGET = 0.1
+
+# Head-room for text added after packing (personality tone prefix/suffix)
+PACKING_MARGIN_TOKENS = 32
+
+# Score = layer priority * weighted sum of features in [0, 1]
+SCORE_WEIGHTS = {"relevance": 0.4, "recency": 0.2, "importance": 0.25, "emotion": 0.15}
+LAYER_PRIORITY = {"persona_bio": 1.0, "canon_memory": 0.8, "client_facts": 0.7, "working_memory": 0.6}
+
+# Recency halves every this many days (canon last_used, working created_at)
+RECENCY_HALF_LIFE_DAYS = 7.0
+
+# Section header of each layer as the prompt renders it
+LAYER_HEADERS = {
+    "persona_bio": "Background:\n",
+    "canon_memory": "Key Facts:\n",
+    "client_facts": "About this user:\n",
+    "working_memory": "Recent context:\n"
+}
+
+TOKENIZE_REQUESTS = Counter(
+    'valis_tokenizer_requests_total',
+    'Token counts by source',
+    ['source']  # cache | llama | estimate
+)
+PACKED_ITEMS = Counter(
+    'valis_context_packed_items_total',
+    'Memory items considered by the context packer',
+    ['layer', 'decision']  # kept | dropped
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough count for models without a local tokenizer (4 chars/token)"""
+    return max(math.ceil(len(text) / 4), 1) if text else 0
+
+
+class TokenCounter:
+    """
+    Counts tokens with llama.cpp's /tokenize (or the estimate), caching
+    counts per text in an LRU of max_entries
+    """
+
+    def __init__(self, backend: str = "estimate", url: str = TOKENIZER_URL, max_entries: int = 4096):
+        self.backend = backend
+        self.url = url
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self.stats = {"cached": 0, "tokenized": 0, "estimated": 0, "failures": 0}
+
+    def count(self, text: str, cache: bool = True) -> int:
+        """Tokens in text; cache=False for one-off texts (e.g. the prompt with the user's message)"""
+        if not text:
+            return 0
+        if cache:
+            with self._lock:
+                tokens = self._cache.get(text)
+                if tokens is not None:
+                    self._cache.move_to_end(text)
+                    self.stats["cached"] += 1
+            if tokens is not None:
+                TOKENIZE_REQUESTS.labels(source="cache").inc()
+                return tokens
+
+        tokens = self._tokenize(text) if self.backend == "llama" else None
+        if tokens is None:
+            tokens = estimate_tokens(text)
+            with self._lock:
+                self.stats["estimated"] += 1
+            TOKENIZE_REQUESTS.labels(source="estimate").inc()
+            # Estimates are only cached when they are all we use
+            cache = cache and self.backend != "llama"
+
+        if cache:
+            with self._lock:
+                self._cache[text] = tokens
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return tokens
+
+    def _tokenize(self, text: str) -> Optional[int]:
+        # Estimated rather than spending the last of the request's budget
+        if time.monotonic() < self._retry_at or not has_budget(TOKENIZE_MIN_BUDGET):
+            return None
+        try:
+            from providers.http_client import get_http_client
+            response = get_http_client("local_mistral").post(
+                self.url, json={"content": text}, timeout=(cap_timeout(0.5), cap_timeout(2.0))
+            )
+            response.raise_for_status()
+            tokens = len(response.json()["tokens"])
+        except Exception as e:
+            if not has_budget(TOKENIZE_MIN_BUDGET):
+                # The request ran out of time, not the tokenizer: no back-off for other requests
+                return None
+            with self._lock:
+                self.stats["failures"] += 1
+            self._retry_at = time.monotonic() + TOKENIZER_RETRY_SECONDS
+            logger.warning(f"Tokenizer unavailable, estimating for {TOKENIZER_RETRY_SECONDS:.0f}s: {e}")
+            return None
+        with self._lock:
+            self.stats["tokenized"] += 1
+        TOKENIZE_REQUESTS.labels(source="llama").inc()
+        return tokens
+
+    @property
+    def source(self) -> str:
+        """Where counts currently come from"""
+        return "llama" if self.backend == "llama" and time.monotonic() >= self._retry_at else "estimate"
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "backend": self.backend, "entries": len(self._cache)}
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: str) -> TokenCounter:
+    """Shared counter for a model: llama.cpp tokenizer for local models, estimate otherwise"""
+    backend = "llama" if TOKENIZER == "llama" and model_name in LLAMA_TOKENIZER_MODELS else "estimate"
+    with _counters_lock:
+        if backend not in _counters:
+            _counters[backend] = TokenCounter(backend)
+        return _counters[backend]
+
+
+def _clamp(value: Any, default: float = 0.5) -> float:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _recency(timestamp: Any, now: datetime) -> float:
+    """1.0 now, halving every RECENCY_HALF_LIFE_DAYS; 0.5 when unknown"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return 0.5
+    if not isinstance(timestamp, datetime):
+        return 0.5
+    reference = datetime.now(timestamp.tzinfo) if timestamp.tzinfo else now
+    age_days = max((reference - timestamp).total_seconds(), 0.0) / 86400
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def score_item(layer: str, features: Dict[str, float]) -> float:
+    return round(LAYER_PRIORITY[layer] * sum(SCORE_WEIGHTS[name] * features[name] for name in SCORE_WEIGHTS), 4)
+
+
+def build_candidates(persona_bio: List[str], canon_rows: List[Dict[str, Any]], client_facts: Dict[str, Any],
+                     working_rows: List[Dict[str, Any]], now: datetime = None) -> List[Dict[str, Any]]:
+    """
+    Scored candidates from the memory layers (cut to the largest count any
+    context mode allows); each is {"layer", "position", "value", "text", "score"}
+    where text is the line as the prompt renders it
+    """
+    now = now or datetime.now()
+    candidates = []
+
+    def add(layer: str, position: int, value: Any, text: str, **features: float):
+        candidates.append({"layer": layer, "position": position, "value": value, "text": text,
+                           "score": score_item(layer, features)})
+
+    for position, line in enumerate(persona_bio):
+        # The bio itself outranks the traits line
+        add("persona_bio", position, line, f"- {line}\n",
+            relevance=1.0, recency=1.0, importance=1.0 if position == 0 else 0.6, emotion=0.0)
+
+    top_relevance = max([_clamp(row.get("relevance_score"), 1.0) for row in canon_rows] or [1.0]) or 1.0
+    for position, row in enumerate(canon_rows):
+        add("canon_memory", position, row["content"], f"- {row['content']}\n",
+            relevance=_clamp(row.get("relevance_score"), 1.0) / top_relevance,
+            recency=_recency(row.get("last_used"), now),
+            importance=0.5,
+            emotion=_clamp(row.get("emotion_weight"), 0.0))
+
+    for position, (key, value) in enumerate(client_facts.items()):
+        add("client_facts", position, (key, value), f"- {key}: {value}\n",
+            relevance=1.0 if key == "name" else max(1.0 - 0.1 * position, 0.3),
+            recency=0.5, importance=0.5, emotion=0.0)
+
+    for position, row in enumerate(working_rows):
+        add("working_memory", position, row["content"], f"- {row['content']}\n",
+            relevance=_clamp(row.get("decay_score"), 1.0),
+            recency=_recency(row.get("created_at"), now),
+            importance=_clamp((row.get("importance") or 5) / 10),
+            emotion=0.0)
+
+    return candidates
+
+
+def token_budget(model_name: str, base_tokens: int) -> int:
+    """Tokens left for memory items: input limit - generation reserve - rest of prompt - margin"""
+    caps = get_model_caps(model_name)
+    return max(caps["input_token_limit"] - caps.get("generation_reserve", 0) - base_tokens - PACKING_MARGIN_TOKENS, 0)
+
+
+def pack(candidates: List[Dict[str, Any]], budget: int, counter: TokenCounter) -> Dict[str, Any]:
+    """
+    Greedily keep the best-scoring candidates that fit the budget
+
+    A layer's section header is charged with its first kept item. Returns
+    {"layers": {layer: [values in original order]}, "used_tokens",
+    "dropped": [...]}.
+    """
+    for candidate in candidates:
+        candidate["tokens"] = counter.count(candidate["text"])
+    header_tokens = {layer: counter.count(header + "\n") for layer, header in LAYER_HEADERS.items()}
+
+    used, opened, kept, dropped = 0, set(), [], []
+    for candidate in sorted(candidates, key=lambda c: (-c["score"], c["layer"], c["position"])):
+        layer = candidate["layer"]
+        cost = candidate["tokens"] + (0 if layer in opened else header_tokens[layer])
+        if used + cost <= budget:
+            used += cost
+            opened.add(layer)
+            kept.append(candidate)
+            PACKED_ITEMS.labels(layer=layer, decision="kept").inc()
+        else:
+            dropped.append({"layer": layer, "position": candidate["position"],
+                            "tokens": candidate["tokens"], "score": candidate["score"]})
+            PACKED_ITEMS.labels(layer=layer, decision="dropped").inc()
+
+    layers = {layer: [] for layer in LAYER_HEADERS}
+    for candidate in sorted(kept, key=lambda c: (c["layer"], c["position"])):
+        layers[candidate["layer"]].append(candidate["value"])
+    return {"layers": layers, "used_tokens": used, "dropped": dropped}
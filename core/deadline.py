@@ -0,0 +1,166 @@
+"""
+VALIS 2.0 Request Deadlines
+One end-to-end time budget per request, visible to every layer
+
+A Deadline is created at request entry (/api/chat, run_inference) and
+carried in a context variable, so it follows the request into worker
+threads (run_blocking, hedge workers) and onto the background loop. Each
+layer asks how much time is left instead of applying its own fixed
+timeout:
+    - ProviderManager skips providers once too little budget remains and
+      cancels attempts still running at the deadline
+    - provider HTTP calls cap their read timeout to the remaining budget
+    - ToolManager refuses to start tools after the deadline
+    - DatabaseClient sets statement_timeout to the remaining budget
+
+VALIS_REQUEST_TIMEOUT is the default budget in seconds; clients may ask
+for less with an X-Request-Timeout header. Batch requests have no overall
+deadline: each item gets its own budget when it starts running.
+"""
+
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Optional
+
+from prometheus_client import Counter
+
+logger = logging.getLogger("Deadline")
+
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv('VALIS_REQUEST_TIMEOUT', '60'))
+
+# Providers are skipped when less than this remains (a call could not finish anyway)
+MIN_PROVIDER_BUDGET = float(os.getenv('VALIS_MIN_PROVIDER_BUDGET', '0.25'))
+
+DEADLINE_EXCEEDED = Counter(
+    'valis_deadline_exceeded_total',
+    'Work skipped or cancelled because the request deadline passed',
+    ['stage']
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work cannot start or finish within the request deadline"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded ({stage})")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which the request must be answered"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """timeout shortened to the remaining budget (timeout None means no own limit)"""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def __repr__(self) -> str:
+        return f"<Deadline {self.remaining():.3f}s of {self.budget}s left>"
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar('valis_deadline', default=None)
+
+
+def start_deadline(seconds: float = None) -> Deadline:
+    """Start the request's deadline in the current context (replaces any previous one)"""
+    deadline = Deadline(seconds if seconds is not None else DEFAULT_REQUEST_TIMEOUT)
+    _current.set(deadline)
+    return deadline
+
+
+def clear_deadline():
+    """Remove the deadline from the current context (requests budgeted per item, e.g. batch)"""
+    _current.set(None)
+
+
+@contextmanager
+def deadline_scope(seconds: float = None):
+    """
+    Run a block under the current deadline, or under a new one when the
+    caller set none (in-process callers of run_inference); a deadline
+    started here is cleared on exit so it cannot leak into the next call
+    made from the same thread
+    """
+    deadline = _current.get()
+    if deadline is not None:
+        yield deadline
+        return
+    token = _current.set(Deadline(seconds if seconds is not None else DEFAULT_REQUEST_TIMEOUT))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def request_budget(requested: Optional[str] = None) -> float:
+    """Budget for a request: VALIS_REQUEST_TIMEOUT, or less when the client asks (X-Request-Timeout)"""
+    try:
+        seconds = float(requested) if requested else DEFAULT_REQUEST_TIMEOUT
+    except ValueError:
+        return DEFAULT_REQUEST_TIMEOUT
+    if not math.isfinite(seconds):
+        return DEFAULT_REQUEST_TIMEOUT
+    return min(max(seconds, 0.0), DEFAULT_REQUEST_TIMEOUT)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(default: float = None) -> Optional[float]:
+    """Seconds left, or default when no deadline is set"""
+    deadline = _current.get()
+    return deadline.remaining() if deadline else default
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """timeout limited by the current deadline (unchanged when none is set)"""
+    deadline = _current.get()
+    return deadline.cap(timeout) if deadline else timeout
+
+
+def has_budget(minimum: float = 0.0) -> bool:
+    """True when no deadline is set or more than minimum seconds remain"""
+    deadline = _current.get()
+    return deadline is None or deadline.remaining() > minimum
+
+
+def check_deadline(stage: str, minimum: float = 0.0):
+    """Raise DeadlineExceeded (and count it) unless more than minimum seconds remain"""
+    if not has_budget(minimum):
+        exceeded(stage)
+        raise DeadlineExceeded(stage)
+
+
+def exceeded(stage: str):
+    """Count work skipped or cancelled at stage because the deadline passed"""
+    DEADLINE_EXCEEDED.labels(stage=stage).inc()
+    logger.warning(f"Request deadline exceeded at {stage}")
+
+
+async def within_deadline(awaitable: Awaitable, stage: str):
+    """Await within the remaining budget; the awaitable is cancelled at the deadline"""
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError:
+        exceeded(stage)
+        raise DeadlineExceeded(stage) from None
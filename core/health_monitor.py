@@ -0,0 +1,149 @@
+"""
+VALIS 2.0 Health Monitor
+Background component probes with cached, timestamped results
+
+Load balancers poll /api/health every few seconds per instance; running
+the database and tool probes on every poll puts that load on Postgres.
+Probes are registered once, run on a background schedule, and the
+endpoint answers from the last cached results. A deep check forces a
+live probe of every component.
+
+The probe thread is started by the server entry points, or lazily by the
+first snapshot when the app runs under another WSGI/ASGI runner; a cache
+that goes stale while no thread is running is re-probed inline.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("HealthMonitor")
+
+ProbeFn = Callable[[], Dict[str, Any]]
+
+
+class HealthMonitor:
+    """Runs registered probes periodically and caches their results"""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or float(os.getenv('VALIS_HEALTH_INTERVAL', '15'))
+        # Cached results older than this mean the probe thread has stalled
+        self.stale_after = self.interval * 3
+        self._probes: Dict[str, ProbeFn] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stopped = False   # stop() was called: no lazy restart
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, probe: ProbeFn):
+        """
+        Register a component probe
+
+        The probe returns a dict with at least "status" ("healthy",
+        "degraded" or "unhealthy"); raising marks the component unhealthy.
+        """
+        self._probes[name] = probe
+
+    def start(self):
+        """Start the background probe thread (idempotent)"""
+        if self.running:
+            return
+        self._stopped = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Health monitor started: {len(self._probes)} probes every {self.interval}s")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stopped = True
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval)
+
+    def probe_all(self) -> Dict[str, Dict[str, Any]]:
+        """Run every probe now and refresh the cache"""
+        with self._probe_lock:
+            results = {name: self._run_probe(probe) for name, probe in self._probes.items()}
+            with self._lock:
+                self._results = results
+                self._checked_at = time.time()
+            return results
+
+    def _run_probe(self, probe: ProbeFn) -> Dict[str, Any]:
+        start_time = time.time()
+        try:
+            result = dict(probe())
+        except Exception as e:
+            logger.warning(f"Health probe failed: {e}")
+            result = {'status': 'unhealthy', 'error': str(e)}
+        result['latency_ms'] = round((time.time() - start_time) * 1000, 2)
+        result['checked_at'] = datetime.fromtimestamp(start_time).isoformat()
+        return result
+
+    def snapshot(self, deep: bool = False) -> Dict[str, Any]:
+        """
+        Current health
+
+        Answers from the cache unless deep is set, nothing has been
+        probed yet, or the cache is stale with no probe thread running.
+
+        Returns:
+        {
+            "status": "healthy" | "degraded",
+            "components": {name: probe result},
+            "checked_at": str,
+            "age_seconds": float,
+            "cached": bool
+        }
+        """
+        if not self.running and not self._stopped:
+            self.start()
+
+        with self._lock:
+            results, checked_at = self._results, self._checked_at
+
+        cached = not deep and checked_at is not None
+        if cached and not self.running and time.time() - checked_at > self.stale_after:
+            # No thread refreshes the cache; one caller re-probes, the others reuse its results
+            with self._probe_lock:
+                with self._lock:
+                    results, checked_at = self._results, self._checked_at
+                if time.time() - checked_at > self.stale_after:
+                    cached = False
+        if not cached:
+            results = self.probe_all()
+            with self._lock:
+                checked_at = self._checked_at
+
+        age = time.time() - checked_at
+        healthy = all(r.get('status') == 'healthy' for r in results.values())
+        snapshot = {
+            'status': 'healthy' if healthy and age <= self.stale_after else 'degraded',
+            'components': results,
+            'checked_at': datetime.fromtimestamp(checked_at).isoformat(),
+            'age_seconds': round(age, 3),
+            'cached': cached
+        }
+        if age > self.stale_after:
+            snapshot['stale'] = True
+        return snapshot
+
+
+# Global instance for use across VALIS
+health_monitor = HealthMonitor()
@@ -0,0 +1,75 @@
+"""
+VALIS 2.0 Hedged Dispatch Support
+Per-provider latency percentiles and dispatch policy defaults
+
+Dispatch modes (per cascade in config/providers.json):
+    sequential - try providers one after another (default)
+    hedged     - start the next provider too if the current one has not
+                 answered within its observed latency percentile; first
+                 success wins and the rest are cancelled
+    race       - start every provider listed in "race" at once; first
+                 success wins, remaining providers are sequential fallback
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+
+DEFAULT_DISPATCH = {
+    "mode": "sequential",
+    "hedge_percentile": 95,     # hedge once a provider is slower than this percentile
+    "hedge_after_ms": None,     # fixed hedge delay, overrides the percentile
+    "default_hedge_ms": 2000,   # used until a provider has min_samples latencies
+    "min_hedge_ms": 100,        # never hedge sooner than this
+    "min_samples": 20,
+    "max_parallel": 2,          # hedged mode: providers in flight at once
+    "race": []                  # race mode: providers started together (empty = whole cascade)
+}
+
+
+class LatencyTracker:
+    """Rolling successful-call latencies per provider"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, provider_name: str, latency: float):
+        with self._lock:
+            self._samples[provider_name].append(latency)
+
+    def percentile(self, provider_name: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(provider_name, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        index = min(len(samples) - 1, math.ceil(percentile / 100 * len(samples)) - 1)
+        return samples[max(index, 0)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            names = list(self._samples)
+        return {
+            name: {
+                "samples": len(self._samples[name]),
+                "p50": self.percentile(name, 50),
+                "p95": self.percentile(name, 95)
+            }
+            for name in names
+        }
+
+
+def dispatch_policy(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Dispatch settings for a cascade, filled in with defaults"""
+    return {**DEFAULT_DISPATCH, **(config or {})}
+
+
+def hedge_delay(policy: Dict[str, Any], tracker: LatencyTracker, provider_name: str) -> float:
+    """Seconds to wait on provider_name before hedging to the next provider"""
+    if policy.get("hedge_after_ms") is not None:
+        return policy["hedge_after_ms"] / 1000
+    observed = tracker.percentile(provider_name, policy["hedge_percentile"], policy["min_samples"])
+    delay = observed if observed is not None else policy["default_hedge_ms"] / 1000
+    return max(delay, policy["min_hedge_ms"] / 1000)
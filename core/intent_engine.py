@@ -0,0 +1,151 @@
+"""
+VALIS 2.0 Intent Engine
+Compiled single-pass intent classification for the cascade's head providers
+
+Each engine compiles every pattern of every intent into one alternation,
+so the common case (a plain chat turn that matches nothing) costs a
+single regex scan instead of one re.search per pattern. When something
+matches, intents earlier in the table still take precedence, exactly as
+the original first-intent-wins loops behaved.
+
+The intent tables for MCPExecutionProvider (command intents) and
+AutonomousAgentProvider (planning triggers) live here so both providers,
+ProviderManager and benchmarks/intent_bench.py share one definition.
+"""
+
+import itertools
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# MCPExecutionProvider command intents, in priority order
+COMMAND_INTENTS = {
+    "query_memory": {
+        "patterns": [
+            r"what do you (?:know|remember) about.*",
+            r"tell me about.*",
+            r"search.*memory.*for.*",
+            r"recall.*about.*",
+            r"remember.*about.*",
+            r"what.*memory.*about.*"
+        ],
+        "action": "query_memory"
+    },
+    "list_files": {
+        "patterns": [
+            r"list files?.*in.*",
+            r"show.*files.*in.*",
+            r"what.*files.*in.*",
+            r"directory.*contents.*",
+            r"ls .*",
+            r"dir .*"
+        ],
+        "action": "list_directory"
+    },
+    "read_file": {
+        "patterns": [
+            r"read.*file.*",
+            r"show.*contents?.*of.*",
+            r"cat .*",
+            r"type .*",
+            r"open.*file.*"
+        ],
+        "action": "read_file"
+    },
+    "search_files": {
+        "patterns": [
+            r"find.*files?.*",
+            r"search.*for.*files?.*",
+            r"locate.*files?.*"
+        ],
+        "action": "search_files"
+    },
+    "get_processes": {
+        "patterns": [
+            r"list.*processes.*",
+            r"show.*processes.*",
+            r"what.*processes.*",
+            r"running.*processes.*"
+        ],
+        "action": "list_processes"
+    }
+}
+
+# AutonomousAgentProvider planning triggers (substring checks)
+PLANNING_TRIGGERS = [
+    'plan', 'create a plan', 'step by step', 'how would you',
+    'what steps', 'analyze and', 'research and', 'find and summarize',
+    'check if', 'compare and', 'gather information about'
+]
+
+MULTI_ACTION_INDICATORS = [
+    ' and then ', ' after that', ' followed by', ' next ',
+    'first', 'second', 'finally', 'also check'
+]
+
+# Complex queries that benefit from planning: every word present, any order
+COMPLEX_WORD_SETS = [
+    ('search', 'analyze'),  # Search then analyze
+    ('find', 'summarize'),  # Find then summarize
+    ('list', 'compare'),    # List then compare
+    ('check', 'report'),    # Check then report
+    ('gather', 'evaluate')  # Gather then evaluate
+]
+
+
+class IntentEngine:
+    """
+    First-match-wins intent table compiled into one regex alternation
+
+    Text is lowercased once and matched case-sensitively against
+    non-capturing branches: with every branch starting on a literal, the
+    regex engine can skip ahead on the set of first characters (capture
+    groups and IGNORECASE both disable that, and are slower than the
+    per-pattern loop they replace).
+    """
+
+    def __init__(self, rules: Dict[str, List[str]],
+                 extractors: Dict[str, Callable[[str], Dict[str, Any]]] = None):
+        self.order = list(rules)
+        self.extractors = extractors or {}
+        self._combined = re.compile(_alternation([p for patterns in rules.values() for p in patterns]))
+        # Per-intent alternations, only consulted to pick the intent after a hit
+        self._per_intent = {intent: re.compile(_alternation(patterns)) for intent, patterns in rules.items()}
+
+    def match(self, text: str) -> Optional[str]:
+        """Highest-priority intent with any pattern matching text, or None"""
+        text = text.lower()
+        if self._combined.search(text) is None:
+            return None
+        for intent in self.order:
+            if self._per_intent[intent].search(text):
+                return intent
+        return None
+
+    def classify(self, text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(intent, parameters extracted from the original text) or None"""
+        intent = self.match(text)
+        if intent is None:
+            return None
+        extractor = self.extractors.get(intent)
+        return intent, (extractor(text) if extractor else {})
+
+
+def _alternation(patterns: List[str]) -> str:
+    return "|".join(f"(?:{pattern})" for pattern in patterns) or r"(?!)"
+
+
+def command_intent_engine(extractors: Dict[str, Callable[[str], Dict[str, Any]]] = None) -> IntentEngine:
+    """Engine over COMMAND_INTENTS"""
+    return IntentEngine({name: spec["patterns"] for name, spec in COMMAND_INTENTS.items()}, extractors)
+
+
+def planning_engine() -> IntentEngine:
+    """
+    Single "plan" intent covering triggers, multi-action indicators and word sets
+
+    A word set becomes one branch per word order (words must not overlap).
+    """
+    patterns = [re.escape(keyword) for keyword in PLANNING_TRIGGERS + MULTI_ACTION_INDICATORS]
+    patterns += [r"[\s\S]*".join(re.escape(word) for word in order)
+                 for words in COMPLEX_WORD_SETS for order in itertools.permutations(words)]
+    return IntentEngine({"plan": patterns})
@@ -0,0 +1,324 @@
+"""
+VALIS 2.0 Lazy Initialization
+Deferred construction of expensive singletons, plus a startup profile
+
+Module-level singletons (the database pool, the tool suite, the planner,
+the cascade's providers) register a factory instead of being built at
+import time. Each is built on first use, or warmed on a background
+thread once the server is accepting connections, so importing server.py
+no longer opens a PostgreSQL pool or loads tone templates before the
+port is bound.
+
+VALIS_WARMUP selects when registered components are built:
+    background  (default) on a daemon thread once the port is bound
+    eager       inside initialize(), before serving
+    lazy        only on first use
+
+The startup profile (per-module import time and per-component build
+time) is logged when warm-up finishes and served by /api/admin/startup.
+"""
+
+import importlib.abc
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("LazyInit")
+
+WARMUP_MODES = ("background", "eager", "lazy")
+WARMUP_MODE = os.getenv('VALIS_WARMUP', 'background')
+
+# Slowest modules listed in the profile
+PROFILE_TOP_IMPORTS = int(os.getenv('VALIS_STARTUP_PROFILE_TOP', '25'))
+
+
+class LazyComponent:
+    """
+    Proxy that builds its target on first attribute access
+
+    Code that imported the singleton keeps using it unchanged
+    (db.query(...), tool_manager.execute_tool(...)); the factory runs once,
+    under a lock, the first time any attribute is read.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], warm: bool = True):
+        self._lazy_name = name
+        self._lazy_factory = factory
+        self._lazy_warm = warm
+        self._lazy_instance = None
+        self._lazy_built = False
+        self._lazy_building = False
+        self._lazy_lock = threading.RLock()
+        self._lazy_stats: Dict[str, Any] = {"built": False}
+
+    def get(self) -> Any:
+        """The component, building it if needed (failures are retried on next use)"""
+        if self._lazy_built:
+            return self._lazy_instance
+        with self._lazy_lock:
+            if self._lazy_built:
+                return self._lazy_instance
+            if self._lazy_building:
+                raise RuntimeError(f"Circular lazy initialization of '{self._lazy_name}'")
+            self._lazy_building = True
+            started = time.perf_counter()
+            try:
+                instance = self._lazy_factory()
+            except Exception as e:
+                self._lazy_stats = {"built": False, "error": str(e),
+                                    "seconds": round(time.perf_counter() - started, 4)}
+                logger.error(f"Failed to initialize {self._lazy_name}: {e}")
+                raise
+            finally:
+                self._lazy_building = False
+            self._lazy_stats = {
+                "built": True,
+                "seconds": round(time.perf_counter() - started, 4),
+                "built_by": threading.current_thread().name
+            }
+            self._lazy_instance = instance
+            self._lazy_built = True
+            logger.info(f"Initialized {self._lazy_name} in {self._lazy_stats['seconds'] * 1000:.1f}ms")
+            return instance
+
+    @property
+    def built(self) -> bool:
+        return self._lazy_built
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_lazy_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        state = repr(self._lazy_instance) if self._lazy_built else "not built"
+        return f"<lazy {self._lazy_name}: {state}>"
+
+
+def is_built(component: Any) -> bool:
+    """False only for a LazyComponent that has not been built yet"""
+    return not isinstance(component, LazyComponent) or component.built
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    Times module execution during startup
+
+    Sits first on sys.meta_path, lets the regular finders locate each
+    module and wraps the loader's exec_module. Records cumulative time
+    (including nested imports) and self time per module.
+    """
+
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, float]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def stop(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    @property
+    def active(self) -> bool:
+        return self in sys.meta_path
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _exec(self, loader, module):
+        # Hand the module back its real loader before anything can observe the wrapper
+        module.__loader__ = loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = loader
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.modules[module.__name__] = {"seconds": elapsed, "self_seconds": max(elapsed - children, 0.0)}
+
+    def report(self, top: int = PROFILE_TOP_IMPORTS) -> Dict[str, Any]:
+        with self._lock:
+            modules = dict(self.modules)
+        slowest = sorted(modules.items(), key=lambda item: item[1]["self_seconds"], reverse=True)[:top]
+        return {
+            "modules": len(modules),
+            "total_seconds": round(sum(m["self_seconds"] for m in modules.values()), 4),
+            "slowest": [{"module": name,
+                         "seconds": round(m["seconds"], 4),
+                         "self_seconds": round(m["self_seconds"], 4)} for name, m in slowest]
+        }
+
+
+class _TimedLoader:
+    """Loader wrapper installed by ImportProfiler for a single module"""
+
+    def __init__(self, loader, profiler: ImportProfiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._exec(self._loader, module)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._loader, attr)
+
+
+class StartupRegistry:
+    """Registered lazy components, warm-up, and the startup profile"""
+
+    def __init__(self, mode: str = WARMUP_MODE):
+        if mode not in WARMUP_MODES:
+            logger.warning(f"Unknown VALIS_WARMUP '{mode}', using 'background'")
+            mode = "background"
+        self.mode = mode
+        self.imports = ImportProfiler()
+        self._components: Dict[str, LazyComponent] = {}
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._ready_seconds: Optional[float] = None
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def begin(self):
+        """Start timing (call before the heavy imports)"""
+        self._started_at = time.perf_counter()
+        self.imports.start()
+
+    def register(self, name: str, factory: Callable[[], Any], warm: bool = True) -> LazyComponent:
+        """Lazy component built by factory on first use (and during warm-up when warm)"""
+        component = LazyComponent(name, factory, warm)
+        with self._lock:
+            self._components[name] = component
+        return component
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a named startup phase (initialize, warmup, ...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = round(time.perf_counter() - started, 4)
+
+    def warm_up(self) -> Dict[str, bool]:
+        """
+        Build every warm component not built yet, in registration order
+
+        Components registered while warming (a provider module importing
+        its own lazy singletons) are picked up on the next pass.
+        """
+        results = {}
+        with self.phase("warmup"):
+            while True:
+                with self._lock:
+                    pending = [c for c in self._components.values()
+                               if c._lazy_warm and not c.built and c._lazy_name not in results]
+                if not pending:
+                    return results
+                for component in pending:
+                    try:
+                        component.get()
+                        results[component._lazy_name] = True
+                    except Exception:
+                        results[component._lazy_name] = False
+
+    def after_bind(self, port: int, host: str = "127.0.0.1", timeout: float = 60.0) -> threading.Thread:
+        """
+        Wait on a daemon thread until the server accepts connections, then
+        mark startup complete and (in background mode) warm the components
+        """
+        def run():
+            if not _wait_for_port(host, port, timeout):
+                logger.warning(f"Port {port} not accepting connections after {timeout}s")
+            self.mark_ready()
+            if self.mode == "background":
+                self.warm_up()
+            self.imports.stop()
+            self.log_profile()
+
+        self._warm_thread = threading.Thread(target=run, name="valis-warmup", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def mark_ready(self):
+        if self._ready_seconds is None:
+            self._ready_seconds = round(time.perf_counter() - self._started_at, 4)
+
+    def profile(self, top: int = PROFILE_TOP_IMPORTS) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(c._lazy_stats) for name, c in self._components.items()}
+        return {
+            "warmup": self.mode,
+            "ready_seconds": self._ready_seconds,
+            "phases": dict(self._phases),
+            "components": components,
+            "imports": self.imports.report(top)
+        }
+
+    def log_profile(self):
+        profile = self.profile(top=5)
+        built = {name: c for name, c in profile["components"].items() if c["built"]}
+        logger.info(
+            f"Startup: ready in {profile['ready_seconds']}s, imports {profile['imports']['total_seconds']}s "
+            f"({profile['imports']['modules']} modules), {len(built)}/{len(profile['components'])} components built, "
+            f"phases {profile['phases']}"
+        )
+        for entry in profile["imports"]["slowest"]:
+            logger.info(f"  import {entry['module']}: {entry['self_seconds'] * 1000:.1f}ms")
+        for name, stats in sorted(built.items(), key=lambda item: item[1]["seconds"], reverse=True)[:5]:
+            logger.info(f"  init {name}: {stats['seconds'] * 1000:.1f}ms")
+
+
+def _wait_for_port(host: str, port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+startup = StartupRegistry()
+
+
+def lazy(name: str, factory: Callable[[], Any], warm: bool = True) -> LazyComponent:
+    """Register a lazily built singleton with the shared startup registry"""
+    return startup.register(name, factory, warm)
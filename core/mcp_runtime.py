@@ -6,19 +6,26 @@ Smart prompt composition based on client and persona context
 
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 import sys
 import os
 
 from memory.query_client import memory
-from core.model_caps import get_context_limits, get_model_caps, recommend_context_mode
+from memory.transcript_store import transcript_store
+from core import telemetry
+from core.model_caps import MAX_CONTEXT_LIMITS, get_context_limits, get_model_caps, recommend_context_mode
+from core.context_packer import CONTEXT_PACKING_ENABLED, build_candidates, get_token_counter, pack, token_budget
+from core.template_registry import PromptTemplate, template_registry
 from core.synthetic_cognition_manager import SyntheticCognitionManager
 from agents.personality_engine import PersonalityEngine
 
 logger = logging.getLogger("MCPRuntime")
 
+# "template": sections laid out as the persona template places them
+# "cache_friendly": stable sections first so llama.cpp can reuse its prompt cache
+PROMPT_LAYOUTS = ("template", "cache_friendly")
+
 class MCPRuntime:
     """
     Memory-aware Cognitive Processor Runtime
@@ -39,8 +46,12 @@ class MCPRuntime:
         self.personality_engine = PersonalityEngine()
         
         # Session tracking for trait evolution
-        self.session_transcripts = {}  # Store transcripts for trait analysis
-        self.session_feedback = {}     # Store feedback for trait evolution
+        self.transcripts = transcript_store  # Bounded transcripts + feedback for trait evolution
+        
+        self.prompt_layout = os.getenv('VALIS_PROMPT_LAYOUT', 'template')
+        if self.prompt_layout not in PROMPT_LAYOUTS:
+            logger.warning(f"Unknown prompt layout '{self.prompt_layout}', using 'template'")
+            self.prompt_layout = "template"
         
         # Load persona data
         self._load_personas()
@@ -78,44 +89,65 @@ class MCPRuntime:
         logger.info(f"Input: {prompt[:100]}...")
         
         # Get persona data
-        persona_data = self._get_persona_data(persona_id)
+        with telemetry.span('persona'):
+            persona_data = self._get_persona_data(persona_id)
         
         # Load memory layers (now with model-aware context)
-        memory_layers = self._load_memory_layers(client_id, persona_id, context_mode, model_name)
+        with telemetry.span('memory_layers'):
+            memory_layers = self._load_memory_layers(client_id, persona_id, context_mode, model_name)
         
         # Load synthetic cognition state
         cognition_state = None
         if session_id:
             try:
-                cognition_state = self.cognition_manager.get_cognition_state(persona_id, session_id)
+                with telemetry.span('cognition_state'):
+                    cognition_state = self.cognition_manager.get_cognition_state(persona_id, session_id)
                 logger.info(f"Loaded cognition state: self={cognition_state['self']['confidence']:.2f}, mood={cognition_state['emotion']['mood']}")
             except Exception as e:
                 logger.error(f"Failed to load cognition state: {e}")
                 cognition_state = None
         
         # Load prompt template
-        template = self._load_prompt_template(persona_id)
-        
-        # Compose final prompt
-        final_prompt = self._build_final_prompt(
-            template, persona_data, memory_layers, prompt, cognition_state
-        )
+        with telemetry.span('template'):
+            template = self._load_prompt_template(persona_id)
+            
+            # Keep the memory items that fit the model's input budget
+            with telemetry.span('context_packing'):
+                packing = self._pack_context(template, persona_data, memory_layers, prompt,
+                                             cognition_state, model_name)
+            
+            # Compose final prompt (stable prefix stays empty in template layout)
+            if self.prompt_layout == "cache_friendly":
+                stable_prompt, volatile_prompt = self._build_layered_prompt(
+                    template, persona_data, memory_layers, prompt, cognition_state
+                )
+            else:
+                stable_prompt, volatile_prompt = "", self._build_final_prompt(
+                    template, persona_data, memory_layers, prompt, cognition_state
+                )
         
         # Apply personality expression if cognition state is available
+        # (only to the volatile part, so the cached prefix is left untouched)
         if cognition_state and session_id:
             try:
-                final_prompt = self.personality_engine.inject_personality(
-                    final_prompt, 
-                    persona_data, 
-                    cognition_state.get('emotion', {}),
-                    cognition_state.get('self', {})
-                )
+                with telemetry.span('personality'):
+                    volatile_prompt = self.personality_engine.inject_personality(
+                        volatile_prompt, 
+                        persona_data, 
+                        cognition_state.get('emotion', {}),
+                        cognition_state.get('self', {})
+                    )
                 logger.info(f"Applied personality expression for {persona_id}")
             except Exception as e:
                 logger.error(f"Personality injection failed: {e}")
         
-        # Estimate tokens (rough)
-        token_estimate = len(final_prompt) // 4
+        final_prompt = "\n\n".join(part for part in (stable_prompt, volatile_prompt) if part)
+        
+        # From the packer's counts (rough estimate without packing)
+        if packing["enabled"]:
+            token_estimate = packing["base_tokens"] + packing["used_tokens"]
+        else:
+            token_estimate = len(final_prompt) // 4
         
         metadata = {
             "persona_used": persona_id,
@@ -129,11 +161,14 @@ class MCPRuntime:
                 "client_facts": len(memory_layers.get("client_facts", {}))
             },
             "context_limits": memory_layers.get("context_limits", {}),
+            "context_packing": packing,
             "cognition_state": {
                 "enabled": cognition_state is not None,
                 "confidence": cognition_state.get('self', {}).get('confidence', 0.5) if cognition_state else 0.5,
                 "mood": cognition_state.get('emotion', {}).get('mood', 'neutral') if cognition_state else 'neutral'
             },
+            "prompt_layout": self.prompt_layout,
+            "stable_prefix_tokens": len(stable_prompt) // 4,
             "token_estimate": token_estimate
         }
         
@@ -149,7 +184,8 @@ class MCPRuntime:
             "model": model_name,
             "layers": metadata["memory_layers"],
             "tokens_estimated": token_estimate,
-            "context_limits": metadata["context_limits"]
+            "context_limits": metadata["context_limits"],
+            "packing": {key: packing[key] for key in ("budget", "used_tokens", "dropped_count") if key in packing}
         }
         logger.info(f"DIAGNOSTIC: {json.dumps(diagnostic_log)}")
         
@@ -199,64 +235,46 @@ class MCPRuntime:
         
         logger.info(f"Loading memory layers for persona {persona_id}, client {client_id}")
         
-        # Get persona data first to check for default context mode
-        persona_data = memory.get_persona(persona_id)
-        persona_context_mode = None
-        if persona_data and persona_data.get('default_context_mode'):
-            persona_context_mode = persona_data['default_context_mode']
-        
-        # Determine final context mode using model capabilities and persona preference
-        final_context_mode = recommend_context_mode(model_name, persona_context_mode)
-        if context_mode != "balanced":  # User override takes highest priority
-            final_context_mode = context_mode
-        
-        # Get context limits for the final mode
-        limits = get_context_limits(final_context_mode)
-        
-        logger.info(f"Using context mode: {final_context_mode} with limits: {limits}")
-        
         try:
-            # Load persona bio from database
-            persona_bio = []
-            if persona_data:
-                if persona_data.get('bio'):
-                    persona_bio.append(persona_data['bio'])
-                if persona_data.get('traits') and limits["persona_bio"] > 1:
-                    persona_bio.append(f"Traits: {persona_data['traits']}")
+            # All layers in one round trip; the persona row (which can pick the
+            # context mode) arrives with them, so enough rows for that mode are fetched
+            bundle = memory.load_context_bundle(
+                persona_id, client_id, self._bundle_limits(persona_id, context_mode, model_name)
+            )
+            persona_data = bundle["persona"]
+            persona_context_mode = None
+            if persona_data and persona_data.get('default_context_mode'):
+                persona_context_mode = persona_data['default_context_mode']
+            
+            # Determine final context mode using model capabilities and persona preference
+            final_context_mode = recommend_context_mode(model_name, persona_context_mode)
+            if context_mode != "balanced":  # User override takes highest priority
+                final_context_mode = context_mode
+            
+            # Get context limits for the final mode
+            limits = get_context_limits(final_context_mode)
             
-            # Load canon memories with context limit
-            canon_memories = memory.get_top_canon(persona_id, limits["canon_memory"])
-            canon_content = [item["content"] for item in canon_memories]
+            logger.info(f"Using context mode: {final_context_mode} with limits: {limits}")
+            
+            # With packing on, every row fetched is a candidate and the packer
+            # picks what fits the model; the mode's counts apply otherwise
+            candidate_limits = MAX_CONTEXT_LIMITS if CONTEXT_PACKING_ENABLED else limits
+            
+            # Load persona bio from database
+            persona_bio = self._persona_bio(persona_data, limits["persona_bio"])
+            bio_candidates = self._persona_bio(persona_data, candidate_limits["persona_bio"])
             
-            # Load working memories with context limit
-            working_memories = memory.get_recent_working(persona_id, client_id, limits["working_memory"])
-            working_content = [item["content"] for item in working_memories]
+            # Canon memories with context limit
+            canon_rows = bundle["canon_memory"][:candidate_limits["canon_memory"]]
+            canon_content = [item["content"] for item in canon_rows[:limits["canon_memory"]]]
             
-            # Load client facts with context limit
-            client_data = memory.get_client(client_id)
-            client_facts = {}
-            if client_data and limits["client_facts"] > 0:
-                if client_data.get('name'):
-                    client_facts['name'] = client_data['name']
-                if client_data.get('traits'):
-                    traits = client_data['traits']
-                    if isinstance(traits, str):
-                        try:
-                            traits = json.loads(traits)
-                        except:
-                            pass
-                    if isinstance(traits, dict):
-                        # Limit client facts based on context mode
-                        fact_count = 0
-                        for key, value in traits.items():
-                            if fact_count >= limits["client_facts"]:
-                                break
-                            client_facts[key] = value
-                            fact_count += 1
+            # Working memories with context limit
+            working_rows = bundle["working_memory"][:candidate_limits["working_memory"]]
+            working_content = [item["content"] for item in working_rows[:limits["working_memory"]]]
             
-            # Truncate persona bio if needed
-            if len(persona_bio) > limits["persona_bio"]:
-                persona_bio = persona_bio[:limits["persona_bio"]]
+            # Client facts with context limit
+            fact_candidates = self._client_facts(bundle["client"], candidate_limits["client_facts"])
+            client_facts = dict(list(fact_candidates.items())[:limits["client_facts"]])
             
             logger.info(f"Loaded: {len(canon_content)} canon, {len(working_content)} working, {len(client_facts)} client facts")
             
@@ -265,6 +283,7 @@ class MCPRuntime:
                 "canon_memory": canon_content,
                 "working_memory": working_content,
                 "client_facts": client_facts,
+                "candidates": build_candidates(bio_candidates, canon_rows, fact_candidates, working_rows),
                 "context_mode_used": final_context_mode,
                 "context_limits": limits
             }
@@ -281,33 +300,124 @@ class MCPRuntime:
                 "context_limits": get_context_limits("tight")
             }
     
-    def _load_prompt_template(self, persona_id: str) -> str:
-        """Load prompt template for persona"""
-        
-        template_file = Path("core/prompt_templates") / f"{persona_id}.txt"
-        
-        if template_file.exists():
-            try:
-                return template_file.read_text()
-            except:
-                pass
-        
-        # Default template
-        return """You are {persona_name}, {persona_role}.
-
-{persona_bio}
-
-{memory_context}
-
-Current conversation:
-User: {user_input}
-{persona_name}:"""
+    def _persona_bio(self, persona_data: Optional[Dict[str, Any]], count: int) -> List[str]:
+        """Persona bio and (when more than one line is allowed) traits, up to count lines"""
+        persona_bio = []
+        if persona_data:
+            if persona_data.get('bio'):
+                persona_bio.append(persona_data['bio'])
+            if persona_data.get('traits') and count > 1:
+                persona_bio.append(f"Traits: {persona_data['traits']}")
+        return persona_bio[:count]
+    
+    def _client_facts(self, client_data: Optional[Dict[str, Any]], count: int) -> Dict[str, Any]:
+        """Client name and up to count traits"""
+        client_facts = {}
+        if client_data and count > 0:
+            if client_data.get('name'):
+                client_facts['name'] = client_data['name']
+            traits = client_data.get('traits')
+            if isinstance(traits, str):
+                try:
+                    traits = json.loads(traits)
+                except:
+                    pass
+            if isinstance(traits, dict):
+                for key, value in list(traits.items())[:count]:
+                    client_facts[key] = value
+        return client_facts
+    
+    def _pack_context(self, template: PromptTemplate, persona_data: Dict, memory_layers: Dict, user_input: str,
+                      cognition_state: Dict, model_name: str) -> Dict[str, Any]:
+        """
+        Replace the memory layers with the candidates that fit the model's
+        input budget (core/context_packer.py); returns the packing report
+        for the composition metadata
+        """
+        candidates = memory_layers.pop("candidates", None)
+        if not CONTEXT_PACKING_ENABLED or candidates is None:
+            return {"enabled": False}
+        
+        # Everything but the memory items: the template with the persona header
+        # (stable per persona, so its count is cached) plus this turn's user
+        # input and cognition state
+        counter = get_token_counter(model_name)
+        empty = {**memory_layers, "persona_bio": [], "canon_memory": [], "working_memory": [], "client_facts": {}}
+        if self.prompt_layout == "cache_friendly":
+            skeleton = "\n\n".join(self._build_layered_prompt(template, persona_data, empty, ""))
+        else:
+            skeleton = self._build_final_prompt(template, persona_data, empty, "")
+        turn_text = "\n".join(part for part in (user_input, self._state_context(cognition_state).strip()) if part)
+        base_tokens = counter.count(skeleton) + counter.count(turn_text, cache=False)
+        budget = token_budget(model_name, base_tokens)
+        
+        packed = pack(candidates, budget, counter)
+        memory_layers["persona_bio"] = packed["layers"]["persona_bio"]
+        memory_layers["canon_memory"] = packed["layers"]["canon_memory"]
+        memory_layers["working_memory"] = packed["layers"]["working_memory"]
+        memory_layers["client_facts"] = dict(packed["layers"]["client_facts"])
+        
+        if packed["dropped"]:
+            logger.info(f"Context packing dropped {len(packed['dropped'])} of {len(candidates)} items "
+                        f"(budget {budget} tokens)")
+        return {
+            "enabled": True,
+            "tokenizer": counter.source,
+            "budget": budget,
+            "base_tokens": base_tokens,
+            "used_tokens": packed["used_tokens"],
+            "candidates": len(candidates),
+            "kept": {layer: len(values) for layer, values in packed["layers"].items()},
+            "dropped_count": len(packed["dropped"]),
+            "dropped": packed["dropped"]
+        }
     
-    def _build_final_prompt(self, template: str, persona_data: Dict, 
+    def _bundle_limits(self, persona_id: str, context_mode: str, model_name: str) -> Dict[str, int]:
+        """
+        Rows to fetch before the final context mode is known: with packing
+        on, the most any mode could use (the packer chooses by tokens);
+        otherwise exact for a user override or an already cached persona,
+        else the most any mode could use (trimmed once the persona row is in)
+        """
+        if CONTEXT_PACKING_ENABLED:
+            return MAX_CONTEXT_LIMITS
+        if context_mode != "balanced":
+            return get_context_limits(context_mode)
+        persona = memory.cached_persona(persona_id)
+        if persona is not None:
+            return get_context_limits(recommend_context_mode(model_name, persona.get('default_context_mode')))
+        return MAX_CONTEXT_LIMITS
+    
+    def _load_prompt_template(self, persona_id: str) -> PromptTemplate:
+        """Compiled prompt template for persona (core/template_registry.py)"""
+        return template_registry.template_for(persona_id)
+    
+    def _build_final_prompt(self, template: PromptTemplate, persona_data: Dict, 
                            memory_layers: Dict, user_input: str, cognition_state: Dict = None) -> str:
         """Build the final prompt string"""
         
-        # Build memory context section
+        memory_context = self._stable_context(memory_layers) + self._state_context(cognition_state)
+        
+        # Fill template (persona fields are already substituted in the bound template)
+        return template.bind(persona_data).render(memory_context.strip(), user_input)
+    
+    def _build_layered_prompt(self, template: PromptTemplate, persona_data: Dict, memory_layers: Dict,
+                              user_input: str, cognition_state: Dict = None) -> Tuple[str, str]:
+        """
+        Build the prompt as (stable prefix, volatile suffix)
+        
+        Sections run from most to least stable: persona header and bio, canon
+        facts, client facts | working memory, cognition state, conversation.
+        The template is cut after {memory_context} (or before the {user_input}
+        line when it has no such slot earlier), so the prefix is byte-identical
+        across turns and llama.cpp serves it from its prompt cache.
+        """
+        stable_context = self._stable_context(memory_layers).strip()
+        volatile_context = (self._working_context(memory_layers) + self._state_context(cognition_state)).strip()
+        return template.bind(persona_data).render_layered(stable_context, volatile_context, user_input)
+    
+    def _stable_context(self, memory_layers: Dict) -> str:
+        """Persona background, canon facts and client facts (change rarely)"""
         memory_context = ""
         
         if memory_layers.get("persona_bio"):
@@ -328,48 +438,33 @@ User: {user_input}
                 memory_context += f"- {key}: {value}\n"
             memory_context += "\n"
         
-        # Add synthetic cognition state if available
-        if cognition_state:
-            memory_context += "Current state:\n"
-            awareness_text = cognition_state.get('integration', {}).get('awareness_text', '')
-            if awareness_text:
-                memory_context += f"- {awareness_text}\n"
-            memory_context += "\n"
-        
-        # Fill template
-        final_prompt = template.format(
-            persona_name=persona_data.get("name", "Assistant"),
-            persona_role=persona_data.get("role", "AI Assistant"),
-            persona_bio=persona_data.get("bio", ""),
-            memory_context=memory_context.strip(),
-            user_input=user_input
-        )
-        
-        return final_prompt
+        return memory_context
+    
+    def _working_context(self, memory_layers: Dict) -> str:
+        """Recent working memory for this client (changes every few turns)"""
+        if not memory_layers.get("working_memory"):
+            return ""
+        memory_context = "Recent context:\n"
+        for item in memory_layers["working_memory"]:
+            memory_context += f"- {item}\n"
+        return memory_context + "\n"
+    
+    def _state_context(self, cognition_state: Dict = None) -> str:
+        """Synthetic cognition state (changes every turn)"""
+        if not cognition_state:
+            return ""
+        memory_context = "Current state:\n"
+        awareness_text = cognition_state.get('integration', {}).get('awareness_text', '')
+        if awareness_text:
+            memory_context += f"- {awareness_text}\n"
+        return memory_context + "\n"
+    
     def track_session_interaction(self, session_id: str, user_input: str, 
                                  ai_response: str, feedback: Dict[str, Any] = None):
         """Track session interactions for trait evolution analysis"""
         try:
-            # Build transcript
-            if session_id not in self.session_transcripts:
-                self.session_transcripts[session_id] = []
-            
-            self.session_transcripts[session_id].append({
-                "user": user_input,
-                "ai": ai_response,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            # Track feedback
-            if feedback:
-                if session_id not in self.session_feedback:
-                    self.session_feedback[session_id] = []
-                self.session_feedback[session_id].append(feedback)
-            
-            # Limit memory usage - keep only last 50 interactions per session
-            if len(self.session_transcripts[session_id]) > 50:
-                self.session_transcripts[session_id] = self.session_transcripts[session_id][-50:]
-                
+            # Ring buffer per session; idle and least recently active sessions spill to session_transcript_spills
+            self.transcripts.append(session_id, user_input, ai_response, feedback)
         except Exception as e:
             logger.error(f"Failed to track session interaction: {e}")
     
@@ -381,9 +476,8 @@ User: {user_input}
         try:
             logger.info(f"Triggering personality evolution for {persona_id} session {session_id}")
             
-            # Get session data
-            transcript_data = self.session_transcripts.get(session_id, [])
-            feedback_data = self.session_feedback.get(session_id, [])
+            # Get session data (removed from the store; reloaded from session_transcript_spills if it was spilled)
+            transcript_data, feedback_data = self.transcripts.take(session_id)
             
             # Build full transcript text
             full_transcript = ""
@@ -395,12 +489,6 @@ User: {user_input}
                 session_id, persona_id, full_transcript, feedback_data
             )
             
-            # Clean up session data to prevent memory bloat
-            if session_id in self.session_transcripts:
-                del self.session_transcripts[session_id]
-            if session_id in self.session_feedback:
-                del self.session_feedback[session_id]
-            
             logger.info(f"Personality evolution completed for {persona_id}")
             return evolution_result
             
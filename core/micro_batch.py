@@ -0,0 +1,233 @@
+"""
+VALIS 2.0 Micro-Batching Dispatcher
+Concurrent requests are collected into batches for a batch-capable backend
+
+Requests are queued per group (requests that may share a batch, e.g.
+completions with identical sampling parameters). A group is dispatched
+when max_batch requests are waiting or window_ms after its first request
+arrived, whichever comes first, and each caller receives its own result.
+At most max_inflight batches run at once.
+
+Configured by "micro_batching" in config/providers.json:
+
+    "micro_batching": {
+        "enabled": false,
+        "window_ms": 10,
+        "max_batch": 4,
+        "max_inflight": 2
+    }
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from prometheus_client import Counter
+
+from core.hedging import LatencyTracker
+
+logger = logging.getLogger("MicroBatch")
+
+BATCHES = Counter(
+    'valis_micro_batches_total',
+    'Batches dispatched by micro-batchers by what triggered the flush',
+    ['batcher', 'flush']  # full | window
+)
+BATCHED_REQUESTS = Counter(
+    'valis_micro_batched_requests_total',
+    'Requests dispatched through micro-batchers',
+    ['batcher']
+)
+
+# Seconds of completions used for the reported throughput
+THROUGHPUT_WINDOW = 60.0
+
+
+class _Group:
+    """Requests waiting for the same batch"""
+
+    def __init__(self):
+        self.first_at = time.monotonic()
+        self.items: List[tuple] = []   # (item, future, enqueued_at)
+
+
+class MicroBatcher:
+    """
+    Collects submitted items and hands them to dispatch(items) in batches
+
+    dispatch must return one result per item, in order; an exception fails
+    every request in the batch. Sync callers block in run(), coroutines
+    await run_async().
+    """
+
+    def __init__(self, name: str, dispatch: Callable[[List[Any]], List[Any]],
+                 window_seconds: float = 0.01, max_batch: int = 4, max_inflight: int = 2):
+        self.name = name
+        self.dispatch = dispatch
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.max_inflight = max(1, max_inflight)
+        self._groups: Dict[Hashable, _Group] = {}
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_inflight,
+                                            thread_name_prefix=f"batch-{name}")
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._timings = LatencyTracker(window=1000)   # queue_wait, batch_latency
+        self._completed: deque = deque()              # (finished_at, requests) for throughput
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "full_flushes": 0, "window_flushes": 0,
+                      "cancelled": 0, "failed_batches": 0}
+        self.size_histogram: Dict[int, int] = {}
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict[str, Any],
+                    dispatch: Callable[[List[Any]], List[Any]]) -> Optional["MicroBatcher"]:
+        """Build a batcher from providers.json settings; None when disabled"""
+        if not config or not config.get("enabled"):
+            return None
+        batcher = cls(
+            name,
+            dispatch,
+            window_seconds=config.get("window_ms", 10) / 1000,
+            max_batch=config.get("max_batch", 4),
+            max_inflight=config.get("max_inflight", 2)
+        )
+        logger.info(f"Micro-batching enabled for '{name}': window {config.get('window_ms', 10)}ms, "
+                    f"max batch {batcher.max_batch}, {batcher.max_inflight} in flight")
+        return batcher
+
+    def submit(self, item: Any, group: Hashable = None) -> Future:
+        """Queue one item; the future resolves to its result"""
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Micro-batcher '{self.name}' is closed")
+            self._ensure_thread()
+            pending = self._groups.get(group)
+            if pending is None:
+                pending = self._groups[group] = _Group()
+            pending.items.append((item, future, time.monotonic()))
+            if len(pending.items) >= self.max_batch:
+                del self._groups[group]
+                self._launch(pending, "full")
+            elif len(pending.items) == 1:
+                self._cond.notify()
+        return future
+
+    def run(self, item: Any, group: Hashable = None, timeout: float = None) -> Any:
+        """Submit and block for the result; on timeout the item is dropped if not yet dispatched"""
+        future = self.submit(item, group)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    async def run_async(self, item: Any, group: Hashable = None) -> Any:
+        """Submit and await the result; cancelling the awaiter drops the item if not yet dispatched"""
+        return await asyncio.wrap_future(self.submit(item, group))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name=f"batcher-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        """Dispatch groups whose window has expired"""
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                expired = [key for key, pending in self._groups.items()
+                           if now - pending.first_at >= self.window_seconds]
+                for key in expired:
+                    self._launch(self._groups.pop(key), "window")
+                if self._groups:
+                    next_due = min(pending.first_at for pending in self._groups.values()) + self.window_seconds
+                    self._cond.wait(max(next_due - now, 0.0005))
+                else:
+                    self._cond.wait()
+
+    def _launch(self, pending: _Group, reason: str):
+        # Callers that gave up (cancelled futures) are dropped before dispatch
+        live = [entry for entry in pending.items if entry[1].set_running_or_notify_cancel()]
+        with self._stats_lock:
+            self.stats["cancelled"] += len(pending.items) - len(live)
+        if not live:
+            return
+        with self._stats_lock:
+            self.stats[f"{reason}_flushes"] += 1
+        BATCHES.labels(batcher=self.name, flush=reason).inc()
+        self._executor.submit(self._execute, live)
+
+    def _execute(self, batch: List[tuple]):
+        started = time.monotonic()
+        error: Optional[Exception] = None
+        try:
+            results = self.dispatch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch dispatch returned {len(results)} results for {len(batch)} requests")
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} failed in '{self.name}': {e}")
+            error = e
+
+        # Stats first, so callers woken below see their own batch counted
+        finished = time.monotonic()
+        self._record(batch, started, finished, failed=error is not None)
+        for index, (_, future, _) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[index])
+
+    def _record(self, batch: List[tuple], started: float, finished: float, failed: bool):
+        for _, _, enqueued_at in batch:
+            self._timings.record("queue_wait", started - enqueued_at)
+        self._timings.record("batch_latency", finished - started)
+        BATCHED_REQUESTS.labels(batcher=self.name).inc(len(batch))
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["failed_batches"] += int(failed)
+            self.size_histogram[len(batch)] = self.size_histogram.get(len(batch), 0) + 1
+            self._completed.append((finished, len(batch)))
+            while self._completed and finished - self._completed[0][0] > THROUGHPUT_WINDOW:
+                self._completed.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch size, queue wait and throughput, for tuning window_ms / max_batch"""
+        now = time.monotonic()
+        with self._stats_lock:
+            stats = dict(self.stats)
+            histogram = dict(sorted(self.size_histogram.items()))
+            recent = [(at, n) for at, n in self._completed if now - at <= THROUGHPUT_WINDOW]
+        with self._cond:
+            queued = sum(len(pending.items) for pending in self._groups.values())
+        span = now - recent[0][0] if len(recent) > 1 else THROUGHPUT_WINDOW
+        timings = self._timings.snapshot()
+        return {
+            "enabled": True,
+            **stats,
+            "queued": queued,
+            "mean_batch_size": round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0,
+            "batch_sizes": histogram,
+            "queue_wait": timings.get("queue_wait", {}),
+            "batch_latency": timings.get("batch_latency", {}),
+            "throughput_rps": round(sum(n for _, n in recent) / max(span, 1.0), 2),
+            "config": {"window_ms": self.window_seconds * 1000, "max_batch": self.max_batch,
+                       "max_inflight": self.max_inflight}
+        }
+
+    def close(self):
+        """Flush what is queued and stop the dispatcher thread"""
+        with self._cond:
+            self._closed = True
+            for pending in self._groups.values():
+                self._launch(pending, "window")
+            self._groups.clear()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False)
@@ -1,6 +1,9 @@
 """
 VALIS 2.0 Model Capability Map
 Defines token limits and preferred context modes per model
+
+generation_reserve is the part of input_token_limit kept for the reply
+when memory is packed into the prompt (core/context_packer.py)
 """
 
 MODEL_CAPS = {
@@ -8,30 +11,35 @@ MODEL_CAPS = {
         "max_tokens": 8192,
         "preferred_mode": "tight",
         "input_token_limit": 6000,
+        "generation_reserve": 256,
         "description": "Local Mistral 7B - Limited context window"
     },
     "anthropic_claude": {
         "max_tokens": 100000,
         "preferred_mode": "full", 
         "input_token_limit": 95000,
+        "generation_reserve": 4096,
         "description": "Claude - Large context window"
     },
     "openai_gpt4": {
         "max_tokens": 32000,
         "preferred_mode": "balanced",
         "input_token_limit": 28000,
+        "generation_reserve": 2048,
         "description": "GPT-4 - Medium context window"
     },
     "openai_gpt3": {
         "max_tokens": 4096,
         "preferred_mode": "tight",
         "input_token_limit": 3500,
+        "generation_reserve": 512,
         "description": "GPT-3.5 - Small context window"
     },
     "hardcoded_fallback": {
         "max_tokens": 1000,
         "preferred_mode": "tight",
         "input_token_limit": 800,
+        "generation_reserve": 200,
         "description": "Fallback - No real model"
     }
 }
@@ -64,6 +72,12 @@ CONTEXT_MODE_LIMITS = {
     }
 }
 
+# Most items any context mode allows per layer (what the context packer chooses from)
+MAX_CONTEXT_LIMITS = {
+    layer: max(limits[layer] for limits in CONTEXT_MODE_LIMITS.values())
+    for layer in ("persona_bio", "canon_memory", "working_memory", "client_facts", "session_history")
+}
+
 def get_model_caps(model_name: str) -> dict:
     """Get model capabilities, fallback to default if unknown"""
     return MODEL_CAPS.get(model_name, MODEL_CAPS["hardcoded_fallback"])
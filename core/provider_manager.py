@@ -4,14 +4,34 @@ ProviderManager - Cascade Router for VALIS 2.0
 Routes requests through configurable provider cascade with fallback logic
 """
 
+import asyncio
+import contextvars
 import json
 import logging
+import os
+import threading
 import time
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator
 from pathlib import Path
 
+from core import telemetry
+from core.async_runtime import run_blocking
+from core.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from core.hedging import LatencyTracker, dispatch_policy, hedge_delay
+from core.adaptive_cascade import AdaptiveCascade, current_intent, SUCCESS, DECLINED, FAILED
+from providers.http_client import configure_http_clients, get_http_client_stats
+from providers.completion_cache import CompletionCache
+from core.single_flight import SingleFlight
+from core.lazy_init import lazy, is_built
+from core.deadline import (DeadlineExceeded, MIN_PROVIDER_BUDGET, cap_timeout, exceeded,
+                           check_deadline, get_deadline, has_budget, within_deadline)
+
 logger = logging.getLogger("ProviderManager")
 
+# Seconds between checks for open circuits due a probe
+BREAKER_PROBE_INTERVAL = 1.0
+
 class ProviderManager:
     """
     Provider cascade router with fallback logic
@@ -23,6 +43,22 @@ class ProviderManager:
         self.config_path = config_path
         self.providers = {}
         self.cascade = []
+        self.breaker_config = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.dispatch = dispatch_policy()
+        self.cascades: Dict[str, Dict[str, Any]] = {}   # named cascades: {"providers", "dispatch"}
+        self.persona_cascades: Dict[str, str] = {}      # persona_id -> cascade name
+        self.latency = LatencyTracker()
+        self.adaptive = AdaptiveCascade()
+        self._hedge_executor = None
+        self._prober: Optional[threading.Thread] = None
+        self._prober_stop = threading.Event()
+        self.completion_cache_config: Dict[str, Any] = {}
+        self.completion_cache = None
+        self.coalescing_config: Dict[str, Any] = {}
+        self.coalescer = None
+        self.local_mistral_config: Dict[str, Any] = {}
+        self.micro_batching_config: Dict[str, Any] = {}
         
         # Load cascade configuration
         self._load_cascade_config()
@@ -30,6 +66,10 @@ class ProviderManager:
         # Initialize providers
         self._initialize_providers()
         
+        # One circuit breaker per provider, probed in the background while open
+        self.breakers = {name: CircuitBreaker(name, self.breaker_config) for name in self.providers}
+        self._start_breaker_prober()
+        
         logger.info(f"🎛️ ProviderManager initialized with cascade: {self.cascade}")
     
     def ask(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
@@ -48,50 +88,692 @@ class ProviderManager:
         
         start_time = time.time()
         cascade_trace = []
+        cascade, policy = self._resolve_cascade(persona_id)
+        cascade = self._adapt_cascade(cascade, prompt, cascade_trace)
         
         logger.info(f"=== PROVIDER CASCADE REQUEST ===")
         logger.info(f"Prompt: {prompt[:100]}...")
         logger.info(f"Client: {client_id}, Persona: {persona_id}")
-        logger.info(f"Cascade: {self.cascade}")
+        logger.info(f"Cascade: {cascade} ({policy['mode']})")
         
-        for provider_name in self.cascade:
+        if policy["mode"] in ("hedged", "race"):
+            return self._ask_hedged(prompt, client_id, persona_id, cascade, policy, start_time, cascade_trace)
+        
+        for provider_name in cascade:
             if provider_name not in self.providers:
                 logger.warning(f"Provider {provider_name} not available")
                 cascade_trace.append(f"{provider_name}: not_available")
                 continue
             
             provider = self.providers[provider_name]
+            if not self._deadline_allows(provider_name, cascade_trace):
+                break
+            if not self._breaker_allows(provider_name, cascade_trace):
+                continue
             
+            attempt_start = time.time()
             try:
                 logger.info(f"Trying provider: {provider_name}")
                 
-                result = provider.ask(prompt, client_id, persona_id)
+                with telemetry.span(f"provider.{provider_name}"):
+                    result = provider.ask(prompt, client_id, persona_id)
+                self._record_outcome(provider_name, result, attempt_start)
                 
-                if result.get("success"):
-                    processing_time = time.time() - start_time
-                    cascade_trace.append(f"{provider_name}: success")
-                    
-                    logger.info(f"✓ Success with {provider_name}")
-                    logger.info(f"Processing time: {processing_time:.2f}s")
+                outcome = self._handle_result(provider_name, result, start_time, cascade_trace)
+                if outcome:
+                    return outcome
                     
-                    return {
-                        "success": True,
-                        "response": result["response"],
-                        "provider_used": provider_name,
-                        "processing_time": processing_time,
-                        "cascade_trace": cascade_trace
-                    }
-                else:
-                    error = result.get("error", "Unknown error")
-                    logger.warning(f"✗ {provider_name} failed: {error}")
-                    cascade_trace.append(f"{provider_name}: failed - {error}")
+            except Exception as e:
+                logger.error(f"✗ {provider_name} exception: {e}")
+                if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                    break
+                cascade_trace.append(f"{provider_name}: exception - {str(e)}")
+                self._record_outcome(provider_name, None, attempt_start, error=str(e))
+        
+        return self._all_failed(start_time, cascade_trace)
+    
+    async def ask_async(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
+        """
+        Route request through provider cascade on the event loop
+        
+        Providers exposing ask_async are awaited natively; the rest run on the
+        shared blocking executor. Same return contract as ask().
+        """
+        
+        start_time = time.time()
+        cascade_trace = []
+        cascade, policy = self._resolve_cascade(persona_id)
+        cascade = self._adapt_cascade(cascade, prompt, cascade_trace)
+        
+        logger.info(f"=== PROVIDER CASCADE REQUEST (async) ===")
+        logger.info(f"Client: {client_id}, Persona: {persona_id}")
+        
+        if policy["mode"] in ("hedged", "race"):
+            return await self._ask_hedged_async(prompt, client_id, persona_id, cascade, policy, start_time, cascade_trace)
+        
+        for provider_name in cascade:
+            if provider_name not in self.providers:
+                logger.warning(f"Provider {provider_name} not available")
+                cascade_trace.append(f"{provider_name}: not_available")
+                continue
+            
+            provider = self.providers[provider_name]
+            if not self._deadline_allows(provider_name, cascade_trace):
+                break
+            if not self._breaker_allows(provider_name, cascade_trace):
+                continue
+            
+            attempt_start = time.time()
+            try:
+                logger.info(f"Trying provider: {provider_name}")
+                
+                with telemetry.span(f"provider.{provider_name}"):
+                    if hasattr(provider, "ask_async"):
+                        call = provider.ask_async(prompt, client_id, persona_id)
+                    else:
+                        call = run_blocking(provider.ask, prompt, client_id, persona_id)
+                    result = await within_deadline(call, f"provider.{provider_name}")
+                self._record_outcome(provider_name, result, attempt_start)
+                
+                outcome = self._handle_result(provider_name, result, start_time, cascade_trace)
+                if outcome:
+                    return outcome
                     
             except Exception as e:
                 logger.error(f"✗ {provider_name} exception: {e}")
+                if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                    break
                 cascade_trace.append(f"{provider_name}: exception - {str(e)}")
+                self._record_outcome(provider_name, None, attempt_start, error=str(e))
+        
+        return self._all_failed(start_time, cascade_trace)
+    
+    def stream(self, prompt: str, client_id: str, persona_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Route request through the cascade, relaying tokens as they arrive
         
-        # All providers failed
+        Yields events:
+            {"event": "token", "content": str}
+            {"event": "done", "success": bool, "response": str,
+             "provider_used": str, "processing_time": float, "cascade_trace": list}
+        
+        Providers with a stream() method are streamed; the rest answer via
+        ask() and their response is emitted as a single token. A provider that
+        fails before its first token falls through to the next one; once
+        tokens have been sent the cascade can no longer fall through.
+        """
+        
+        start_time = time.time()
+        cascade_trace = []
+        # Streams always relay one provider at a time; dispatch mode does not apply
+        cascade, _ = self._resolve_cascade(persona_id)
+        cascade = self._adapt_cascade(cascade, prompt, cascade_trace)
+        
+        logger.info(f"=== PROVIDER CASCADE STREAM ===")
+        logger.info(f"Client: {client_id}, Persona: {persona_id}")
+        
+        for provider_name in cascade:
+            if provider_name not in self.providers:
+                cascade_trace.append(f"{provider_name}: not_available")
+                continue
+            
+            provider = self.providers[provider_name]
+            if not self._deadline_allows(provider_name, cascade_trace):
+                break
+            if not self._breaker_allows(provider_name, cascade_trace):
+                continue
+            
+            attempt_start = time.time()
+            if not hasattr(provider, "stream"):
+                try:
+                    result = provider.ask(prompt, client_id, persona_id)
+                    self._record_outcome(provider_name, result, attempt_start)
+                    outcome = self._handle_result(provider_name, result, start_time, cascade_trace)
+                except Exception as e:
+                    logger.error(f"✗ {provider_name} exception: {e}")
+                    if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                        break
+                    cascade_trace.append(f"{provider_name}: exception - {str(e)}")
+                    self._record_outcome(provider_name, None, attempt_start, error=str(e))
+                    continue
+                if outcome:
+                    yield {"event": "token", "content": outcome["response"]}
+                    yield {"event": "done", **outcome}
+                    return
+                continue
+            
+            tokens = []
+            try:
+                logger.info(f"Streaming provider: {provider_name}")
+                for token in provider.stream(prompt, client_id, persona_id):
+                    check_deadline(f"provider.{provider_name}")
+                    tokens.append(token)
+                    yield {"event": "token", "content": token}
+            except Exception as e:
+                logger.error(f"✗ {provider_name} stream failed: {e}")
+                if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                    if not tokens:
+                        break
+                    yield self._stream_done(False, provider_name, tokens, start_time, cascade_trace,
+                                            error="Stream interrupted: request deadline exceeded")
+                    return
+                cascade_trace.append(f"{provider_name}: stream failed - {str(e)}")
+                self._record_outcome(provider_name, None, attempt_start, error=str(e))
+                if not tokens:
+                    continue
+                yield self._stream_done(False, provider_name, tokens, start_time, cascade_trace,
+                                        error=f"Stream interrupted: {e}")
+                return
+            
+            self._record_outcome(provider_name, {"success": True}, attempt_start)
+            cascade_trace.append(f"{provider_name}: success")
+            yield self._stream_done(True, provider_name, tokens, start_time, cascade_trace)
+            return
+        
+        yield {"event": "done", **self._all_failed(start_time, cascade_trace)}
+    
+    async def stream_async(self, prompt: str, client_id: str, persona_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of stream() for the ASGI serving mode"""
+        
+        start_time = time.time()
+        cascade_trace = []
+        # Streams always relay one provider at a time; dispatch mode does not apply
+        cascade, _ = self._resolve_cascade(persona_id)
+        cascade = self._adapt_cascade(cascade, prompt, cascade_trace)
+        
+        logger.info(f"=== PROVIDER CASCADE STREAM (async) ===")
+        logger.info(f"Client: {client_id}, Persona: {persona_id}")
+        
+        for provider_name in cascade:
+            if provider_name not in self.providers:
+                cascade_trace.append(f"{provider_name}: not_available")
+                continue
+            
+            provider = self.providers[provider_name]
+            if not self._deadline_allows(provider_name, cascade_trace):
+                break
+            if not self._breaker_allows(provider_name, cascade_trace):
+                continue
+            
+            attempt_start = time.time()
+            if not hasattr(provider, "stream_async"):
+                try:
+                    if hasattr(provider, "ask_async"):
+                        result = await provider.ask_async(prompt, client_id, persona_id)
+                    else:
+                        result = await run_blocking(provider.ask, prompt, client_id, persona_id)
+                    self._record_outcome(provider_name, result, attempt_start)
+                    outcome = self._handle_result(provider_name, result, start_time, cascade_trace)
+                except Exception as e:
+                    logger.error(f"✗ {provider_name} exception: {e}")
+                    if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                        break
+                    cascade_trace.append(f"{provider_name}: exception - {str(e)}")
+                    self._record_outcome(provider_name, None, attempt_start, error=str(e))
+                    continue
+                if outcome:
+                    yield {"event": "token", "content": outcome["response"]}
+                    yield {"event": "done", **outcome}
+                    return
+                continue
+            
+            tokens = []
+            try:
+                logger.info(f"Streaming provider: {provider_name}")
+                async for token in provider.stream_async(prompt, client_id, persona_id):
+                    check_deadline(f"provider.{provider_name}")
+                    tokens.append(token)
+                    yield {"event": "token", "content": token}
+            except Exception as e:
+                logger.error(f"✗ {provider_name} stream failed: {e}")
+                if self._cancelled_by_deadline(provider_name, e, cascade_trace):
+                    if not tokens:
+                        break
+                    yield self._stream_done(False, provider_name, tokens, start_time, cascade_trace,
+                                            error="Stream interrupted: request deadline exceeded")
+                    return
+                cascade_trace.append(f"{provider_name}: stream failed - {str(e)}")
+                self._record_outcome(provider_name, None, attempt_start, error=str(e))
+                if not tokens:
+                    continue
+                yield self._stream_done(False, provider_name, tokens, start_time, cascade_trace,
+                                        error=f"Stream interrupted: {e}")
+                return
+            
+            self._record_outcome(provider_name, {"success": True}, attempt_start)
+            cascade_trace.append(f"{provider_name}: success")
+            yield self._stream_done(True, provider_name, tokens, start_time, cascade_trace)
+            return
+        
+        yield {"event": "done", **self._all_failed(start_time, cascade_trace)}
+    
+    def _resolve_cascade(self, persona_id: str):
+        """Provider list and dispatch policy for a persona (named cascade or default)"""
+        name = self.persona_cascades.get(persona_id)
+        if name and name in self.cascades:
+            return self.cascades[name]["providers"], self.cascades[name]["dispatch"]
+        return self.cascade, self.dispatch
+    
+    def _adapt_cascade(self, cascade: List[str], prompt: str, cascade_trace: list) -> List[str]:
+        """Reorder/skip providers from their live stats for this request's intent"""
+        if not self.adaptive.enabled:
+            return cascade
+        intent = self._classify_intent(prompt)
+        current_intent.set(intent)
+        available = [name for name in cascade if name in self.providers]
+        ordered, skipped = self.adaptive.order(available, intent)
+        for provider_name in skipped:
+            cascade_trace.append(f"{provider_name}: skipped ({intent})")
+        if ordered != available:
+            logger.info(f"Adaptive cascade for '{intent}': {ordered}")
+        return ordered
+    
+    def _classify_intent(self, prompt: str) -> str:
+        """Coarse request intent: plan, an execution intent (e.g. list_files), or chat"""
+        autonomous = self.providers.get("autonomous_agent")
+        if autonomous is not None and autonomous.should_use_autonomous_mode(prompt):
+            return "plan"
+        execution = self.providers.get("mcp_execution")
+        if execution is not None:
+            intent = execution.match_intent(prompt)
+            if intent:
+                return intent
+        return "chat"
+    
+    def _hedge_order(self, cascade: List[str], policy: Dict[str, Any]) -> List[str]:
+        """Race mode puts its racers first; the rest of the cascade is fallback"""
+        if policy["mode"] != "race":
+            return list(cascade)
+        racers = [name for name in (policy["race"] or cascade) if name in cascade]
+        return racers + [name for name in cascade if name not in racers]
+    
+    def _next_candidate(self, queue: List[str], cascade_trace: list) -> Optional[str]:
+        """Pop the next provider that exists and whose circuit allows a call"""
+        while queue:
+            if not self._deadline_allows(queue[0], cascade_trace):
+                return None
+            provider_name = queue.pop(0)
+            if provider_name not in self.providers:
+                cascade_trace.append(f"{provider_name}: not_available")
+                continue
+            if self._breaker_allows(provider_name, cascade_trace):
+                return provider_name
+        return None
+    
+    def _initial_launches(self, queue: List[str], policy: Dict[str, Any], cascade_trace: list) -> List[tuple]:
+        """(provider_name, reason) to start immediately: every racer, or the primary"""
+        launches = []
+        if policy["mode"] == "race":
+            racers = set(policy["race"] or queue)
+            while queue and queue[0] in racers:
+                provider_name = self._next_candidate([queue.pop(0)], cascade_trace)
+                if provider_name:
+                    launches.append((provider_name, "race"))
+        if not launches:
+            provider_name = self._next_candidate(queue, cascade_trace)
+            if provider_name:
+                launches.append((provider_name, "primary"))
+        return launches
+    
+    def _attempt(self, provider_name: str, prompt: str, client_id: str, persona_id: str,
+                 lost: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        One provider call on a hedge worker; outcome feeds breaker and latency
+        stats, unless the request was settled without it meanwhile (lost)
+        """
+        attempt_start = time.time()
+        result, error = None, None
+        try:
+            with telemetry.span(f"provider.{provider_name}"):
+                result = self.providers[provider_name].ask(prompt, client_id, persona_id)
+        except Exception as e:
+            error = e
+        if lost is not None and lost.is_set():
+            # Abandoned loser - neither a success nor a failure for the breaker
+            self.breakers[provider_name].release()
+        else:
+            self._record_outcome(provider_name, result, attempt_start, error=str(error) if error else None)
+        if error is not None:
+            raise error
+        return result
+    
+    async def _attempt_async(self, provider_name: str, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
+        attempt_start = time.time()
+        provider = self.providers[provider_name]
+        try:
+            with telemetry.span(f"provider.{provider_name}"):
+                if hasattr(provider, "ask_async"):
+                    result = await provider.ask_async(prompt, client_id, persona_id)
+                else:
+                    result = await run_blocking(provider.ask, prompt, client_id, persona_id)
+        except asyncio.CancelledError:
+            # Lost the race - neither a success nor a failure for the breaker
+            self.breakers[provider_name].release()
+            raise
+        except Exception as e:
+            self._record_outcome(provider_name, None, attempt_start, error=str(e))
+            raise
+        self._record_outcome(provider_name, result, attempt_start)
+        return result
+    
+    def _settle(self, provider_name: str, result: Optional[Dict[str, Any]], error: Optional[Exception],
+                start_time: float, cascade_trace: list) -> Optional[Dict[str, Any]]:
+        """Trace a finished hedge attempt; return the cascade response if it won"""
+        if error is not None:
+            logger.error(f"✗ {provider_name} exception: {error}")
+            cascade_trace.append(f"{provider_name}: exception - {str(error)}")
+            return None
+        outcome = self._handle_result(provider_name, result, start_time, cascade_trace)
+        if outcome:
+            cascade_trace[-1] = f"{provider_name}: success (won)"
+        return outcome
+    
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('VALIS_HEDGE_WORKERS', '16')),
+                thread_name_prefix="valis-hedge"
+            )
+        return self._hedge_executor
+    
+    def _ask_hedged(self, prompt: str, client_id: str, persona_id: str, cascade: List[str],
+                    policy: Dict[str, Any], start_time: float, cascade_trace: list) -> Dict[str, Any]:
+        """
+        Hedged / race dispatch on worker threads
+        
+        Threads cannot be interrupted, so losing calls are abandoned rather
+        than stopped: when they finish they only release their breaker, as
+        a cancelled async attempt does.
+        """
+        executor = self._get_hedge_executor()
+        queue = self._hedge_order(cascade, policy)
+        in_flight = {}  # future -> (provider_name, hedge_at)
+        lost = threading.Event()
+        
+        def launch(provider_name: str, reason: str):
+            cascade_trace.append(f"{provider_name}: started ({reason})")
+            future = executor.submit(contextvars.copy_context().run, self._attempt,
+                                     provider_name, prompt, client_id, persona_id, lost)
+            in_flight[future] = (provider_name, time.time() + hedge_delay(policy, self.latency, provider_name))
+        
+        for provider_name, reason in self._initial_launches(queue, policy, cascade_trace):
+            launch(provider_name, reason)
+        
+        while in_flight:
+            timeout = None
+            if policy["mode"] == "hedged" and queue and len(in_flight) < policy["max_parallel"]:
+                # The next hedge is timed from the most recent launch
+                _, hedge_at = list(in_flight.values())[-1]
+                timeout = max(0.0, hedge_at - time.time())
+            
+            done, _ = wait(list(in_flight), timeout=cap_timeout(timeout), return_when=FIRST_COMPLETED)
+            if not done and not has_budget():
+                # Threads cannot be stopped: abandon what is still running
+                lost.set()
+                for future, (provider_name, _) in in_flight.items():
+                    future.cancel()
+                    cascade_trace.append(f"{provider_name}: abandoned (deadline)")
+                exceeded("cascade")
+                break
+            if not done:
+                provider_name = self._next_candidate(queue, cascade_trace)
+                if provider_name:
+                    launch(provider_name, f"hedge after {(time.time() - start_time) * 1000:.0f}ms")
+                continue
+            
+            for future in done:
+                provider_name, _ = in_flight.pop(future)
+                error = future.exception()
+                outcome = self._settle(provider_name, None if error else future.result(), error,
+                                       start_time, cascade_trace)
+                if outcome:
+                    lost.set()
+                    for loser, (loser_name, _) in in_flight.items():
+                        loser.cancel()
+                        cascade_trace.append(f"{loser_name}: cancelled (lost)")
+                    outcome["dispatch"] = policy["mode"]
+                    return outcome
+            
+            # Everything in flight failed: fall through to the next provider
+            if not in_flight:
+                provider_name = self._next_candidate(queue, cascade_trace)
+                if provider_name:
+                    launch(provider_name, "fallback")
+        
+        return self._all_failed(start_time, cascade_trace)
+    
+    async def _ask_hedged_async(self, prompt: str, client_id: str, persona_id: str, cascade: List[str],
+                                policy: Dict[str, Any], start_time: float, cascade_trace: list) -> Dict[str, Any]:
+        """Async variant of _ask_hedged(); losing calls are cancelled"""
+        queue = self._hedge_order(cascade, policy)
+        in_flight = {}  # task -> (provider_name, hedge_at)
+        
+        def launch(provider_name: str, reason: str):
+            cascade_trace.append(f"{provider_name}: started ({reason})")
+            task = asyncio.ensure_future(self._attempt_async(provider_name, prompt, client_id, persona_id))
+            in_flight[task] = (provider_name, time.time() + hedge_delay(policy, self.latency, provider_name))
+        
+        for provider_name, reason in self._initial_launches(queue, policy, cascade_trace):
+            launch(provider_name, reason)
+        
+        try:
+            while in_flight:
+                timeout = None
+                if policy["mode"] == "hedged" and queue and len(in_flight) < policy["max_parallel"]:
+                    _, hedge_at = list(in_flight.values())[-1]
+                    timeout = max(0.0, hedge_at - time.time())
+                
+                done, _ = await asyncio.wait(list(in_flight), timeout=cap_timeout(timeout),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done and not has_budget():
+                    # Cancelled by the finally block below
+                    for provider_name, _ in in_flight.values():
+                        cascade_trace.append(f"{provider_name}: cancelled (deadline)")
+                    exceeded("cascade")
+                    break
+                if not done:
+                    provider_name = self._next_candidate(queue, cascade_trace)
+                    if provider_name:
+                        launch(provider_name, f"hedge after {(time.time() - start_time) * 1000:.0f}ms")
+                    continue
+                
+                for task in done:
+                    provider_name, _ = in_flight.pop(task)
+                    error = task.exception()
+                    outcome = self._settle(provider_name, None if error else task.result(), error,
+                                           start_time, cascade_trace)
+                    if outcome:
+                        for loser_name, _ in in_flight.values():
+                            cascade_trace.append(f"{loser_name}: cancelled (lost)")
+                        outcome["dispatch"] = policy["mode"]
+                        return outcome
+                
+                if not in_flight:
+                    provider_name = self._next_candidate(queue, cascade_trace)
+                    if provider_name:
+                        launch(provider_name, "fallback")
+        finally:
+            for task in in_flight:
+                task.cancel()
+        
+        return self._all_failed(start_time, cascade_trace)
+    
+    def _deadline_allows(self, provider_name: str, cascade_trace: list) -> bool:
+        """Stop starting providers once too little of the request's budget is left"""
+        if has_budget(MIN_PROVIDER_BUDGET):
+            return True
+        exceeded(f"provider.{provider_name}")
+        cascade_trace.append(f"{provider_name}: skipped (deadline)")
+        return False
+    
+    def _breaker_allows(self, provider_name: str, cascade_trace: list) -> bool:
+        """Skip providers whose circuit is open"""
+        breaker = self.breakers.get(provider_name)
+        if breaker and not breaker.allow_request():
+            logger.info(f"Skipping {provider_name}: circuit {breaker.state}")
+            cascade_trace.append(f"{provider_name}: circuit_open")
+            return False
+        return True
+    
+    def _cancelled_by_deadline(self, provider_name: str, error: Exception, cascade_trace: list) -> bool:
+        """
+        True when an attempt raised because the request ran out of budget
+        (DeadlineExceeded, or a call cut short by the capped timeout); the
+        breaker is released, as the provider neither succeeded nor failed
+        """
+        if not isinstance(error, DeadlineExceeded) and has_budget():
+            return False
+        breaker = self.breakers.get(provider_name)
+        if breaker:
+            breaker.release()
+        cascade_trace.append(f"{provider_name}: cancelled (deadline) - {str(error)}")
+        return True
+    
+    @staticmethod
+    def _cut_by_deadline(result: Optional[Dict[str, Any]]) -> bool:
+        """A failed attempt that only failed because the request's budget ran out"""
+        if result is not None and (result.get("success") or result.get("declined")):
+            return False
+        return bool(result is not None and result.get("deadline_exceeded")) or not has_budget()
+    
+    def _record_outcome(self, provider_name: str, result: Optional[Dict[str, Any]],
+                        attempt_start: float, error: str = None):
+        """
+        Feed a provider attempt into its breaker and adaptive stats (result
+        None means it raised); attempts cut short by the request deadline
+        only release the breaker
+        """
+        breaker = self.breakers.get(provider_name)
+        if not breaker:
+            return
+        if self._cut_by_deadline(result):
+            breaker.release()
+            return
+        latency = time.time() - attempt_start
+        intent = current_intent.get()
+        if intent and self.adaptive.enabled:
+            if result is None:
+                outcome = FAILED
+            elif result.get("success"):
+                outcome = SUCCESS
+            else:
+                outcome = DECLINED if result.get("declined") else FAILED
+            self.adaptive.record(provider_name, intent, outcome, latency)
+        if result is None:
+            breaker.record_failure(latency, error)
+        elif result.get("success"):
+            breaker.record_success(latency)
+            self.latency.record(provider_name, latency)
+        elif result.get("declined"):
+            # Provider passed on the request (e.g. no execution intent) - not a fault
+            breaker.release()
+        else:
+            breaker.record_failure(latency, result.get("error"))
+    
+    def _start_breaker_prober(self):
+        """Background thread probing providers whose circuit is open (until stop())"""
+        if self._prober and self._prober.is_alive():
+            return
+        self._prober_stop.clear()
+        self._prober = threading.Thread(target=self._probe_loop, name="breaker-prober", daemon=True)
+        self._prober.start()
+    
+    def _probe_loop(self):
+        while not self._prober_stop.wait(BREAKER_PROBE_INTERVAL):
+            for name, breaker in self.breakers.items():
+                if breaker.due_for_probe():
+                    breaker.record_probe(self._probe_provider(name))
+    
+    def stop(self):
+        """Stop the breaker prober and the hedge workers (shutdown)"""
+        self._prober_stop.set()
+        if self._prober:
+            self._prober.join(timeout=BREAKER_PROBE_INTERVAL * 2)
+            self._prober = None
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+    
+    def _probe_provider(self, provider_name: str) -> bool:
+        """
+        Cheap liveness check via the provider's probe(); providers without
+        one go straight to half-open and a live trial call decides.
+        """
+        probe = getattr(self.providers.get(provider_name), "probe", None)
+        if probe is None:
+            return True
+        try:
+            return bool(probe())
+        except Exception as e:
+            logger.debug(f"Probe of {provider_name} failed: {e}")
+            return False
+    
+    def reset_breaker(self, provider_name: str) -> Dict[str, Any]:
+        """Admin: close a provider's circuit"""
+        self.breakers[provider_name].force(CLOSED)
+        return self.breakers[provider_name].snapshot()
+    
+    def trip_breaker(self, provider_name: str) -> Dict[str, Any]:
+        """Admin: open a provider's circuit (take it out of the cascade)"""
+        self.breakers[provider_name].force(OPEN)
+        return self.breakers[provider_name].snapshot()
+    
+    def _stream_done(self, success: bool, provider_name: str, tokens: List[str],
+                     start_time: float, cascade_trace: list, error: str = None) -> Dict[str, Any]:
+        """Final event of a streamed cascade response"""
+        done = {
+            "event": "done",
+            "success": success,
+            "response": "".join(tokens).strip(),
+            "provider_used": provider_name,
+            "processing_time": time.time() - start_time,
+            "cascade_trace": cascade_trace
+        }
+        if error:
+            done["error"] = error
+        return done
+    
+    def _handle_result(self, provider_name: str, result: Dict[str, Any],
+                       start_time: float, cascade_trace: list) -> Optional[Dict[str, Any]]:
+        """Record a provider attempt; return the cascade response on success"""
+        if result.get("success"):
+            processing_time = time.time() - start_time
+            cascade_trace.append(f"{provider_name}: success")
+            
+            logger.info(f"✓ Success with {provider_name}")
+            logger.info(f"Processing time: {processing_time:.2f}s")
+            
+            return {
+                "success": True,
+                "response": result["response"],
+                "provider_used": provider_name,
+                "processing_time": processing_time,
+                "cascade_trace": cascade_trace
+            }
+        
+        error = result.get("error", "Unknown error")
+        logger.warning(f"✗ {provider_name} failed: {error}")
+        if self._cut_by_deadline(result):
+            cascade_trace.append(f"{provider_name}: cancelled (deadline) - {error}")
+        else:
+            cascade_trace.append(f"{provider_name}: failed - {error}")
+        return None
+    
+    def _all_failed(self, start_time: float, cascade_trace: list) -> Dict[str, Any]:
+        """Response returned when every provider in the cascade failed"""
         processing_time = time.time() - start_time
+        deadline = get_deadline()
+        if deadline is not None and not has_budget(MIN_PROVIDER_BUDGET):
+            logger.error(f"Request deadline of {deadline.budget}s exceeded")
+            return {
+                "success": False,
+                "response": "I apologize, but I couldn't answer in time. Please try again.",
+                "error": "Request deadline exceeded",
+                "deadline_exceeded": True,
+                "provider_used": "none",
+                "processing_time": processing_time,
+                "cascade_trace": cascade_trace
+            }
         logger.error("All providers failed")
         
         return {
@@ -110,6 +792,22 @@ class ProviderManager:
                 with open(config_file, 'r') as f:
                     config = json.load(f)
                     self.cascade = config.get("cascade", ["mcp", "local_mistral"])
+                    self.breaker_config = config.get("circuit_breaker", {})
+                    self.dispatch = dispatch_policy(config.get("dispatch"))
+                    self.cascades = {
+                        name: {
+                            "providers": spec.get("providers", []),
+                            "dispatch": dispatch_policy(spec.get("dispatch"))
+                        }
+                        for name, spec in config.get("cascades", {}).items()
+                    }
+                    self.persona_cascades = config.get("persona_cascades", {})
+                    self.adaptive = AdaptiveCascade(config.get("adaptive_cascade"))
+                    configure_http_clients(config.get("http_clients", {}))
+                    self.completion_cache_config = config.get("completion_cache", {})
+                    self.coalescing_config = config.get("coalescing", {})
+                    self.local_mistral_config = config.get("local_mistral", {})
+                    self.micro_batching_config = config.get("micro_batching", {})
             else:
                 # Default cascade
                 self.cascade = ["mcp", "local_mistral"]
@@ -119,37 +817,71 @@ class ProviderManager:
             self.cascade = ["mcp", "local_mistral"]
     
     def _initialize_providers(self):
-        """Initialize available providers"""
-        try:
-            # Import providers dynamically
-            from providers.mcp_provider import MCPProvider
+        """
+        Register available providers
+        
+        Providers are lazy components: their modules are imported and the
+        instances built on first use or during warm-up (see core.lazy_init),
+        not while the server is starting.
+        """
+        self.completion_cache = CompletionCache.from_config(self.completion_cache_config)
+        # Identical concurrent completions share one llama.cpp slot
+        self.coalescer = SingleFlight.from_config("local_mistral", self.coalescing_config)
+        
+        def local_mistral():
             from providers.local_mistral import LocalMistralProvider
+            return LocalMistralProvider(cache=self.completion_cache, coalescer=self.coalescer,
+                                        config=self.local_mistral_config, batching=self.micro_batching_config)
+        
+        def mcp():
+            from providers.mcp_provider import MCPProvider
+            return MCPProvider(mistral_provider=self.providers["local_mistral"].get())
+        
+        def mcp_execution():
             from providers.mcp_execution_provider import MCPExecutionProvider
+            return MCPExecutionProvider()
+        
+        def autonomous_agent():
             from providers.autonomous_agent_provider import autonomous_agent_provider
-            
-            self.providers["mcp"] = MCPProvider()
-            self.providers["local_mistral"] = LocalMistralProvider()
-            self.providers["mcp_execution"] = MCPExecutionProvider()
-            self.providers["autonomous_agent"] = autonomous_agent_provider
-            
-            logger.info(f"Initialized providers: {list(self.providers.keys())}")
-            
-            # Update cascade to include autonomous agent at the beginning
-            if "autonomous_agent" not in self.cascade:
-                self.cascade.insert(0, "autonomous_agent")
-            
-            # Ensure mcp_execution is also in cascade
-            if "mcp_execution" not in self.cascade:
-                self.cascade.insert(-1, "mcp_execution")  # Before fallback providers
-            
-        except ImportError as e:
-            logger.error(f"Failed to import providers: {e}")
-            logger.error("Provider modules may not exist yet")
+            return autonomous_agent_provider
+        
+        for name, factory in (("local_mistral", local_mistral), ("mcp", mcp),
+                              ("mcp_execution", mcp_execution), ("autonomous_agent", autonomous_agent)):
+            self.providers[name] = lazy(f"provider.{name}", factory)
+        
+        logger.info(f"Registered providers: {list(self.providers.keys())}")
+        
+        # Update cascade to include autonomous agent at the beginning
+        if "autonomous_agent" not in self.cascade:
+            self.cascade.insert(0, "autonomous_agent")
+        
+        # Ensure mcp_execution is also in cascade
+        if "mcp_execution" not in self.cascade:
+            self.cascade.insert(-1, "mcp_execution")  # Before fallback providers
+    
+    def _micro_batching_status(self) -> Dict[str, Any]:
+        local = self.providers.get("local_mistral")
+        if not is_built(local) or getattr(local, "batcher", None) is None:
+            return {"enabled": bool(self.micro_batching_config.get("enabled"))}
+        return local.batcher.get_stats()
     
     def get_status(self) -> Dict[str, Any]:
         """Get provider manager status"""
         return {
             "cascade": self.cascade,
             "providers_loaded": list(self.providers.keys()),
-            "total_providers": len(self.providers)
+            "providers_built": [name for name, provider in self.providers.items() if is_built(provider)],
+            "total_providers": len(self.providers),
+            "dispatch": self.dispatch["mode"],
+            "cascades": self.cascades,
+            "persona_cascades": self.persona_cascades,
+            "provider_latency": self.latency.snapshot(),
+            "adaptive_cascade": self.adaptive.snapshot(),
+            "http_clients": get_http_client_stats(),
+            "completion_cache": self.completion_cache.get_stats() if self.completion_cache else {"enabled": False},
+            "coalescing": self.coalescer.get_stats() if self.coalescer else {"enabled": False},
+            "prompt_cache": self.providers["local_mistral"].get_prompt_cache_stats()
+                            if is_built(self.providers.get("local_mistral")) else {},
+            "micro_batching": self._micro_batching_status(),
+            "circuit_breakers": {name: breaker.snapshot() for name, breaker in self.breakers.items()}
         }
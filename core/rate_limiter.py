@@ -0,0 +1,203 @@
+"""
+VALIS 2.0 Rate Limiter
+Constant-time sliding-window rate limiting with pluggable backends
+
+Uses the two-bucket sliding counter: each key keeps the request count of
+the current fixed window and the previous one, and the sliding estimate is
+
+    previous * (1 - elapsed_fraction) + current
+
+so a check is O(1) in time and memory regardless of the limit size.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+from core.shared_store import get_shared_store
+
+logger = logging.getLogger("RateLimiter")
+
+
+class InMemoryRateLimitBackend:
+    """
+    Per-process counters with idle-key eviction
+
+    Keys are kept in least-recently-seen order, so evicting idle keys only
+    ever touches the keys being evicted.
+    """
+
+    def __init__(self, idle_ttl: float, max_keys: int = 100000):
+        self.idle_ttl = idle_ttl
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, list]" = OrderedDict()  # key -> [window_index, current, previous, last_seen]
+        self._lock = threading.Lock()
+
+    def increment(self, key: str, window_index: int, window: int, amount: int = 1) -> Tuple[int, int]:
+        """Count amount requests; return (previous_count, current_count)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                entry = [window_index, 0, 0, now]
+                self._counters[key] = entry
+            else:
+                self._counters.move_to_end(key)
+                self._roll(entry, window_index)
+            entry[1] += amount
+            entry[3] = now
+            self._evict(now)
+            return entry[2], entry[1]
+
+    def decrement(self, key: str, window_index: int, window: int, amount: int = 1):
+        """Undo counted requests that were rejected"""
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is not None and entry[0] == window_index and entry[1] > 0:
+                entry[1] = max(entry[1] - amount, 0)
+
+    def _roll(self, entry: list, window_index: int):
+        if entry[0] == window_index:
+            return
+        entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+        entry[1] = 0
+        entry[0] = window_index
+
+    def _evict(self, now: float):
+        while self._counters:
+            key, entry = next(iter(self._counters.items()))
+            if now - entry[3] < self.idle_ttl and len(self._counters) <= self.max_keys:
+                break
+            self._counters.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._counters)
+
+
+class SharedStoreRateLimitBackend:
+    """
+    Counters in a Redis-compatible store, shared by every worker
+
+    Each window bucket is its own key ({prefix}:{key}:{window_index}) and
+    expires after two windows, so idle keys evict themselves.
+    """
+
+    def __init__(self, store=None, prefix: str = "valis:rl"):
+        self.store = store or get_shared_store()
+        self.prefix = prefix
+
+    def _bucket(self, key: str, window_index: int) -> str:
+        return f"{self.prefix}:{key}:{window_index}"
+
+    def increment(self, key: str, window_index: int, window: int, amount: int = 1) -> Tuple[int, int]:
+        current_key = self._bucket(key, window_index)
+        pipe = self.store.pipeline()
+        pipe.incr(current_key, amount)
+        pipe.expire(current_key, window * 2)
+        pipe.get(self._bucket(key, window_index - 1))
+        current, _, previous = pipe.execute()
+        return int(previous or 0), int(current)
+
+    def decrement(self, key: str, window_index: int, window: int, amount: int = 1):
+        self.store.decr(self._bucket(key, window_index), amount)
+
+    def size(self) -> int:
+        return -1  # Not tracked; keys expire in the store
+
+
+def create_rate_limit_backend(window: int, name: str = "default"):
+    """
+    Build the backend selected by VALIS_RATE_LIMIT_BACKEND
+
+    "memory" (default) keeps counters per process; "shared" keeps them in
+    the shared store (Redis when VALIS_REDIS_URL is set, otherwise the
+    local stand-in) so limits hold across workers.
+    """
+    backend = os.getenv('VALIS_RATE_LIMIT_BACKEND', 'memory')
+    if backend == 'shared':
+        return SharedStoreRateLimitBackend(prefix=f"valis:rl:{name}")
+    return InMemoryRateLimitBackend(idle_ttl=window * 2)
+
+
+class RateLimiter:
+    """Sliding-window rate limiter: `limit` requests per `window` seconds per key"""
+
+    def __init__(self, limit: int, window: int, backend=None, name: str = "default"):
+        self.limit = limit
+        self.window = window
+        self.name = name
+        self.backend = backend or create_rate_limit_backend(window, name)
+        logger.info(f"RateLimiter '{name}': {limit} requests / {window}s ({type(self.backend).__name__})")
+
+    def check(self, key: str, cost: int = 1) -> Dict[str, Any]:
+        """
+        Count a request for key and decide whether it is allowed
+
+        cost is how many requests it counts as (e.g. the items of a batch);
+        a rejected request is not counted. A cost above the limit could
+        never be allowed, so it raises ValueError instead of being rejected
+        with a retry_after that can never be met.
+
+        Returns:
+        {
+            "allowed": bool,
+            "limit": int,
+            "remaining": int,
+            "retry_after": int (seconds, 0 when allowed),
+            "reset_time": float (epoch seconds when a request will be allowed)
+        }
+        """
+        if cost > self.limit:
+            raise ValueError(f"Cost {cost} exceeds the rate limit of {self.limit} per {self.window}s")
+
+        now = time.time()
+        window_index = int(now // self.window)
+        elapsed_fraction = (now % self.window) / self.window
+
+        previous, current = self.backend.increment(key, window_index, self.window, cost)
+        # Estimate before this request was counted
+        estimate = previous * (1 - elapsed_fraction) + (current - cost)
+        # Allowed while the estimate is below threshold (limit for a single request)
+        threshold = self.limit - cost + 1
+
+        if estimate >= threshold:
+            self.backend.decrement(key, window_index, self.window, cost)
+            retry_after = self._retry_after(previous, current - cost, elapsed_fraction, threshold)
+            return {
+                "allowed": False,
+                "limit": self.limit,
+                "remaining": 0,
+                "retry_after": retry_after,
+                "reset_time": now + retry_after
+            }
+
+        return {
+            "allowed": True,
+            "limit": self.limit,
+            "remaining": max(int(self.limit - estimate - cost), 0),
+            "retry_after": 0,
+            "reset_time": now
+        }
+
+    def _retry_after(self, previous: int, current: int, elapsed_fraction: float, threshold: float = None) -> int:
+        """Seconds until the sliding estimate drops below threshold (the limit by default)"""
+        threshold = self.limit if threshold is None else threshold
+        remaining_in_window = self.window * (1 - elapsed_fraction)
+        if current >= threshold or previous == 0:
+            return max(1, math.ceil(remaining_in_window))
+        # Solve previous * (1 - f - t/window) + current < threshold for t
+        wait = remaining_in_window - self.window * (threshold - current) / previous
+        return max(1, math.ceil(wait))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "window": self.window,
+            "backend": type(self.backend).__name__,
+            "tracked_keys": self.backend.size()
+        }
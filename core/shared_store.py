@@ -0,0 +1,190 @@
+"""
+VALIS 2.0 Shared Store
+Redis-compatible key/value store shared across workers, with a local stand-in
+
+Components that need cross-worker state (rate limits, cache invalidation)
+talk to a small Redis command subset, plus Redis pub/sub for fanning
+events out to every worker. In production that is a real Redis
+(VALIS_REDIS_URL); in development and single-process deployments the
+LocalSharedStore stand-in implements the same calls in memory.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("SharedStore")
+
+
+class LocalSharedStore:
+    """
+    In-process stand-in for the Redis commands VALIS uses
+
+    Supports: get, set, incr, decr, expire, delete, pipeline, publish,
+    pubsub. Values are stored as strings/ints like Redis; expired keys are
+    dropped lazily on access. Published messages reach the subscribers in
+    this process only, delivered synchronously in the publisher's thread.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+            return False
+        return key in self._data
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key: str, value: Any, ex: int = None) -> bool:
+        with self._lock:
+            self._data[key] = value
+            if ex:
+                self._expiry[key] = time.monotonic() + ex
+            else:
+                self._expiry.pop(key, None)
+            return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._data[key]) + amount if self._alive(key) else amount
+            self._data[key] = value
+            return value
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        return self.incr(key, -amount)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expiry[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expiry.pop(key, None)
+            return removed
+
+    def pipeline(self) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    def publish(self, channel: str, message: str) -> int:
+        """Deliver message to the channel's handlers; returns the number reached, like Redis"""
+        with self._lock:
+            handlers = list(self._subscribers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler({"type": "message", "pattern": None, "channel": channel, "data": message})
+            except Exception as e:
+                logger.error(f"Subscriber to '{channel}' failed: {e}")
+        return len(handlers)
+
+    def pubsub(self) -> "LocalPubSub":
+        return LocalPubSub(self)
+
+
+class LocalPipeline:
+    """Queues commands and runs them under one lock, like a Redis MULTI pipeline"""
+
+    def __init__(self, store: LocalSharedStore):
+        self._store = store
+        self._commands: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        command = getattr(self._store, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self._store._lock:
+            results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class LocalPubSub:
+    """
+    Stand-in for redis-py's PubSub with handler callbacks
+
+    Only the handler style is supported: subscribe(**{channel: handler})
+    followed by run_in_thread(); messages are pushed by publish(), so no
+    thread is needed and run_in_thread returns this object for stop().
+    """
+
+    def __init__(self, store: LocalSharedStore):
+        self._store = store
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+
+    def subscribe(self, **handlers: Callable[[Dict[str, Any]], None]):
+        with self._store._lock:
+            for channel, handler in handlers.items():
+                self._handlers[channel] = handler
+                self._store._subscribers.setdefault(channel, []).append(handler)
+
+    def unsubscribe(self, *channels: str):
+        with self._store._lock:
+            for channel in channels or list(self._handlers):
+                handler = self._handlers.pop(channel, None)
+                if handler is not None:
+                    self._store._subscribers[channel].remove(handler)
+
+    def run_in_thread(self, sleep_time: float = 0.0, daemon: bool = True) -> "LocalPubSub":
+        return self
+
+    def stop(self):
+        self.unsubscribe()
+
+    def close(self):
+        self.unsubscribe()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def spans_processes(store) -> bool:
+    """True when store is shared with other processes (Redis), not the in-process stand-in"""
+    return not isinstance(store, LocalSharedStore)
+
+
+def get_shared_store():
+    """
+    Get the process-wide shared store
+
+    Uses Redis when VALIS_REDIS_URL is set and the redis package is
+    installed, otherwise the in-process stand-in.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            redis_url = os.getenv('VALIS_REDIS_URL')
+            if redis_url:
+                try:
+                    import redis
+                    _shared_store = redis.Redis.from_url(redis_url, decode_responses=True)
+                    logger.info(f"Shared store: redis at {redis_url}")
+                except ImportError:
+                    logger.warning("VALIS_REDIS_URL set but redis package missing - using local stand-in")
+            if _shared_store is None:
+                _shared_store = LocalSharedStore()
+                logger.info("Shared store: local in-process stand-in")
+        return _shared_store
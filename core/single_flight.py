@@ -0,0 +1,207 @@
+"""
+VALIS 2.0 Single-Flight Request Coalescing
+Concurrent identical calls share one in-flight execution
+
+The first caller for a key (the leader) runs the call; callers arriving
+with the same key while it is in flight wait for it and receive the same
+result, or the same exception. With a coalescing window, a successful
+result is also handed to identical callers arriving up to window_ms
+after it completed, which absorbs staggered retry storms. A follower
+waits no longer than its own request deadline (DeadlineExceeded), which
+may be shorter than the leader's.
+
+Configured by "coalescing" in config/providers.json:
+
+    "coalescing": {
+        "enabled": true,
+        "window_ms": 250
+    }
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Counter
+
+from core.deadline import DeadlineExceeded, cap_timeout, exceeded, within_deadline
+
+logger = logging.getLogger("SingleFlight")
+
+COALESCED_REQUESTS = Counter(
+    'valis_coalesced_requests_total',
+    'Calls through single-flight groups by outcome',
+    ['flight', 'result']  # leader | shared | window
+)
+
+
+class _Call:
+    """One in-flight synchronous execution and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread- and asyncio-safe call coalescing keyed by a caller-supplied string"""
+
+    def __init__(self, name: str, window_seconds: float = 0.0, max_recent: int = 1000):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.max_recent = max_recent
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[tuple, asyncio.Future] = {}   # (loop id, key) -> shared task
+        self._waiters: Dict[tuple, int] = {}
+        self._recent: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (finished_at, result)
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0, "window_hits": 0}
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict[str, Any]) -> Optional["SingleFlight"]:
+        """Build a flight group from providers.json settings; None when disabled"""
+        if not config or not config.get("enabled"):
+            return None
+        flight = cls(
+            name,
+            window_seconds=config.get("window_ms", 0) / 1000,
+            max_recent=config.get("max_recent", 1000)
+        )
+        logger.info(f"Request coalescing enabled for '{name}': window {config.get('window_ms', 0)}ms")
+        return flight
+
+    def do(self, key: str, fn: Callable[[], Any],
+           retain: Callable[[Any], bool] = None) -> Any:
+        """
+        Run fn once per key across concurrent callers
+
+        retain decides whether a result may be reused within the coalescing
+        window (e.g. only successful completions); defaults to always.
+        """
+        with self._lock:
+            recent = self._recent_result(key)
+            if recent is not None:
+                self._count("window")
+                return self._shared(recent)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count("leader" if leader else "shared")
+
+        if not leader:
+            if not call.done.wait(cap_timeout(None)):
+                exceeded(f"coalesce.{self.name}")
+                raise DeadlineExceeded(f"coalesce.{self.name}")
+            if call.error is not None:
+                raise call.error
+            return self._shared(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._remember(key, call.result, retain)
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]],
+                       retain: Callable[[Any], bool] = None) -> Any:
+        """
+        Await fn once per key across concurrent coroutines on this loop
+
+        The shared call runs as its own task, so one waiter being cancelled
+        (e.g. a lost hedge) or running out of deadline does not cancel it
+        for the others; it is only cancelled when every waiter has gone.
+        """
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            recent = self._recent_result(key)
+            if recent is not None:
+                self._count("window")
+                return self._shared(recent)
+            task = self._tasks.get(flight_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[flight_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda t: self._task_done(flight_key, t, retain))
+            self._waiters[flight_key] = self._waiters.get(flight_key, 0) + 1
+            self._count("leader" if leader else "shared")
+
+        try:
+            result = await within_deadline(asyncio.shield(task), f"coalesce.{self.name}")
+        except (asyncio.CancelledError, DeadlineExceeded):
+            with self._lock:
+                abandoned = self._release_waiter(flight_key) == 0
+            if abandoned and not task.done():
+                task.cancel()
+            raise
+        with self._lock:
+            self._release_waiter(flight_key)
+        return result if leader else self._shared(result)
+
+    def _task_done(self, flight_key: tuple, task: asyncio.Future, retain: Optional[Callable[[Any], bool]]):
+        with self._lock:
+            if self._tasks.get(flight_key) is task:
+                del self._tasks[flight_key]
+            if not task.cancelled() and task.exception() is None:
+                self._remember(flight_key[1], task.result(), retain)
+
+    def _release_waiter(self, flight_key: tuple) -> int:
+        remaining = self._waiters.get(flight_key, 1) - 1
+        if remaining > 0:
+            self._waiters[flight_key] = remaining
+        else:
+            self._waiters.pop(flight_key, None)
+        return remaining
+
+    def _recent_result(self, key: str):
+        """Result finished within the coalescing window (caller holds the lock)"""
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.window_seconds:
+            del self._recent[key]
+            return None
+        return entry[1]
+
+    def _remember(self, key: str, result: Any, retain: Optional[Callable[[Any], bool]]):
+        """Keep a finished result for the coalescing window (caller holds the lock)"""
+        if self.window_seconds <= 0 or (retain is not None and not retain(result)):
+            return
+        self._recent[key] = (time.time(), dict(result) if isinstance(result, dict) else result)
+        self._recent.move_to_end(key)
+        cutoff = time.time() - self.window_seconds
+        while self._recent and (len(self._recent) > self.max_recent
+                                or next(iter(self._recent.values()))[0] < cutoff):
+            self._recent.popitem(last=False)
+
+    def _count(self, result: str):
+        self.stats[{"leader": "leaders", "shared": "shared", "window": "window_hits"}[result]] += 1
+        COALESCED_REQUESTS.labels(flight=self.name, result=result).inc()
+
+    def _shared(self, result: Any) -> Any:
+        """Copy handed to a follower, marked as coalesced"""
+        if isinstance(result, dict):
+            return {**result, "coalesced": True}
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.stats.values())
+            return {
+                **self.stats,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "recent": len(self._recent),
+                "window_ms": self.window_seconds * 1000,
+                "coalesced_rate": round((total - self.stats["leaders"]) / total, 3) if total else 0.0
+            }
@@ -0,0 +1,115 @@
+"""
+VALIS 2.0 Telemetry
+Lightweight request spans, Server-Timing headers and Prometheus histograms
+
+Usage:
+    with span("memory_layers"):
+        ...
+
+Every span is observed in the valis_span_duration_seconds histogram. When a
+request has called start_request(), the span is also recorded for that
+request and reported back in its Server-Timing header.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+# Spans recorded for the current request. The list is shared (not copied)
+# when the context is copied into executor threads, so spans recorded
+# there still land on the request.
+_request_spans: contextvars.ContextVar = contextvars.ContextVar('request_spans', default=None)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SPAN_DURATION = Histogram(
+    'valis_span_duration_seconds',
+    'Duration of instrumented request phases',
+    ['span'],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUEST_DURATION = Histogram(
+    'valis_request_duration_seconds',
+    'End-to-end HTTP request duration',
+    ['endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+
+
+def start_request() -> List[Tuple[str, float]]:
+    """Begin collecting spans for the current request"""
+    spans: List[Tuple[str, float]] = []
+    _request_spans.set(spans)
+    return spans
+
+
+def get_request_spans() -> Optional[List[Tuple[str, float]]]:
+    return _request_spans.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block and record it under name"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start_time)
+
+
+def record_span(name: str, duration: float):
+    """Record an already measured duration (seconds)"""
+    SPAN_DURATION.labels(span=name).observe(duration)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration))
+
+
+def timed(name: str):
+    """Decorator form of span() for plain functions"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(spans: List[Tuple[str, float]], total: float = None) -> str:
+    """
+    Format spans as a Server-Timing header value
+
+    Repeated spans (e.g. several db.query calls) are summed into one entry
+    with the call count as its description.
+    """
+    totals = {}
+    for name, duration in spans:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += duration
+        entry[1] += 1
+
+    parts = []
+    for name, (duration, count) in totals.items():
+        part = f"{name};dur={duration * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe_request(endpoint: str, method: str, status: int, duration: float):
+    REQUEST_DURATION.labels(endpoint=endpoint, method=method, status=str(status)).observe(duration)
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """Prometheus exposition body and content type for /metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,289 @@
+"""
+VALIS 2.0 Prompt Template Registry
+Persona prompt templates compiled once and rendered by joining fragments
+
+Templates live in core/prompt_templates/<persona_id>.txt (str.format
+syntax with {persona_name}, {persona_role}, {persona_bio},
+{memory_context}, {user_input}); personas without a file use
+DEFAULT_TEMPLATE. All files are read and split into literal/field
+fragments when the registry is built (during startup warm-up), and a
+template bound to a persona has the static persona fields already
+substituted, so rendering is a single join of the precomputed fragments
+with the memory context and user input.
+
+File changes are picked up by a background thread that stats the
+directory every VALIS_TEMPLATE_POLL_SECONDS (default 5; 0 disables), so
+requests never touch the filesystem. A file that cannot be read or
+parsed is counted in stats["errors"] and skipped until it changes again;
+its persona keeps the previously compiled version (or the default).
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.lazy_init import lazy
+
+logger = logging.getLogger("TemplateRegistry")
+
+TEMPLATE_DIR = Path(os.getenv('VALIS_TEMPLATE_DIR', Path(__file__).resolve().parent / "prompt_templates"))
+TEMPLATE_POLL_SECONDS = float(os.getenv('VALIS_TEMPLATE_POLL_SECONDS', '5'))
+
+DEFAULT_TEMPLATE = """You are {persona_name}, {persona_role}.
+
+{persona_bio}
+
+{memory_context}
+
+Current conversation:
+User: {user_input}
+{persona_name}:"""
+
+STATIC_FIELDS = ("persona_name", "persona_role", "persona_bio")
+DYNAMIC_FIELDS = ("memory_context", "user_input")
+
+# Bound (persona-substituted) variants kept per template
+MAX_BOUND_PER_TEMPLATE = 256
+
+
+def _compile(source: str) -> Optional[List[Any]]:
+    """
+    Fragments of a str.format template: literal strings and (field,) tuples
+
+    None when the template uses anything beyond plain named fields
+    (format specs, conversions, attribute/index access); such templates
+    are rendered with str.format.
+    """
+    fragments = []
+    for literal, field, spec, conversion in Formatter().parse(source):
+        if literal:
+            fragments.append(literal)
+        if field is None:
+            continue
+        if spec or conversion or field not in STATIC_FIELDS + DYNAMIC_FIELDS:
+            return None
+        fragments.append((field,))
+    return fragments
+
+
+def _substitute(fragments: List[Any], values: Dict[str, str]) -> List[Any]:
+    """Replace the fields present in values and merge adjacent literals"""
+    merged: List[Any] = []
+    for fragment in fragments:
+        if isinstance(fragment, tuple) and fragment[0] in values:
+            fragment = values[fragment[0]]
+        if isinstance(fragment, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += fragment
+        elif fragment != "":
+            merged.append(fragment)
+    return merged
+
+
+def _join(fragments: List[Any], values: Dict[str, str]) -> str:
+    return "".join(values[fragment[0]] if isinstance(fragment, tuple) else fragment for fragment in fragments)
+
+
+class BoundTemplate:
+    """A template with one persona's name, role and bio filled in"""
+
+    def __init__(self, template: "PromptTemplate", fields: Dict[str, str]):
+        self.template = template
+        self.fields = fields
+        if template.compiled:
+            head_fields = fields if template.context_in_head else {**fields, "memory_context": ""}
+            self.full = _substitute(template.fragments, fields)
+            self.head = _substitute(template.head_fragments, head_fields)
+            self.tail = _substitute(template.tail_fragments, {**fields, "memory_context": ""})
+
+    def render(self, memory_context: str, user_input: str) -> str:
+        """The whole prompt (template layout)"""
+        values = {"memory_context": memory_context, "user_input": user_input}
+        if not self.template.compiled:
+            return self.template.source.format(**self.fields, **values)
+        return _join(self.full, values)
+
+    def render_layered(self, stable_context: str, volatile_context: str, user_input: str) -> Tuple[str, str]:
+        """
+        (stable prefix, volatile suffix): the template up to the cut with
+        the stable context, then the volatile context and the rest
+        """
+        template = self.template
+        if not template.compiled:
+            head = template.source[:template.cut].format(
+                memory_context=stable_context if template.context_in_head else "",
+                user_input=user_input, **self.fields)
+            tail = template.source[template.cut:].format(memory_context="", user_input=user_input, **self.fields)
+        else:
+            values = {"memory_context": stable_context, "user_input": user_input}
+            head, tail = _join(self.head, values), _join(self.tail, values)
+        stable = head.strip()
+        if not template.context_in_head:
+            stable = "\n\n".join(part for part in (stable, stable_context) if part)
+        volatile = "\n\n".join(part for part in (volatile_context, tail.strip()) if part)
+        return stable, volatile
+
+
+class PromptTemplate:
+    """One template file (or the default), compiled, with its persona-bound variants"""
+
+    def __init__(self, name: str, source: str, signature: Tuple[int, int] = None):
+        self.name = name
+        self.source = source
+        self.signature = signature   # (mtime_ns, size) of the file it was read from
+
+        # Layered split: after {memory_context} when it precedes {user_input},
+        # otherwise at the start of the {user_input} line
+        user_at = source.find("{user_input}")
+        if user_at < 0:
+            user_at = len(source)
+        context_at = source.find("{memory_context}")
+        self.context_in_head = 0 <= context_at < user_at
+        if self.context_in_head:
+            self.cut = context_at + len("{memory_context}")
+        else:
+            self.cut = source.rfind("\n", 0, user_at) + 1
+
+        self.fragments = _compile(source)
+        self.compiled = self.fragments is not None
+        if self.compiled:
+            self.head_fragments = _compile(source[:self.cut])
+            self.tail_fragments = _compile(source[self.cut:])
+
+        self._bound: Dict[Tuple[str, str, str], BoundTemplate] = {}
+        self._lock = threading.Lock()
+
+    def bind(self, persona_data: Dict[str, Any]) -> BoundTemplate:
+        """The template with persona_data's name, role and bio substituted (cached)"""
+        fields = {
+            "persona_name": persona_data.get("name", "Assistant"),
+            "persona_role": persona_data.get("role", "AI Assistant"),
+            "persona_bio": persona_data.get("bio", "")
+        }
+        key = (fields["persona_name"], fields["persona_role"], fields["persona_bio"])
+        bound = self._bound.get(key)
+        if bound is None:
+            bound = BoundTemplate(self, fields)
+            with self._lock:
+                if len(self._bound) >= MAX_BOUND_PER_TEMPLATE:
+                    self._bound.clear()
+                self._bound[key] = bound
+        return bound
+
+
+class TemplateRegistry:
+    """Compiled persona templates, refreshed by polling the template directory"""
+
+    def __init__(self, directory: Path = TEMPLATE_DIR, poll_seconds: float = TEMPLATE_POLL_SECONDS):
+        self.directory = Path(directory)
+        self.poll_seconds = poll_seconds
+        self.default = PromptTemplate("default", DEFAULT_TEMPLATE)
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._failed: Dict[str, Tuple[int, int]] = {}   # name -> signature that failed to load
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"loads": 0, "reloads": 0, "removed": 0, "polls": 0, "errors": 0}
+        self.refresh()
+
+    def template_for(self, persona_id: str) -> PromptTemplate:
+        """Template for a persona (no filesystem access)"""
+        return self._templates.get(persona_id, self.default)
+
+    def refresh(self) -> Dict[str, int]:
+        """Load new and changed template files, drop deleted ones; returns counts"""
+        current = self._scan()
+        loaded = reloaded = 0
+        with self._lock:
+            templates = dict(self._templates)
+            for name, (path, signature) in current.items():
+                existing = templates.get(name)
+                if existing is not None and existing.signature == signature:
+                    continue
+                if self._failed.get(name) == signature:
+                    continue
+                try:
+                    templates[name] = PromptTemplate(name, path.read_text(), signature)
+                except (OSError, ValueError) as e:
+                    # Unreadable or malformed (e.g. a stray brace): the persona keeps
+                    # its previous version, or the default, until the file changes
+                    self._failed[name] = signature
+                    self.stats["errors"] += 1
+                    fallback = "previous version" if existing is not None else "default"
+                    logger.error(f"Failed to load prompt template {path}, using {fallback}: {e}")
+                    continue
+                self._failed.pop(name, None)
+                if existing is None:
+                    loaded += 1
+                else:
+                    reloaded += 1
+                    logger.info(f"Prompt template '{name}' changed, reloaded")
+            removed = [name for name in templates if name not in current]
+            for name in removed:
+                del templates[name]
+                logger.info(f"Prompt template '{name}' removed, using default")
+            for name in [name for name in self._failed if name not in current]:
+                del self._failed[name]
+            # Swapped whole so readers never see a half-updated mapping
+            self._templates = templates
+            self.stats["loads"] += loaded
+            self.stats["reloads"] += reloaded
+            self.stats["removed"] += len(removed)
+        return {"loaded": loaded, "reloaded": reloaded, "removed": len(removed)}
+
+    def _scan(self) -> Dict[str, Tuple[Path, Tuple[int, int]]]:
+        """name -> (path, (mtime_ns, size)) of every *.txt template"""
+        found = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".txt") and entry.is_file():
+                        info = entry.stat()
+                        found[entry.name[:-4]] = (Path(entry.path), (info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to scan prompt templates in {self.directory}: {e}")
+        return found
+
+    def start(self):
+        """Poll for template changes in the background"""
+        if self.poll_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="template-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.stats["polls"] += 1
+            try:
+                self.refresh()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Prompt template refresh failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "directory": str(self.directory),
+            "templates": sorted(self._templates),
+            "poll_seconds": self.poll_seconds
+        }
+
+
+def _build_registry() -> TemplateRegistry:
+    registry = TemplateRegistry()
+    registry.start()
+    logger.info(f"Prompt templates: {len(registry._templates)} compiled from {registry.directory}")
+    return registry
+
+
+# Global instance (compiled during startup warm-up)
+template_registry = lazy("template_registry", _build_registry)
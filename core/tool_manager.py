@@ -15,6 +15,8 @@ from pathlib import Path
 
 from memory.db import db
 from tools.valis_tools import valis_tools
+from core.lazy_init import lazy
+from core.deadline import exceeded, has_budget
 
 logger = logging.getLogger("ToolManager")
 
@@ -146,6 +148,16 @@ class ToolManager:
                     "execution_id": execution_id
                 }
             
+            # Do not start a tool the request no longer has time to wait for
+            if not has_budget():
+                exceeded(f"tool.{tool_name}")
+                return {
+                    "success": False,
+                    "error": "Request deadline exceeded",
+                    "deadline_exceeded": True,
+                    "execution_id": execution_id
+                }
+            
             # Execute tool
             tool_handler = self.tools[tool_name]["handler"]
             result = tool_handler(**parameters)
@@ -309,4 +321,4 @@ class ToolManager:
 
 
 # Global instance for use across VALIS
-tool_manager = ToolManager()
+tool_manager = lazy("tool_manager", ToolManager)
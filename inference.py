@@ -4,8 +4,17 @@ VALIS 2.0 Inference Entrypoint
 Clean, simple entry point for all inference requests
 """
 
+import atexit
+import contextvars
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
 from core.provider_manager import ProviderManager
+from core.async_runtime import run_blocking
+from core.lazy_init import startup
+from core.deadline import deadline_scope, start_deadline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +30,10 @@ def initialize():
     logger.info("🧠 VALIS 2.0 BOOTSTRAPPING...")
     
     try:
-        provider_manager = ProviderManager()
+        with startup.phase("initialize"):
+            provider_manager = ProviderManager()
+            if startup.mode == "eager":
+                startup.warm_up()
         status = provider_manager.get_status()
         
         logger.info(f"✓ Cascade: {status['cascade']}")
@@ -33,6 +45,15 @@ def initialize():
         logger.error(f"✗ Bootstrap failed: {e}")
         return False
 
+def shutdown():
+    """Stop the provider manager's background threads (ASGI lifespan, atexit)"""
+    global provider_manager
+    if provider_manager is not None:
+        provider_manager.stop()
+        provider_manager = None
+
+atexit.register(shutdown)
+
 def run_inference(prompt: str, client_id: str = "default", 
                  persona_id: str = "kai") -> dict:
     """
@@ -55,13 +76,115 @@ def run_inference(prompt: str, client_id: str = "default",
     logger.info(f"Prompt: {prompt[:100]}...")
     logger.info(f"Client: {client_id}, Persona: {persona_id}")
     
-    # Route through provider manager
-    result = provider_manager.ask(prompt, client_id, persona_id)
+    # Route through provider manager, within the request's deadline
+    with deadline_scope():
+        result = provider_manager.ask(prompt, client_id, persona_id)
+    
+    logger.info(f"Result: {result.get('success')} via {result.get('provider_used')}")
+    
+    return result
+
+async def run_inference_async(prompt: str, client_id: str = "default",
+                              persona_id: str = "kai") -> dict:
+    """
+    Async inference entry point for the ASGI serving mode
+    
+    Same contract as run_inference(); the provider cascade runs on the
+    event loop instead of holding a worker thread for the whole request.
+    """
+    
+    if provider_manager is None:
+        if not await run_blocking(initialize):
+            return {"success": False, "error": "System not initialized"}
+    
+    logger.info(f"=== INFERENCE REQUEST (async) ===")
+    logger.info(f"Prompt: {prompt[:100]}...")
+    logger.info(f"Client: {client_id}, Persona: {persona_id}")
+    
+    with deadline_scope():
+        result = await provider_manager.ask_async(prompt, client_id, persona_id)
     
     logger.info(f"Result: {result.get('success')} via {result.get('provider_used')}")
     
     return result
 
+# Provider calls in flight at once for a single batch request
+BATCH_CONCURRENCY = int(os.getenv('VALIS_BATCH_CONCURRENCY', '8'))
+
+def run_inference_batch(items: List[Dict[str, str]], max_concurrency: int = None,
+                        item_timeout: float = None) -> List[dict]:
+    """
+    Run many independent inference requests concurrently
+    
+    Args:
+        items: [{"prompt", "client_id", "persona_id"}, ...]
+        max_concurrency: Provider calls in flight at once (VALIS_BATCH_CONCURRENCY)
+        item_timeout: Budget of each item, started when the item starts
+            running (VALIS_REQUEST_TIMEOUT)
+        
+    Returns:
+        One result per item, in order (same shape as run_inference)
+    """
+    
+    if provider_manager is None:
+        if not initialize():
+            return [{"success": False, "error": "System not initialized"} for _ in items]
+    
+    max_concurrency = max(1, min(max_concurrency or BATCH_CONCURRENCY, len(items) or 1))
+    logger.info(f"=== BATCH INFERENCE REQUEST: {len(items)} items, concurrency {max_concurrency} ===")
+    
+    def run_item(item):
+        # Own deadline per item; queued items do not spend each other's budget
+        start_deadline(item_timeout)
+        try:
+            return provider_manager.ask(item["prompt"], item["client_id"], item["persona_id"])
+        except Exception as e:
+            logger.error(f"Batch item failed: {e}")
+            return {"success": False, "error": str(e)}
+    
+    # Each item runs in its own copy of the caller's context (memory prefetch, request spans)
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="valis-batch") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run_item, item) for item in items]
+        results = [future.result() for future in futures]
+    
+    logger.info(f"Batch result: {sum(1 for r in results if r.get('success'))}/{len(results)} succeeded")
+    
+    return results
+
+def stream_inference(prompt: str, client_id: str = "default",
+                     persona_id: str = "kai"):
+    """
+    Streaming inference entry point
+    
+    Yields cascade events ({"event": "token"} ... {"event": "done"}),
+    see ProviderManager.stream.
+    """
+    
+    if provider_manager is None:
+        if not initialize():
+            yield {"event": "done", "success": False, "error": "System not initialized"}
+            return
+    
+    logger.info(f"=== STREAMING INFERENCE REQUEST ===")
+    logger.info(f"Client: {client_id}, Persona: {persona_id}")
+    
+    yield from provider_manager.stream(prompt, client_id, persona_id)
+
+async def stream_inference_async(prompt: str, client_id: str = "default",
+                                 persona_id: str = "kai"):
+    """Async variant of stream_inference() for the ASGI serving mode"""
+    
+    if provider_manager is None:
+        if not await run_blocking(initialize):
+            yield {"event": "done", "success": False, "error": "System not initialized"}
+            return
+    
+    logger.info(f"=== STREAMING INFERENCE REQUEST (async) ===")
+    logger.info(f"Client: {client_id}, Persona: {persona_id}")
+    
+    async for event in provider_manager.stream_async(prompt, client_id, persona_id):
+        yield event
+
 if __name__ == "__main__":
     # Test the system
     print("Testing VALIS 2.0...")
@@ -4,11 +4,16 @@ PostgreSQL connection and helper functions
 """
 import psycopg2
 import psycopg2.pool
+import psycopg2.extras
 import os
 import json
 from typing import Dict, List, Any, Optional
 from contextlib import contextmanager
 
+from core import telemetry
+from core.lazy_init import lazy
+from core.deadline import check_deadline, get_deadline
+
 class DatabaseClient:
     def __init__(self):
         self.connection_pool = None
@@ -36,9 +41,15 @@ class DatabaseClient:
     
     @contextmanager
     def get_connection(self):
-        """Get database connection from pool"""
+        """
+        Get database connection from pool
+        
+        Refuses to check out a connection once the request deadline has
+        passed; the pool rolls back any transaction left open on release.
+        """
         if not self.connection_pool:
             raise Exception("Database pool not initialized")
+        check_deadline('db')
         
         conn = self.connection_pool.getconn()
         try:
@@ -46,20 +57,33 @@ class DatabaseClient:
         finally:
             self.connection_pool.putconn(conn)
     
+    def _bounded(self, sql: str) -> str:
+        """
+        sql prefixed with SET LOCAL statement_timeout of the request's
+        remaining budget (unchanged without a deadline)
+        
+        Sent in the same execute as the statement, so bounding a query
+        costs no extra round trip; the setting ends with the transaction.
+        """
+        deadline = get_deadline()
+        if deadline is None:
+            return sql
+        return f"SET LOCAL statement_timeout = {max(int(deadline.remaining() * 1000), 1)}; {sql}"
+    
     def query(self, sql: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Execute SELECT query and return results as list of dicts"""
-        with self.get_connection() as conn:
+        with telemetry.span('db.query'), self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, params)
+                cur.execute(self._bounded(sql), params)
                 columns = [desc[0] for desc in cur.description]
                 rows = cur.fetchall()
                 return [dict(zip(columns, row)) for row in rows]
     
     def execute(self, sql: str, params: tuple = None) -> int:
         """Execute INSERT/UPDATE/DELETE and return affected rows"""
-        with self.get_connection() as conn:
+        with telemetry.span('db.execute'), self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, params)
+                cur.execute(self._bounded(sql), params)
                 conn.commit()
                 return cur.rowcount
     
@@ -69,11 +93,31 @@ class DatabaseClient:
         placeholders = ', '.join(['%s'] * len(columns))
         sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING id"
         
-        with self.get_connection() as conn:
+        with telemetry.span('db.insert'), self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(values.values()))
+                cur.execute(self._bounded(sql), tuple(values.values()))
                 conn.commit()
                 return cur.fetchone()[0]
 
-# Global instance
-db = DatabaseClient()
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows (same keys) in one multi-row statement and commit; returns row count"""
+        if not rows:
+            return 0
+        columns = list(rows[0].keys())
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        
+        with telemetry.span('db.insert_many'), self.get_connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    psycopg2.extras.execute_values(
+                        cur, self._bounded(sql), [tuple(row[c] for c in columns) for row in rows],
+                        page_size=len(rows)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return len(rows)
+
+# Global instance (the pool is opened on first use or during warm-up)
+db = lazy("database", DatabaseClient)
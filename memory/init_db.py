@@ -38,6 +38,10 @@ def init_database():
                 cur.execute(schema_sql)
                 conn.commit()
         
+        # The schema recreates every profile table: drop all cached profiles
+        from memory.profile_cache import profile_cache
+        profile_cache.invalidate_all()
+        
         print("OK Database schema initialized successfully")
         return True
         
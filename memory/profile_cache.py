@@ -0,0 +1,267 @@
+"""
+VALIS 2.0 Profile Cache
+Read-through cache for persona, client and personality profile rows
+
+Every chat turn looks up the same persona_profiles / client_profiles /
+agent_personality_profiles rows several times (server.chat, MCPRuntime,
+PersonalityEngine), and they change rarely. Rows are cached per worker,
+bounded by entry count (LRU) and age (TTL); lookups of missing rows are
+cached too.
+
+Writers call invalidate(kind, key) after changing a row. The entry is
+dropped locally and the invalidation is published on the shared store
+(core.shared_store) so every other worker drops it as well; the TTL bounds
+staleness if a message is lost. Each invalidation bumps the cache version,
+and a load that raced an invalidation is returned but not stored. With
+several worker processes and no Redis (VALIS_REDIS_URL) invalidations
+cannot reach the other workers, so the cache is turned off at startup
+(see check_workers).
+
+Environment:
+    VALIS_PROFILE_CACHE        "false" disables the cache
+    VALIS_PROFILE_CACHE_SIZE   max entries per worker (default 2048)
+    VALIS_PROFILE_CACHE_TTL    seconds an entry is served (default 300)
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from prometheus_client import Counter
+
+from core.shared_store import get_shared_store, spans_processes
+
+logger = logging.getLogger("ProfileCache")
+
+PROFILE_CACHE_ENABLED = os.getenv('VALIS_PROFILE_CACHE', 'true').lower() != 'false'
+PROFILE_CACHE_SIZE = int(os.getenv('VALIS_PROFILE_CACHE_SIZE', '2048'))
+PROFILE_CACHE_TTL = float(os.getenv('VALIS_PROFILE_CACHE_TTL', '300'))
+
+INVALIDATION_CHANNEL = 'valis:profile-invalidations'
+
+# Kinds of cached rows
+PERSONA = 'persona'
+CLIENT = 'client'
+TRAITS = 'traits'     # agent_personality_profiles row(s) of a persona
+
+CACHE_REQUESTS = Counter(
+    'valis_profile_cache_requests_total',
+    'Profile cache lookups by kind and result',
+    ['kind', 'result']  # hit | miss
+)
+INVALIDATIONS = Counter(
+    'valis_profile_cache_invalidations_total',
+    'Profile cache invalidations by origin',
+    ['origin']  # local | remote
+)
+
+_MISSING = object()
+
+
+class ProfileCache:
+    """Thread-safe LRU + TTL cache of profile rows with cross-worker invalidation"""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300,
+                 enabled: bool = True, store=None, channel: str = INVALIDATION_CHANNEL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.version = 0   # bumped on every invalidation
+        self._store = store
+        self._subscription = None
+        self._subscribe_lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (kind, key) -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale_loads": 0, "evictions": 0, "expired": 0,
+                      "invalidations": 0, "remote_invalidations": 0}
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached value of (kind, key), or loader() stored for later lookups"""
+        if not self.enabled:
+            return loader()
+        self._ensure_subscribed()
+        ident = (kind, str(key))
+        value, version = self._lookup(ident)
+        if value is not _MISSING:
+            return copy.deepcopy(value)
+        value = loader()
+        self._store_value(ident, value, version)
+        return copy.deepcopy(value)
+
+    def get_many(self, kind: str, keys: Iterable[Hashable],
+                 loader: Callable[[list], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Values for many keys: hits from the cache, the rest from one
+        loader(missing_keys) call returning {key: value}; keys the loader
+        does not return are cached as missing and left out of the result
+        """
+        if not self.enabled:
+            return loader(list(keys))
+        self._ensure_subscribed()
+        found, missing, version = {}, [], None
+        for key in {str(key) for key in keys}:
+            value, seen = self._lookup((kind, key))
+            if value is _MISSING:
+                missing.append(key)
+                version = seen if version is None else version
+            elif value is not None:
+                found[key] = copy.deepcopy(value)
+        if missing:
+            loaded = loader(missing)
+            for key in missing:
+                self._store_value((kind, key), loaded.get(key), version)
+            found.update(copy.deepcopy(loaded))
+        return found
+
+    def put(self, kind: str, key: Hashable, value: Any, version: int):
+        """
+        Store a row loaded outside get_or_load (e.g. fetched together with
+        other data); version is self.version read before the load, so a
+        load that raced an invalidation is not stored
+        """
+        if self.enabled:
+            self._ensure_subscribed()
+            self._store_value((kind, str(key)), copy.deepcopy(value), version)
+
+    def peek(self, kind: str, key: Hashable, default: Any = None) -> Any:
+        """Cached value of (kind, key) or default, never loading (not counted as a lookup)"""
+        with self._lock:
+            entry = self._entries.get((kind, str(key))) if self.enabled else None
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                return default
+            return copy.deepcopy(entry[1])
+
+    def _lookup(self, ident: tuple):
+        """(value or _MISSING, version to store a load under)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(ident)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._entries[ident]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self._entries.move_to_end(ident)
+                self.stats["hits"] += 1
+            version = self.version
+        CACHE_REQUESTS.labels(kind=ident[0], result="miss" if entry is None else "hit").inc()
+        return (_MISSING if entry is None else entry[1]), version
+
+    def _store_value(self, ident: tuple, value: Any, version: int):
+        with self._lock:
+            if self.version != version:
+                # Invalidated while loading: the row may predate the write
+                self.stats["stale_loads"] += 1
+                return
+            self._entries[ident] = (time.monotonic(), value)
+            self._entries.move_to_end(ident)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, kind: str, key: Hashable):
+        """Drop (kind, key) in this worker and every other worker; call after writing the row"""
+        self._drop(kind, str(key))
+        INVALIDATIONS.labels(origin="local").inc()
+        self._publish({"kind": kind, "key": str(key)})
+
+    def invalidate_all(self):
+        """Drop every entry in every worker"""
+        self._drop(None, None)
+        INVALIDATIONS.labels(origin="local").inc()
+        self._publish({"kind": None, "key": None})
+
+    def _drop(self, kind: Optional[str], key: Optional[str]):
+        with self._lock:
+            self.version += 1
+            self.stats["invalidations"] += 1
+            if kind is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((kind, key), None)
+
+    def _publish(self, message: Dict[str, Any]):
+        try:
+            self._shared_store().publish(self.channel, json.dumps({"origin": self.worker_id, **message}))
+        except Exception as e:
+            logger.warning(f"Failed to publish profile invalidation (other workers rely on TTL): {e}")
+
+    def _on_message(self, message: Dict[str, Any]):
+        """Invalidation published by a worker (ours are already applied)"""
+        try:
+            event = json.loads(message["data"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Ignoring malformed profile invalidation: {message!r}")
+            return
+        if event.get("origin") == self.worker_id:
+            return
+        self._drop(event.get("kind"), event.get("key"))
+        with self._lock:
+            self.stats["remote_invalidations"] += 1
+        INVALIDATIONS.labels(origin="remote").inc()
+
+    def _shared_store(self):
+        if self._store is None:
+            self._store = get_shared_store()
+        return self._store
+
+    def _ensure_subscribed(self):
+        """Subscribe to other workers' invalidations on first use"""
+        if self._subscription is not None:
+            return
+        with self._subscribe_lock:
+            if self._subscription is not None:
+                return
+            try:
+                pubsub = self._shared_store().pubsub()
+                pubsub.subscribe(**{self.channel: self._on_message})
+                self._subscription = pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+            except Exception as e:
+                # Cache stays usable; entries from other workers' writes expire by TTL
+                logger.warning(f"Profile invalidation subscription failed: {e}")
+                self._subscription = False
+
+    def check_workers(self, workers: int) -> bool:
+        """
+        Turn the cache off when workers > 1 share no store: invalidations
+        would stay in the writing process and other workers would serve
+        edited profiles until the TTL. Returns whether the cache is enabled.
+        """
+        if self.enabled and workers > 1 and not spans_processes(self._shared_store()):
+            logger.warning(f"Profile cache disabled: {workers} workers but no shared store for invalidations "
+                           f"(set VALIS_REDIS_URL to enable it)")
+            self.enabled = False
+            self.clear()
+        return self.enabled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "enabled": self.enabled,
+                **self.stats,
+                "entries": len(self._entries),
+                "version": self.version,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "subscribed": bool(self._subscription)
+            }
+
+
+# Global instance
+profile_cache = ProfileCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, enabled=PROFILE_CACHE_ENABLED)
@@ -2,29 +2,158 @@
 VALIS 2.0 Memory Query Layer
 High-level memory access methods for MCPRuntime
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from contextlib import contextmanager
 from .db import db
+from .turn_logger import turn_logger
+from .profile_cache import profile_cache, PERSONA, CLIENT, TRAITS
+import contextvars
+import json
 import uuid
 from datetime import datetime, timedelta
 
+# Rows preloaded for a batch of requests (see MemoryQueryClient.prefetch).
+# Copied into worker threads with the rest of the context.
+_prefetched: contextvars.ContextVar = contextvars.ContextVar('memory_prefetch', default=None)
+
+def _valid_uuids(ids: Iterable[str]) -> List[str]:
+    """Distinct ids that parse as UUIDs (others cannot match a row)"""
+    valid = []
+    for value in set(ids):
+        try:
+            uuid.UUID(str(value))
+            valid.append(value)
+        except ValueError:
+            pass
+    return valid
+
+_MISSING = object()
+
+# Timestamp columns, which json subqueries return as ISO strings
+_TIMESTAMP_COLUMNS = ('created_at', 'updated_at', 'last_seen', 'last_used', 'expires_at')
+
+def _parse_timestamps(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """row with its ISO timestamp strings turned back into datetimes (as the per-layer getters return them)"""
+    if row:
+        for column in _TIMESTAMP_COLUMNS:
+            value = row.get(column)
+            if isinstance(value, str):
+                try:
+                    row[column] = datetime.fromisoformat(value)
+                except ValueError:
+                    pass
+    return row
+
+# Columns of the load_context_bundle statement (named parameters)
+_BUNDLE_PERSONA = """(
+    SELECT row_to_json(p) FROM (
+        SELECT id, name, role, bio, system_prompt, traits, default_context_mode, created_at
+        FROM persona_profiles WHERE id = %(persona_id)s
+    ) p
+) AS persona"""
+
+_BUNDLE_CLIENT = """(
+    SELECT row_to_json(c) FROM client_profiles c WHERE c.id = %(client_id)s
+) AS client"""
+
+_BUNDLE_CANON = """(
+    SELECT json_agg(json_build_object(
+        'content', content, 'tags', tags, 'category', category,
+        'relevance_score', relevance_score, 'token_estimate', token_estimate, 'last_used', last_used,
+        'emotion_weight', (SELECT MAX(em.weight) FROM canon_memory_emotion_map em WHERE em.memory_id = canon.id)
+    ) ORDER BY relevance_score DESC, last_used DESC)
+    FROM (
+        SELECT * FROM canon_memories
+        WHERE persona_id = %(persona_id)s
+        ORDER BY relevance_score DESC, last_used DESC
+        LIMIT %(canon_limit)s
+    ) canon
+) AS canon_memory"""
+
+_BUNDLE_WORKING = """(
+    SELECT json_agg(json_build_object(
+        'content', content, 'importance', importance, 'decay_score', decay_score,
+        'token_estimate', token_estimate, 'created_at', created_at
+    ) ORDER BY decay_score DESC, created_at DESC)
+    FROM (
+        SELECT * FROM working_memory
+        WHERE persona_id = %(persona_id)s AND client_id = %(client_id)s
+        AND (expires_at IS NULL OR expires_at > NOW())
+        ORDER BY decay_score DESC, created_at DESC
+        LIMIT %(working_limit)s
+    ) working
+) AS working_memory"""
+
 class MemoryQueryClient:
+    """
+    Persona and client profiles are read through the profile cache
+    (memory.profile_cache); code that writes persona_profiles or
+    client_profiles must call invalidate_persona / invalidate_client.
+    """
     
     def get_persona(self, persona_id: str) -> Optional[Dict[str, Any]]:
         """Get persona profile by ID including default context mode"""
+        prefetched = _prefetched.get()
+        if prefetched and persona_id in prefetched['personas']:
+            return prefetched['personas'][persona_id]
+        return profile_cache.get_or_load(PERSONA, persona_id, lambda: self._load_persona(persona_id))
+    
+    def _load_persona(self, persona_id: str) -> Optional[Dict[str, Any]]:
         sql = "SELECT id, name, role, bio, system_prompt, traits, default_context_mode, created_at FROM persona_profiles WHERE id = %s"
         results = db.query(sql, (persona_id,))
         return results[0] if results else None
     
     def get_client(self, client_id: str) -> Optional[Dict[str, Any]]:
         """Get client profile by ID"""
+        prefetched = _prefetched.get()
+        if prefetched and client_id in prefetched['clients']:
+            return prefetched['clients'][client_id]
+        return profile_cache.get_or_load(CLIENT, client_id, lambda: self._load_client(client_id))
+    
+    def _load_client(self, client_id: str) -> Optional[Dict[str, Any]]:
         sql = "SELECT * FROM client_profiles WHERE id = %s"
         results = db.query(sql, (client_id,))
         return results[0] if results else None
     
+    def get_personas(self, persona_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many persona profiles, keyed by ID (cache misses in one query)"""
+        ids = _valid_uuids(persona_ids)
+        if not ids:
+            return {}
+        return profile_cache.get_many(PERSONA, ids, self._load_personas)
+    
+    def _load_personas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        sql = "SELECT id, name, role, bio, system_prompt, traits, default_context_mode, created_at FROM persona_profiles WHERE id = ANY(%s::uuid[])"
+        return {str(row['id']): row for row in db.query(sql, (ids,))}
+    
+    def get_clients(self, client_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many client profiles, keyed by ID (cache misses in one query)"""
+        ids = _valid_uuids(client_ids)
+        if not ids:
+            return {}
+        return profile_cache.get_many(CLIENT, ids, self._load_clients)
+    
+    def _load_clients(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        sql = "SELECT * FROM client_profiles WHERE id = ANY(%s::uuid[])"
+        return {str(row['id']): row for row in db.query(sql, (ids,))}
+    
+    def invalidate_persona(self, persona_id: str):
+        """Drop a persona profile (and its personality profile) from every worker's cache"""
+        profile_cache.invalidate(PERSONA, persona_id)
+        profile_cache.invalidate(TRAITS, persona_id)
+    
+    def invalidate_client(self, client_id: str):
+        """Drop a client profile from every worker's cache"""
+        profile_cache.invalidate(CLIENT, client_id)
+    
     def get_top_canon(self, persona_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top canon memories by relevance"""
+        prefetched = _prefetched.get()
+        if prefetched and limit <= prefetched['canon_limit'] and persona_id in prefetched['canon']:
+            return prefetched['canon'][persona_id][:limit]
         sql = """
-        SELECT content, tags, category, relevance_score, token_estimate
+        SELECT content, tags, category, relevance_score, token_estimate, last_used,
+               (SELECT MAX(em.weight) FROM canon_memory_emotion_map em WHERE em.memory_id = canon_memories.id) AS emotion_weight
         FROM canon_memories 
         WHERE persona_id = %s 
         ORDER BY relevance_score DESC, last_used DESC 
@@ -32,8 +161,35 @@ class MemoryQueryClient:
         """
         return db.query(sql, (persona_id, limit))
     
+    def get_top_canon_many(self, persona_ids: Iterable[str], limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Top canon memories for many personas in one query, keyed by persona ID"""
+        ids = _valid_uuids(persona_ids)
+        canon = {persona_id: [] for persona_id in ids}
+        if not ids:
+            return canon
+        sql = """
+        SELECT persona_id, content, tags, category, relevance_score, token_estimate, last_used,
+               (SELECT MAX(em.weight) FROM canon_memory_emotion_map em WHERE em.memory_id = ranked.id) AS emotion_weight
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY persona_id ORDER BY relevance_score DESC, last_used DESC
+            ) AS rank
+            FROM canon_memories
+            WHERE persona_id = ANY(%s::uuid[])
+        ) ranked
+        WHERE rank <= %s
+        ORDER BY persona_id, rank
+        """
+        for row in db.query(sql, (ids, limit)):
+            canon[str(row.pop('persona_id'))].append(row)
+        return canon
+    
     def get_recent_working(self, persona_id: str, client_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get recent working memory entries"""
+        prefetched = _prefetched.get()
+        key = (persona_id, client_id)
+        if prefetched and limit <= prefetched['working_limit'] and key in prefetched['working']:
+            return prefetched['working'][key][:limit]
         sql = """
         SELECT content, importance, decay_score, token_estimate, created_at
         FROM working_memory 
@@ -44,6 +200,123 @@ class MemoryQueryClient:
         """
         return db.query(sql, (persona_id, client_id, limit))
     
+    def get_recent_working_many(self, pairs: Iterable[Tuple[str, str]], limit: int = 5) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Recent working memory for many (persona_id, client_id) pairs in one query"""
+        pairs = {pair for pair in pairs if len(_valid_uuids(pair)) == len(set(pair))}
+        working = {pair: [] for pair in pairs}
+        if not pairs:
+            return working
+        sql = """
+        SELECT persona_id, client_id, content, importance, decay_score, token_estimate, created_at
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY persona_id, client_id ORDER BY decay_score DESC, created_at DESC
+            ) AS rank
+            FROM working_memory
+            WHERE persona_id = ANY(%s::uuid[]) AND client_id = ANY(%s::uuid[])
+            AND (expires_at IS NULL OR expires_at > NOW())
+        ) ranked
+        WHERE rank <= %s
+        ORDER BY persona_id, client_id, rank
+        """
+        persona_ids = list({persona_id for persona_id, _ in pairs})
+        client_ids = list({client_id for _, client_id in pairs})
+        for row in db.query(sql, (persona_ids, client_ids, limit)):
+            key = (str(row.pop('persona_id')), str(row.pop('client_id')))
+            if key in working:
+                working[key].append(row)
+        return working
+    
+    @contextmanager
+    def prefetch(self, pairs: Iterable[Tuple[str, str]], canon_limit: int, working_limit: int,
+                 personas: Dict[str, Dict[str, Any]] = None, clients: Dict[str, Dict[str, Any]] = None):
+        """
+        Preload memory rows for a batch of (persona_id, client_id) pairs
+        
+        Inside the block (and in threads running a copy of its context) the
+        single-row getters answer from the preloaded rows, so a batch costs
+        a handful of set-based queries instead of several per item.
+        Already-fetched persona/client rows can be passed in.
+        """
+        pairs = set(pairs)
+        persona_ids = {persona_id for persona_id, _ in pairs}
+        client_ids = {client_id for _, client_id in pairs}
+        
+        token = _prefetched.set({
+            'personas': personas if personas is not None else self.get_personas(persona_ids),
+            'clients': clients if clients is not None else self.get_clients(client_ids),
+            'canon': self.get_top_canon_many(persona_ids, canon_limit),
+            'canon_limit': canon_limit,
+            'working': self.get_recent_working_many(pairs, working_limit),
+            'working_limit': working_limit
+        })
+        try:
+            yield
+        finally:
+            _prefetched.reset(token)
+    
+    def cached_persona(self, persona_id: str) -> Optional[Dict[str, Any]]:
+        """Persona row if prefetched or cached, without touching the database"""
+        prefetched = _prefetched.get()
+        if prefetched and persona_id in prefetched['personas']:
+            return prefetched['personas'][persona_id]
+        return profile_cache.peek(PERSONA, persona_id)
+    
+    def load_context_bundle(self, persona_id: str, client_id: str, limits: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Persona, client, top canon and recent working memory in one round trip
+        
+        Returns {"persona", "client", "canon_memory", "working_memory"} with
+        the rows get_persona / get_client / get_top_canon /
+        get_recent_working return; limits gives the "canon_memory" and
+        "working_memory" row counts. Layers already prefetched are taken
+        from the prefetch, profiles already in the profile cache are left
+        out of the statement, and the rest is fetched by a single SELECT
+        of json subqueries; profiles fetched that way are stored in the
+        profile cache for the next turn.
+        """
+        canon_limit, working_limit = limits["canon_memory"], limits["working_memory"]
+        prefetched = _prefetched.get()
+        if (prefetched and canon_limit <= prefetched['canon_limit'] and working_limit <= prefetched['working_limit']
+                and persona_id in prefetched['canon'] and (persona_id, client_id) in prefetched['working']):
+            return {
+                "persona": self.get_persona(persona_id),
+                "client": self.get_client(client_id),
+                "canon_memory": self.get_top_canon(persona_id, canon_limit),
+                "working_memory": self.get_recent_working(persona_id, client_id, working_limit)
+            }
+        
+        bundle = {"persona": _MISSING, "client": _MISSING}
+        version = profile_cache.version
+        if prefetched and persona_id in prefetched['personas']:
+            bundle["persona"] = prefetched['personas'][persona_id]
+        else:
+            bundle["persona"] = profile_cache.peek(PERSONA, persona_id, _MISSING)
+        if prefetched and client_id in prefetched['clients']:
+            bundle["client"] = prefetched['clients'][client_id]
+        else:
+            bundle["client"] = profile_cache.peek(CLIENT, client_id, _MISSING)
+        
+        columns = [_BUNDLE_CANON, _BUNDLE_WORKING]
+        if bundle["persona"] is _MISSING:
+            columns.append(_BUNDLE_PERSONA)
+        if bundle["client"] is _MISSING:
+            columns.append(_BUNDLE_CLIENT)
+        row = db.query("SELECT " + ",\n".join(columns), {
+            'persona_id': persona_id,
+            'client_id': client_id,
+            'canon_limit': canon_limit,
+            'working_limit': working_limit
+        })[0]
+        
+        for layer, kind, key in (("persona", PERSONA, persona_id), ("client", CLIENT, client_id)):
+            if bundle[layer] is _MISSING:
+                bundle[layer] = _parse_timestamps(row[layer])
+                profile_cache.put(kind, key, bundle[layer], version)
+        bundle["canon_memory"] = [_parse_timestamps(item) for item in row["canon_memory"] or []]
+        bundle["working_memory"] = [_parse_timestamps(item) for item in row["working_memory"] or []]
+        return bundle
+    
     def get_recent_session(self, persona_id: str, client_id: str, limit: int = 3) -> List[Dict[str, Any]]:
         """Get recent session history"""
         sql = """
@@ -61,6 +334,9 @@ class MemoryQueryClient:
         """
         Enhanced session turn logging with request ID correlation and metadata
         
+        The turn is queued for the write-behind turn logger and persisted in
+        the background; the caller does not wait on the database.
+        
         Args:
             client_id: Client UUID
             persona_id: Persona UUID
@@ -68,12 +344,19 @@ class MemoryQueryClient:
             assistant_reply: Assistant's response
             session_id: Session identifier
             metadata: Additional metadata (request_id, provider_used, tool_calls, etc.)
+            
+        Returns:
+            The session log id the turn will be stored under
         """
         
         # Extract metadata fields
         meta = metadata or {}
         
+        # Generated up front so correlations can reference the row before it exists
+        log_id = str(uuid.uuid4())
+        
         values = {
+            'id': log_id,
             'client_id': client_id,
             'persona_id': persona_id,
             'user_input': user_input,
@@ -84,66 +367,56 @@ class MemoryQueryClient:
             'processing_time': meta.get('processing_time'),
             'tool_calls_made': meta.get('tool_calls_made'),
             'autonomous_plan_id': meta.get('autonomous_plan_id'),
-            'metadata_json': meta if meta else None
+            'metadata_json': json.dumps(meta, default=str) if meta else None
         }
         
-        try:
-            # Insert enhanced session log
-            log_id = db.insert('session_logs', values)
-            
-            # If this was an autonomous execution, create correlation entries
-            if meta.get('autonomous_plan_id'):
-                self._log_autonomous_correlation(
-                    log_id, meta['autonomous_plan_id'], meta.get('request_id')
-                )
-            
-            # If tool calls were made, log the correlation
-            if meta.get('tool_execution_ids'):
-                self._log_tool_correlations(
-                    log_id, meta['tool_execution_ids'], meta.get('request_id')
-                )
-            
-            return log_id
-            
-        except Exception as e:
-            # Fallback to basic logging if enhanced fails
-            basic_values = {
-                'client_id': client_id,
-                'persona_id': persona_id,
-                'user_input': user_input,
-                'assistant_reply': assistant_reply,
-                'session_id': session_id or str(uuid.uuid4())
-            }
-            return db.insert('session_logs', basic_values)
+        correlations = []
+        
+        # If this was an autonomous execution, create correlation entries
+        if meta.get('autonomous_plan_id'):
+            correlations.append(self._autonomous_correlation(
+                log_id, meta['autonomous_plan_id'], meta.get('request_id')
+            ))
+        
+        # If tool calls were made, log the correlation
+        if meta.get('tool_execution_ids'):
+            correlations.extend(self._tool_correlations(
+                log_id, meta['tool_execution_ids'], meta.get('request_id')
+            ))
+        
+        turn_logger.enqueue({'log': values, 'correlations': correlations})
+        return log_id
     
-    def _log_autonomous_correlation(self, session_log_id: str, plan_id: str, request_id: str):
-        """Log correlation between session and autonomous plan"""
-        try:
-            correlation_values = {
+    def log_session_turns(self, turns: List[Dict[str, Any]]) -> List[str]:
+        """
+        Log many turns at once (batch chat); each item takes the
+        log_session_turn keyword arguments. The turn logger writes them
+        with multi-row inserts.
+        """
+        return [self.log_session_turn(**turn) for turn in turns]
+    
+    def _autonomous_correlation(self, session_log_id: str, plan_id: str, request_id: str) -> Dict[str, Any]:
+        """Correlation row between session and autonomous plan"""
+        return {
+            'session_log_id': session_log_id,
+            'plan_id': plan_id,
+            'execution_id': None,
+            'request_id': request_id,
+            'correlation_type': 'autonomous_execution'
+        }
+    
+    def _tool_correlations(self, session_log_id: str, tool_execution_ids: List[str], request_id: str) -> List[Dict[str, Any]]:
+        """Correlation rows between session and tool executions"""
+        return [
+            {
                 'session_log_id': session_log_id,
-                'plan_id': plan_id,
+                'plan_id': None,
+                'execution_id': exec_id,
                 'request_id': request_id,
-                'correlation_type': 'autonomous_execution'
+                'correlation_type': 'tool_execution'
             }
-            db.insert('session_correlations', correlation_values)
-        except Exception as e:
-            # Table might not exist yet, that's okay
-            pass
-    
-    def _log_tool_correlations(self, session_log_id: str, tool_execution_ids: List[str], request_id: str):
-        """Log correlations between session and tool executions"""
-        try:
-            for exec_id in tool_execution_ids:
-                correlation_values = {
-                    'session_log_id': session_log_id,
-                    'execution_id': exec_id,
-                    'request_id': request_id,
-                    'correlation_type': 'tool_execution'
-                }
-                db.insert('session_correlations', correlation_values)
-        except Exception as e:
-            # Table might not exist yet, that's okay
-            pass
+            for exec_id in tool_execution_ids
+        ]
     
     def add_working_memory(self, persona_id: str, client_id: str, content: str, importance: int = 5):
         """Add new working memory entry"""
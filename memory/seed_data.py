@@ -11,6 +11,7 @@ valis2_dir = Path(__file__).parent.parent
 sys.path.append(str(valis2_dir))
 
 from memory.db import db
+from memory.query_client import memory
 import json
 import uuid
 from datetime import datetime, timedelta
@@ -60,6 +61,7 @@ def seed_personas():
     for persona in personas:
         try:
             persona_id = db.insert('persona_profiles', persona)
+            memory.invalidate_persona(persona_id)
             persona_ids[persona['name']] = persona_id
             print(f"OK Created persona: {persona['name']} (ID: {persona_id}) [Mode: {persona['default_context_mode']}]")
         except Exception as e:
@@ -133,6 +135,7 @@ def seed_test_client():
     
     try:
         client_id = db.insert('client_profiles', client_data)
+        memory.invalidate_client(client_id)
         print(f"OK Created test client: {client_data['name']} (ID: {client_id})")
         return client_id
     except Exception as e:
@@ -0,0 +1,306 @@
+"""
+VALIS 2.0 Session Transcript Store
+Bounded in-memory transcripts for trait evolution, spilled to the database
+
+MCPRuntime keeps the recent turns (and feedback) of each session until
+personality evolution consumes them. Each session holds a fixed-capacity
+ring buffer of turns; all sessions together are capped by text size, and
+the least recently active sessions are evicted when the cap is exceeded
+or when they have been idle too long. Evicted turns were already logged
+to session_logs by the chat path, so they are not written there again:
+each eviction becomes one row of session_transcript_spills (the turns as
+JSON, with their feedback), written by a background thread. take()
+consumes a spilled session's rows with a single DELETE ... RETURNING,
+and takes spills not yet written straight from memory.
+
+Environment:
+    VALIS_TRANSCRIPT_TURNS         turns kept per session (default 50)
+    VALIS_TRANSCRIPT_MAX_CHARS     text held across all sessions (default 8M chars)
+    VALIS_TRANSCRIPT_IDLE_SECONDS  idle time before a session is spilled (default 1800)
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from prometheus_client import Counter
+
+from .db import db
+
+logger = logging.getLogger("TranscriptStore")
+
+TRANSCRIPT_TURNS = int(os.getenv('VALIS_TRANSCRIPT_TURNS', '50'))
+TRANSCRIPT_MAX_CHARS = int(os.getenv('VALIS_TRANSCRIPT_MAX_CHARS', str(8 * 1024 * 1024)))
+TRANSCRIPT_IDLE_SECONDS = float(os.getenv('VALIS_TRANSCRIPT_IDLE_SECONDS', '1800'))
+
+# Spilled session ids remembered (to know when a reload is worthwhile)
+SPILLED_SESSIONS_KEPT = 10000
+
+# Seconds between idle sweeps (run from append, no thread)
+SWEEP_INTERVAL = 60.0
+
+# Seconds between spill writes (sooner when a spill is queued)
+SPILL_WRITE_INTERVAL = 1.0
+
+# Seconds before retrying after a failed spill write
+SPILL_RETRY_SECONDS = 30.0
+
+SPILL_TABLE = "session_transcript_spills"
+SPILL_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {SPILL_TABLE} (
+    id UUID PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    turns JSONB NOT NULL,
+    spilled_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_{SPILL_TABLE}_session ON {SPILL_TABLE}(session_id);
+"""
+
+TRANSCRIPT_EVICTIONS = Counter(
+    'valis_transcript_evictions_total',
+    'Session transcripts evicted from memory and spilled to the database',
+    ['reason']  # capacity | idle | shutdown
+)
+
+
+class _SessionTranscript:
+    """Ring buffer of one session's turns"""
+
+    def __init__(self, capacity: int):
+        self.turns: deque = deque(maxlen=capacity)
+        self.chars = 0
+        self.last_active = time.monotonic()
+
+    def append(self, turn: Dict[str, Any]) -> int:
+        """Add a turn (dropping the oldest when full); returns the change in chars"""
+        dropped = self.turns[0]["chars"] if len(self.turns) == self.turns.maxlen else 0
+        self.turns.append(turn)
+        self.chars += turn["chars"] - dropped
+        self.last_active = time.monotonic()
+        return turn["chars"] - dropped
+
+
+class SessionTranscriptStore:
+    """Per-session ring buffers under a global size cap with LRU spill to the database"""
+
+    def __init__(self, turns_per_session: int = TRANSCRIPT_TURNS, max_chars: int = TRANSCRIPT_MAX_CHARS,
+                 idle_seconds: float = TRANSCRIPT_IDLE_SECONDS):
+        self.turns_per_session = turns_per_session
+        self.max_chars = max_chars
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, _SessionTranscript]" = OrderedDict()  # least recently active first
+        self._spilled: "OrderedDict[str, None]" = OrderedDict()
+        self._chars = 0
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        self._lock = threading.Lock()
+        # Spills not yet written: spill id -> {"session_id", "turns", "chars", "spilled_at"}
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending_chars = 0
+        # Held while a batch of spills is written, so take() sees each spill exactly once
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._wake = threading.Event()
+        self._schema_ready = False
+        self.stats = {"appended": 0, "evicted_sessions": 0, "spilled_turns": 0, "reloaded_sessions": 0,
+                      "spill_writes": 0, "spill_failures": 0, "dropped_spills": 0}
+
+    def append(self, session_id: str, user_input: str, ai_response: str, feedback: Dict[str, Any] = None):
+        """Record a turn (and its feedback) for a session"""
+        turn = {
+            "user": user_input,
+            "ai": ai_response,
+            "timestamp": datetime.now().isoformat(),
+            "feedback": feedback,
+            "chars": len(user_input or "") + len(ai_response or "")
+        }
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _SessionTranscript(self.turns_per_session)
+            self._sessions.move_to_end(session_id)
+            self._chars += session.append(turn)
+            self.stats["appended"] += 1
+            evicted = self._evict_locked(keep=session_id)
+        self._spill(evicted)
+
+    def take(self, session_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Remove and return a session's (turns, feedback), oldest first
+
+        Turns spilled by this process (written or still pending) are put
+        ahead of those recorded since.
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._chars -= session.chars
+            spilled = session_id in self._spilled
+            if spilled:
+                del self._spilled[session_id]
+        turns = self._reload(session_id) if spilled else []
+        if session is not None:
+            turns.extend(session.turns)
+        turns = turns[-self.turns_per_session:]
+        return ([{"user": t["user"], "ai": t["ai"], "timestamp": t["timestamp"]} for t in turns],
+                [t["feedback"] for t in turns if t.get("feedback")])
+
+    def _evict_locked(self, keep: str = None) -> List[Tuple[str, _SessionTranscript, str]]:
+        """Detach sessions over the size cap (LRU) and idle ones; spilled outside the lock"""
+        evicted = []
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + SWEEP_INTERVAL
+            idle = [sid for sid, session in self._sessions.items()
+                    if sid != keep and now - session.last_active > self.idle_seconds]
+            for session_id in idle:
+                evicted.append(self._detach_locked(session_id, "idle"))
+        for session_id in list(self._sessions):
+            if self._chars <= self.max_chars:
+                break
+            if session_id != keep:
+                evicted.append(self._detach_locked(session_id, "capacity"))
+        return evicted
+
+    def _detach_locked(self, session_id: str, reason: str) -> Tuple[str, _SessionTranscript, str]:
+        session = self._sessions.pop(session_id)
+        self._chars -= session.chars
+        self._spilled[session_id] = None
+        self._spilled.move_to_end(session_id)
+        while len(self._spilled) > SPILLED_SESSIONS_KEPT:
+            self._spilled.popitem(last=False)
+        self.stats["evicted_sessions"] += 1
+        return session_id, session, reason
+
+    def _spill(self, evicted: List[Tuple[str, _SessionTranscript, str]]):
+        """Queue evicted turns for the spill writer (one record per eviction)"""
+        if not evicted:
+            return
+        with self._lock:
+            for session_id, session, reason in evicted:
+                turns = [{"user": t["user"], "ai": t["ai"], "timestamp": t["timestamp"], "feedback": t["feedback"]}
+                         for t in session.turns]
+                self._pending[str(uuid.uuid4())] = {"session_id": session_id, "turns": turns,
+                                                    "chars": session.chars, "spilled_at": datetime.now()}
+                self._pending_chars += session.chars
+                self.stats["spilled_turns"] += len(turns)
+                TRANSCRIPT_EVICTIONS.labels(reason=reason).inc()
+                logger.info(f"Spilled transcript of session {session_id} ({len(turns)} turns, {reason})")
+            # Unwritten spills (database down) are held within the same size cap
+            while self._pending_chars > self.max_chars and len(self._pending) > 1:
+                _, dropped = self._pending.popitem(last=False)
+                self._pending_chars -= dropped["chars"]
+                self.stats["dropped_spills"] += 1
+                logger.warning(f"Dropped unwritten transcript spill of session {dropped['session_id']}")
+        self._start_writer()
+        self._wake.set()
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="transcript-spill", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait(SPILL_WRITE_INTERVAL)
+            self._wake.clear()
+            if not self._write_pending():
+                # Back off so an unavailable database is not hammered
+                time.sleep(SPILL_RETRY_SECONDS)
+
+    def _write_pending(self) -> bool:
+        """Write every pending spill in one multi-row insert; False (kept pending) on failure"""
+        with self._write_lock:
+            with self._lock:
+                records = list(self._pending.items())
+            if not records:
+                return True
+            try:
+                if not self._schema_ready:
+                    db.execute(SPILL_SCHEMA)
+                    self._schema_ready = True
+                db.insert_many(SPILL_TABLE, [
+                    {"id": spill_id, "session_id": record["session_id"],
+                     "turns": json.dumps(record["turns"], default=str), "spilled_at": record["spilled_at"]}
+                    for spill_id, record in records
+                ])
+            except Exception as e:
+                self.stats["spill_failures"] += 1
+                logger.error(f"Failed to write {len(records)} transcript spills, retrying: {e}")
+                return False
+            with self._lock:
+                for spill_id, record in records:
+                    if self._pending.pop(spill_id, None) is not None:
+                        self._pending_chars -= record["chars"]
+            self.stats["spill_writes"] += 1
+            return True
+
+    def _reload(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        A spilled session's turns, removed from the spill table and the
+        pending spills (latest turns_per_session)
+        """
+        # Under the write lock every spill is either pending or written, never both
+        with self._write_lock:
+            with self._lock:
+                pending = [(spill_id, record) for spill_id, record in self._pending.items()
+                           if record["session_id"] == session_id]
+                for spill_id, record in pending:
+                    del self._pending[spill_id]
+                    self._pending_chars -= record["chars"]
+        spills = [(record["spilled_at"], record["turns"]) for _, record in pending]
+        # Nothing of this session can be in the table before a spill was written
+        if self._schema_ready:
+            try:
+                spills.extend(self._consume_written(session_id))
+            except Exception as e:
+                logger.error(f"Failed to reload transcript of session {session_id}: {e}")
+        self.stats["reloaded_sessions"] += 1
+        spills.sort(key=lambda spill: spill[0])
+        return [turn for _, turns in spills for turn in turns][-self.turns_per_session:]
+
+    def _consume_written(self, session_id: str) -> List[Tuple[datetime, List[Dict[str, Any]]]]:
+        """Delete and return a session's written spills in one round trip"""
+        sql = f"DELETE FROM {SPILL_TABLE} WHERE session_id = %s RETURNING spilled_at, turns"
+        with db.get_connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql, (session_id,))
+                    rows = cur.fetchall()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return [(spilled_at, json.loads(turns) if isinstance(turns, str) else turns) for spilled_at, turns in rows]
+
+    def spill_all(self):
+        """Spill every session still in memory and write all pending spills (shutdown)"""
+        with self._lock:
+            evicted = [self._detach_locked(session_id, "shutdown") for session_id in list(self._sessions)]
+        self._spill(evicted)
+        self._write_pending()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "sessions": len(self._sessions),
+                "chars": self._chars,
+                "pending_spills": len(self._pending),
+                "max_chars": self.max_chars,
+                "turns_per_session": self.turns_per_session
+            }
+
+
+# Global instance
+transcript_store = SessionTranscriptStore()
+atexit.register(transcript_store.spill_all)
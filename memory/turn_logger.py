@@ -0,0 +1,294 @@
+"""
+VALIS 2.0 Session Turn Logger
+Write-behind persistence for session_logs and session_correlations
+
+Chat endpoints enqueue turns and return immediately; a background writer
+drains the bounded queue and inserts turns in multi-row batches. When the
+queue is full, producers wait briefly (backpressure) and then spill to a
+local spool file. Batches that fail against the database are also spooled
+and are replayed once the database accepts writes again.
+
+A batch the database rejects for its data (rather than being unavailable)
+is retried turn by turn, and the turns it still rejects are moved to a
+quarantine file (<spool>.bad) with the error, as are spool lines that no
+longer decode (e.g. truncated by a crash), so one bad turn cannot block
+the spool or stop the writer.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from .db import db
+
+logger = logging.getLogger("SessionTurnLogger")
+
+# Columns written when the enhanced session_logs schema is unavailable
+BASIC_COLUMNS = ('id', 'client_id', 'persona_id', 'user_input', 'assistant_reply', 'session_id')
+
+# Errors that mean the database rejected the turns themselves; anything
+# else (connection loss, pool not ready) is treated as the database being
+# unavailable and the turns are spooled for replay
+DATA_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, psycopg2.ProgrammingError,
+               KeyError, TypeError, ValueError)
+
+
+class SessionTurnLogger:
+    """Bounded queue plus background batch writer for session turns"""
+
+    def __init__(self, max_queue: int = None, batch_size: int = None,
+                 flush_interval: float = None, spool_path: str = None):
+        self.max_queue = max_queue or int(os.getenv('VALIS_TURN_LOG_QUEUE', '10000'))
+        self.batch_size = batch_size or int(os.getenv('VALIS_TURN_LOG_BATCH', '200'))
+        self.flush_interval = flush_interval or float(os.getenv('VALIS_TURN_LOG_INTERVAL', '0.5'))
+        self.spool_path = spool_path or os.getenv('VALIS_TURN_LOG_SPOOL', os.path.join('logs', 'session_turns.spool'))
+        self.enqueue_timeout = float(os.getenv('VALIS_TURN_LOG_BLOCK', '0.05'))
+        self.retry_interval = float(os.getenv('VALIS_TURN_LOG_RETRY', '30'))
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.max_queue)
+        self._spool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # stats are updated by producers and the writer
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._next_replay = 0.0  # earliest time to retry the spool after a DB failure
+
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'failed_batches': 0,
+            'quarantined': 0
+        }
+
+    def start(self):
+        """Start the background writer (idempotent)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="turn-logger", daemon=True)
+            self._thread.start()
+            logger.info(f"Session turn logger started: batch={self.batch_size}, queue={self.max_queue}")
+
+    def enqueue(self, turn: Dict[str, Any]):
+        """
+        Queue a turn record for persistence
+
+        turn: {"log": session_logs row, "correlations": [session_correlations rows]}
+        Blocks for at most VALIS_TURN_LOG_BLOCK seconds when the queue is
+        full, then spools the turn to disk instead of dropping it.
+        """
+        self.start()
+        try:
+            self._queue.put(turn, timeout=self.enqueue_timeout)
+            self._count('enqueued')
+        except queue.Full:
+            logger.warning("Session turn queue full - spooling turn to disk")
+            self._spool([turn])
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued turns have been handled; returns False on timeout"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer"""
+        if not self._thread:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write_or_spool(batch)
+            elif time.time() >= self._next_replay:
+                try:
+                    self._replay_spool()
+                except Exception as e:
+                    # Keep the writer alive; the .replay file is picked up next time
+                    logger.error(f"Spool replay failed, retrying in {self.retry_interval}s: {e}")
+                    self._next_replay = time.time() + self.retry_interval
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block up to flush_interval for the first turn, then take what is queued"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_or_spool(self, batch: List[Dict[str, Any]]):
+        try:
+            unwritten, error = self._write_isolating(batch)
+            if unwritten:
+                self._count('failed_batches')
+                self._next_replay = time.time() + self.retry_interval
+                logger.error(f"Session turn batch failed ({len(unwritten)} turns): {error} - spooling")
+                self._spool(unwritten)
+                # Back off so an unavailable database is not hammered
+                self._stop.wait(self.flush_interval)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_isolating(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+        """
+        Write batch, quarantining turns the database rejects for their data
+
+        Returns (turns left unwritten because the database is unavailable,
+        the error); ([], None) when every turn was written or quarantined.
+        """
+        try:
+            self._write_batch(batch)
+            return [], None
+        except DATA_ERRORS as e:
+            if len(batch) == 1:
+                self._quarantine([{'error': str(e), 'turn': batch[0]}])
+                return [], None
+            logger.warning(f"Session turn batch rejected ({len(batch)} turns), writing turns one by one: {e}")
+        except Exception as e:
+            return batch, e
+
+        for index, turn in enumerate(batch):
+            try:
+                self._write_batch([turn])
+            except DATA_ERRORS as e:
+                self._quarantine([{'error': str(e), 'turn': turn}])
+            except Exception as e:
+                return batch[index:], e
+        return [], None
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Multi-row insert of turns, then their correlations"""
+        rows = [turn['log'] for turn in batch]
+        try:
+            db.insert_many('session_logs', rows)
+        except psycopg2.ProgrammingError as e:
+            # Fall back to the basic schema if enhanced columns are missing
+            logger.warning(f"Enhanced session log insert failed, using basic columns: {e}")
+            db.insert_many('session_logs', [{c: row[c] for c in BASIC_COLUMNS} for row in rows])
+
+        correlations = [c for turn in batch for c in turn.get('correlations', [])]
+        if correlations:
+            try:
+                db.insert_many('session_correlations', correlations)
+            except Exception as e:
+                # Table might not exist yet, that's okay
+                logger.debug(f"Session correlations not written: {e}")
+
+        self._count('batches')
+        self._count('written', len(batch))
+
+    def _spool(self, turns: List[Dict[str, Any]]):
+        """Append turns to the local spool file (JSON lines)"""
+        with self._spool_lock:
+            try:
+                directory = os.path.dirname(self.spool_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.spool_path, 'a', encoding='utf-8') as f:
+                    for turn in turns:
+                        f.write(json.dumps(turn, default=str) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._count('spooled', len(turns))
+            except OSError as e:
+                logger.error(f"Failed to spool {len(turns)} session turns: {e}")
+
+    def _quarantine(self, entries: List[Dict[str, Any]]):
+        """Append turns (or raw spool lines) that can never be written to <spool>.bad, with the reason"""
+        quarantine_path = self.spool_path + '.bad'
+        with self._spool_lock:
+            try:
+                directory = os.path.dirname(quarantine_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(quarantine_path, 'a', encoding='utf-8') as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, default=str) + '\n')
+                self._count('quarantined', len(entries))
+                logger.error(f"Quarantined {len(entries)} session turns in {quarantine_path}: {entries[0]['error']}")
+            except OSError as e:
+                logger.error(f"Failed to quarantine {len(entries)} session turns: {e}")
+
+    def _replay_spool(self):
+        """Move spooled turns back into the database once it is reachable"""
+        # A leftover .replay file means a previous replay was interrupted
+        replay_path = self.spool_path + '.replay'
+        with self._spool_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path):
+                    return
+                os.replace(self.spool_path, replay_path)
+
+        turns, bad_lines = [], []
+        with open(replay_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    turn = json.loads(line)
+                except ValueError:
+                    turn = None
+                if isinstance(turn, dict) and isinstance(turn.get('log'), dict):
+                    turns.append(turn)
+                else:
+                    bad_lines.append({'error': 'undecodable spool line', 'line': line.rstrip('\n')})
+        if bad_lines:
+            self._quarantine(bad_lines)
+
+        for offset in range(0, len(turns), self.batch_size):
+            batch = turns[offset:offset + self.batch_size]
+            written = self.stats['written']  # only the writer thread updates it
+            unwritten, error = self._write_isolating(batch)
+            self._count('replayed', self.stats['written'] - written)
+            if unwritten:
+                logger.warning(f"Spool replay failed, retrying in {self.retry_interval}s: {error}")
+                self._next_replay = time.time() + self.retry_interval
+                self._spool(unwritten + turns[offset + len(batch):])
+                break
+
+        os.remove(replay_path)
+        logger.info(f"Replayed spooled session turns: {self.stats['replayed']} total")
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self.max_queue,
+            'spool_pending': os.path.exists(self.spool_path)
+        }
+
+
+# Global instance
+turn_logger = SessionTurnLogger()
+atexit.register(turn_logger.stop)
@@ -14,6 +14,9 @@ import os
 from pathlib import Path
 
 from core.agent_planner import agent_planner
+from core.async_runtime import get_background_loop
+from core.intent_engine import planning_engine
+from core.deadline import cap_timeout
 from memory.query_client import memory
 
 logger = logging.getLogger("AutonomousAgentProvider")
@@ -32,6 +35,7 @@ class AutonomousAgentProvider:
             "planning_timeout": 30,  # seconds
             "execution_timeout": 300  # seconds
         }
+        self.planning_intents = planning_engine()
         logger.info("AutonomousAgentProvider initialized")
     
     def should_use_autonomous_mode(self, prompt: str, context: Dict[str, Any] = None) -> bool:
@@ -48,67 +52,65 @@ class AutonomousAgentProvider:
         if not self.config["enable_autonomous_mode"]:
             return False
         
-        prompt_lower = prompt.lower()
-        
-        # Explicit planning triggers
-        planning_triggers = [
-            'plan', 'create a plan', 'step by step', 'how would you',
-            'what steps', 'analyze and', 'research and', 'find and summarize',
-            'check if', 'compare and', 'gather information about'
-        ]
-        
-        if any(trigger in prompt_lower for trigger in planning_triggers):
-            return True
-        
-        # Multi-action indicators
-        multi_action_indicators = [
-            ' and then ', ' after that', ' followed by', ' next ',
-            'first', 'second', 'finally', 'also check'
-        ]
-        
-        if any(indicator in prompt_lower for indicator in multi_action_indicators):
-            return True
-        
-        # Complex queries that benefit from planning
-        complex_patterns = [
-            ('search', 'analyze'),  # Search then analyze
-            ('find', 'summarize'),  # Find then summarize  
-            ('list', 'compare'),    # List then compare
-            ('check', 'report'),    # Check then report
-            ('gather', 'evaluate')  # Gather then evaluate
-        ]
-        
-        for pattern in complex_patterns:
-            if all(word in prompt_lower for word in pattern):
-                return True
-        
-        return False
+        # Planning triggers, multi-action indicators and complex word pairs,
+        # compiled into one pattern (core/intent_engine.py)
+        return self.planning_intents.match(prompt) is not None
     
     def ask(self, prompt: str, client_id: str, persona_id: str, 
-            context: Dict[str, Any] = None, request_id: str = None) -> Dict[str, Any]:
+            context: Dict[str, Any] = None, request_id: str = None,
+            timeout: float = None) -> Dict[str, Any]:
         """
         Process user request with autonomous planning if needed (sync wrapper)
+        
+        Submits to the shared background event loop and blocks this thread
+        until the plan finishes or its deadline passes, so concurrent
+        requests' planning and tool calls overlap on one loop.
         """
-        # Run async method in event loop
-        try:
-            # Try to get existing loop
-            loop = asyncio.get_running_loop()
-            # If we're already in a loop, we can't run another coroutine with run_until_complete
-            # So we'll just return a fallback response
+        # Cheap check first - most chat turns never need the loop
+        if not self.should_use_autonomous_mode(prompt, context):
+            return self._not_triggered()
+        
+        background = get_background_loop()
+        if background.in_loop_thread():
+            # Called from a coroutine already on the background loop; blocking here would deadlock
             return {
                 'success': False,
                 'error': 'Autonomous mode not available in nested event loop',
                 'provider': self.provider_name,
                 'fallback_reason': 'Event loop conflict'
             }
-        except RuntimeError:
-            # No running loop, safe to create one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(self._ask_async(prompt, client_id, persona_id, context, request_id))
-            finally:
-                loop.close()
+        return background.run(self.ask_async(prompt, client_id, persona_id, context, request_id, timeout))
+    
+    async def ask_async(self, prompt: str, client_id: str, persona_id: str,
+                        context: Dict[str, Any] = None, request_id: str = None,
+                        timeout: float = None) -> Dict[str, Any]:
+        """
+        Process user request on the caller's event loop (ASGI) with a per-request deadline
+        
+        timeout defaults to planning_timeout + execution_timeout, and never
+        runs past the request deadline.
+        """
+        timeout = cap_timeout(timeout or self.config["planning_timeout"] + self.config["execution_timeout"])
+        try:
+            return await asyncio.wait_for(
+                self._ask_async(prompt, client_id, persona_id, context, request_id), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Autonomous request timed out after {timeout}s")
+            return {
+                'success': False,
+                'error': f'Autonomous request timed out after {timeout}s',
+                'provider': self.provider_name
+            }
+    
+    def _not_triggered(self) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': 'Autonomous mode not triggered',
+            'provider': self.provider_name,
+            'fallback_reason': 'Simple query, no planning needed',
+            'declined': True
+        }
     
     async def _ask_async(self, prompt: str, client_id: str, persona_id: str, 
                   context: Dict[str, Any] = None, request_id: str = None) -> Dict[str, Any]:
@@ -132,26 +134,28 @@ class AutonomousAgentProvider:
             
             # Check if autonomous mode should be used
             if not self.should_use_autonomous_mode(prompt, context):
-                return {
-                    'success': False,
-                    'error': 'Autonomous mode not triggered',
-                    'provider': self.provider_name,
-                    'fallback_reason': 'Simple query, no planning needed'
-                }
+                return self._not_triggered()
             
             logger.info(f"Autonomous mode triggered for: {prompt[:30]}...")
             
             # Create execution plan
             try:
-                plan = await agent_planner.create_plan(
+                plan = await asyncio.wait_for(agent_planner.create_plan(
                     goal=prompt,
                     client_id=client_id,
                     persona_id=persona_id,
                     context=context or {}
-                )
+                ), cap_timeout(self.config["planning_timeout"]))
                 
                 logger.info(f"Created plan {plan.plan_id} with {len(plan.steps)} steps")
                 
+            except asyncio.TimeoutError:
+                logger.error(f"Planning timed out after {self.config['planning_timeout']}s")
+                return {
+                    'success': False,
+                    'error': f"Planning timed out after {self.config['planning_timeout']}s",
+                    'provider': self.provider_name
+                }
             except Exception as e:
                 logger.error(f"Failed to create plan: {e}")
                 return {
@@ -162,7 +166,9 @@ class AutonomousAgentProvider:
             
             # Execute the plan
             try:
-                execution_result = await agent_planner.execute_plan(plan.plan_id)
+                execution_result = await asyncio.wait_for(
+                    agent_planner.execute_plan(plan.plan_id), cap_timeout(self.config["execution_timeout"])
+                )
                 
                 if execution_result['success']:
                     processing_time = (datetime.now() - start_time).total_seconds()
@@ -197,6 +203,15 @@ class AutonomousAgentProvider:
                         'plan_id': plan.plan_id
                     }
                     
+            except asyncio.TimeoutError:
+                logger.error(f"Plan {plan.plan_id} timed out after {self.config['execution_timeout']}s")
+                await agent_planner.cancel_plan(plan.plan_id)
+                return {
+                    'success': False,
+                    'error': f"Execution timed out after {self.config['execution_timeout']}s",
+                    'provider': self.provider_name,
+                    'plan_id': plan.plan_id
+                }
             except Exception as e:
                 logger.error(f"Plan execution error: {e}")
                 return {
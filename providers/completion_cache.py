@@ -0,0 +1,124 @@
+"""
+VALIS 2.0 Completion Cache
+Exact-match cache for llama.cpp completions
+
+Keyed on a hash of the final prompt plus the generation parameters
+(temperature, top_p, n_predict, stop), bounded by entry count (LRU) and
+age (TTL). Sampling with temperature > 0 is not deterministic, so those
+requests bypass the cache unless the persona opts into deterministic
+caching (repeat answers are acceptable for it).
+
+Configured by "completion_cache" in config/providers.json:
+
+    "completion_cache": {
+        "enabled": true,
+        "max_entries": 1000,
+        "ttl_seconds": 600,
+        "deterministic_personas": ["<persona_id>"]
+    }
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from prometheus_client import Counter
+
+logger = logging.getLogger("CompletionCache")
+
+KEY_PARAMS = ("temperature", "top_p", "n_predict", "stop")
+
+CACHE_REQUESTS = Counter(
+    'valis_completion_cache_requests_total',
+    'Completion cache lookups by result',
+    ['result']  # hit | miss | bypass
+)
+
+
+def completion_key(payload: Dict[str, Any]) -> str:
+    """Hash of the final prompt plus the generation parameters that shape the output"""
+    material = {"prompt": payload["prompt"], **{p: payload.get(p) for p in KEY_PARAMS}}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+class CompletionCache:
+    """Thread-safe LRU + TTL cache of successful completion results"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 600,
+                 deterministic_personas: Iterable[str] = ()):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.deterministic_personas = set(deterministic_personas)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "evictions": 0, "expired": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["CompletionCache"]:
+        """Build the cache from providers.json settings; None when disabled"""
+        if not config or not config.get("enabled"):
+            return None
+        cache = cls(
+            max_entries=config.get("max_entries", 1000),
+            ttl_seconds=config.get("ttl_seconds", 600),
+            deterministic_personas=config.get("deterministic_personas", [])
+        )
+        logger.info(f"Completion cache enabled: {cache.max_entries} entries, ttl {cache.ttl_seconds}s")
+        return cache
+
+    def key_for(self, payload: Dict[str, Any], persona_id: str) -> Optional[str]:
+        """
+        Cache key for a completion payload, or None if it must bypass the cache
+
+        Bypassed when temperature > 0 and the persona has not opted in.
+        """
+        if payload.get("temperature", 0) > 0 and persona_id not in self.deterministic_personas:
+            with self._lock:
+                self.stats["bypassed"] += 1
+            CACHE_REQUESTS.labels(result="bypass").inc()
+            return None
+        return completion_key(payload)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                CACHE_REQUESTS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        CACHE_REQUESTS.labels(result="hit").inc()
+        return dict(entry[1])
+
+    def put(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.time(), dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,204 @@
+"""
+VALIS 2.0 Pooled HTTP Client
+Shared keep-alive HTTP clients for providers, sync (requests) and async (httpx)
+
+Each named client (one per upstream, e.g. "local_mistral") owns a
+connection pool that is reused across requests and providers, with
+separate connect/read timeouts and a per-host connection limit. Both
+transports count the requests sent and the connections actually opened,
+so reuse (requests - connections) shows whether handshakes are avoided.
+Read timeouts are capped to what is left of the request deadline
+(core.deadline), and nothing is sent once it has passed.
+
+Settings come from the "http_clients" section of config/providers.json:
+
+    "http_clients": {
+        "local_mistral": {"pool_maxsize": 20, "connect_timeout": 2, "read_timeout": 30}
+    }
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter
+
+from core.deadline import check_deadline, get_deadline
+
+logger = logging.getLogger("HTTPClient")
+
+DEFAULT_HTTP_CONFIG = {
+    "pool_connections": 4,      # distinct hosts kept pooled (requests)
+    "pool_maxsize": 20,         # keep-alive connections per host
+    "pool_block": False,        # wait for a free connection instead of opening an extra one
+    "connect_timeout": 3.0,
+    "read_timeout": 30.0,
+    "keepalive_expiry": 30.0    # async: idle seconds before a pooled connection is closed
+}
+
+HTTP_REQUESTS = Counter(
+    'valis_http_requests_total',
+    'Requests sent by pooled provider HTTP clients',
+    ['client', 'transport']
+)
+
+HTTP_CONNECTIONS = Counter(
+    'valis_http_connections_opened_total',
+    'TCP connections opened by pooled provider HTTP clients',
+    ['client', 'transport']
+)
+
+
+class PooledHTTPClient:
+    """Keep-alive requests.Session plus lazily created httpx.AsyncClient for one upstream"""
+
+    def __init__(self, name: str, config: Dict[str, Any] = None):
+        self.name = name
+        self.config = {**DEFAULT_HTTP_CONFIG, **(config or {})}
+        self.timeout = (self.config["connect_timeout"], self.config["read_timeout"])
+
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(
+            pool_connections=self.config["pool_connections"],
+            pool_maxsize=self.config["pool_maxsize"],
+            pool_block=self.config["pool_block"]
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self._sync_seen = 0
+        self.stats = {
+            "sync_requests": 0,
+            "async_requests": 0,
+            "async_connections": 0
+        }
+
+    # --- sync (requests) ---
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        check_deadline(f"http.{self.name}")
+        kwargs.setdefault("timeout", self.timeout)
+        deadline = get_deadline()
+        if deadline is not None:
+            connect, read = kwargs["timeout"] if isinstance(kwargs["timeout"], tuple) else (kwargs["timeout"],) * 2
+            kwargs["timeout"] = (deadline.cap(connect), deadline.cap(read))
+        with self._lock:
+            self.stats["sync_requests"] += 1
+        HTTP_REQUESTS.labels(client=self.name, transport="sync").inc()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            self._observe_sync_connections()
+
+    def _observe_sync_connections(self):
+        """Export connections opened since the last observation (safe under concurrency)"""
+        with self._lock:
+            current = self._sync_connections()
+            opened = current - self._sync_seen
+            self._sync_seen = current
+        if opened > 0:
+            HTTP_CONNECTIONS.labels(client=self.name, transport="sync").inc(opened)
+
+    def _sync_connections(self) -> int:
+        """Connections opened so far by urllib3 pools (num_connections per host pool)"""
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in list(pools.keys()))
+
+    # --- async (httpx) ---
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Created lazily on the serving loop"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config["pool_maxsize"],
+                    max_keepalive_connections=self.config["pool_maxsize"],
+                    keepalive_expiry=self.config["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(self.config["read_timeout"], connect=self.config["connect_timeout"]),
+                event_hooks={"request": [self._on_async_request]}
+            )
+        return self._async_client
+
+    async def _on_async_request(self, request: httpx.Request):
+        check_deadline(f"http.{self.name}")
+        deadline = get_deadline()
+        if deadline is not None:
+            request.extensions["timeout"] = {phase: deadline.cap(value)
+                                             for phase, value in request.extensions.get("timeout", {}).items()}
+        self.stats["async_requests"] += 1
+        HTTP_REQUESTS.labels(client=self.name, transport="async").inc()
+        request.extensions["trace"] = self._async_trace
+
+    async def _async_trace(self, event_name: str, info: Dict[str, Any]):
+        # httpcore emits connection.connect_tcp.* only when a new connection is opened
+        if event_name == "connection.connect_tcp.complete":
+            self.stats["async_connections"] += 1
+            HTTP_CONNECTIONS.labels(client=self.name, transport="async").inc()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        sync_connections = self._sync_connections()
+        return {
+            "config": self.config,
+            "sync": {
+                "requests": self.stats["sync_requests"],
+                "connections_opened": sync_connections,
+                "reused": max(self.stats["sync_requests"] - sync_connections, 0)
+            },
+            "async": {
+                "requests": self.stats["async_requests"],
+                "connections_opened": self.stats["async_connections"],
+                "reused": max(self.stats["async_requests"] - self.stats["async_connections"], 0)
+            }
+        }
+
+
+_clients: Dict[str, PooledHTTPClient] = {}
+_client_config: Dict[str, Dict[str, Any]] = {}
+_clients_lock = threading.Lock()
+
+
+def configure_http_clients(config: Dict[str, Dict[str, Any]]):
+    """Per-client settings (config/providers.json "http_clients"); applies to clients created afterwards"""
+    _client_config.update(config or {})
+
+
+def get_http_client(name: str) -> PooledHTTPClient:
+    """Get the shared pooled client for an upstream"""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = PooledHTTPClient(name, _client_config.get(name))
+            logger.info(f"HTTP client '{name}' created: {_clients[name].config}")
+        return _clients[name]
+
+
+def get_http_client_stats() -> Dict[str, Any]:
+    """Connection reuse per client, for provider status"""
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.get_stats() for name, client in clients.items()}
+
+
+async def aclose_http_clients():
+    """Close async pools (ASGI worker shutdown)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
@@ -5,24 +5,60 @@ Simple provider that sends requests to localhost:8080
 """
 
 import requests
+import httpx
+import json
 import logging
+import threading
 import time
-from typing import Dict, Any
+import zlib
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Any, Iterator, AsyncIterator, List, Optional, Tuple
+
+from providers.http_client import get_http_client
+from providers.completion_cache import CompletionCache, completion_key
+from core.single_flight import SingleFlight
+from core.micro_batch import MicroBatcher
+from core.deadline import cap_timeout, has_budget
+from prometheus_client import Counter
 
 logger = logging.getLogger("LocalMistralProvider")
 
+DEFAULT_LLAMA_CONFIG = {
+    "cache_prompt": True,   # let llama.cpp reuse the KV cache for a shared prompt prefix
+    "slots": 0              # server parallel slots (-np); >0 pins each client/persona to one
+}
+
+PROMPT_TOKENS = Counter(
+    'valis_llama_prompt_tokens_total',
+    'Prompt tokens sent to llama.cpp by how they were served',
+    ['source']  # cached | evaluated
+)
+
 class LocalMistralProvider:
     """Local Mistral 7B provider via llama.cpp server"""
-    
-    def __init__(self):
+
+    def __init__(self, cache: CompletionCache = None, coalescer: SingleFlight = None,
+                 config: Dict[str, Any] = None, batching: Dict[str, Any] = None):
         self.api_url = "http://localhost:8080/completion"
-        self.timeout = 30
+        self.health_url = "http://localhost:8080/health"
+        # Shared keep-alive pool (config/providers.json "http_clients")
+        self.http = get_http_client("local_mistral")
+        # Optional exact-match completion cache (config/providers.json "completion_cache")
+        self.cache = cache
+        # Optional coalescing of identical concurrent completions (config/providers.json "coalescing")
+        self.coalescer = coalescer
+        # Prompt caching and slot affinity (config/providers.json "local_mistral")
+        self.config = {**DEFAULT_LLAMA_CONFIG, **(config or {})}
+        self._prompt_lock = threading.Lock()
+        self.prompt_stats = {"completions": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        # Optional micro-batching of concurrent completions (config/providers.json "micro_batching")
+        self.batcher = MicroBatcher.from_config("local_mistral", batching, self._complete_batch)
         logger.info("🤖 LocalMistralProvider initialized")
-    
+
     def ask(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
         """
         Send prompt to local Mistral server
-        
+
         Returns:
         {
             "success": bool,
@@ -32,67 +68,351 @@ class LocalMistralProvider:
             "tokens": int
         }
         """
-        
+
+        start_time = time.time()
+        payload = self._build_payload(prompt, client_id, persona_id)
+        cache_key, cached = self._cache_lookup(payload, persona_id, start_time)
+        if cached:
+            return cached
+
+        if self.coalescer is None:
+            return self._complete(payload, cache_key, start_time)
+        return self.coalescer.do(completion_key(payload),
+                                 lambda: self._complete(payload, cache_key, start_time),
+                                 retain=self._succeeded)
+
+    async def ask_async(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
+        """
+        Send prompt to local Mistral server without blocking the event loop
+
+        Same contract as ask(); used by the ASGI serving mode.
+        """
+
+        start_time = time.time()
+        payload = self._build_payload(prompt, client_id, persona_id)
+        cache_key, cached = self._cache_lookup(payload, persona_id, start_time)
+        if cached:
+            return cached
+
+        if self.coalescer is None:
+            return await self._complete_async(payload, cache_key, start_time)
+        return await self.coalescer.do_async(completion_key(payload),
+                                             lambda: self._complete_async(payload, cache_key, start_time),
+                                             retain=self._succeeded)
+
+    def stream(self, prompt: str, client_id: str, persona_id: str) -> Iterator[str]:
+        """
+        Stream completion tokens from llama.cpp (stream=true, SSE lines)
+
+        Yields token strings as they arrive. Raises if the server fails
+        before or during the stream so the caller can fall through.
+        """
+
         start_time = time.time()
-        
-        # Compose JSON payload
+        payload = self._build_payload(prompt, client_id, persona_id)
+        cache_key, cached = self._cache_lookup(payload, persona_id, start_time)
+        if cached:
+            yield cached["response"]
+            return
+        payload["stream"] = True
+
+        logger.info(f"Streaming local Mistral: {len(prompt)} chars")
+
+        tokens, finished = [], False
+        with self.http.post(self.api_url, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+            for line in response.iter_lines(decode_unicode=True):
+                chunk = self._parse_stream_line(line)
+                if chunk is None:
+                    continue
+                if chunk.get("content"):
+                    tokens.append(chunk["content"])
+                    yield chunk["content"]
+                if chunk.get("stop"):
+                    self._record_prompt_tokens(chunk)
+                    finished = True
+                    break
+
+        # A stream cut off before its stop chunk is a partial answer: never cached
+        if finished:
+            self._cache_store(cache_key, self._stream_result(tokens, start_time))
+
+    async def stream_async(self, prompt: str, client_id: str, persona_id: str) -> AsyncIterator[str]:
+        """Async variant of stream() for the ASGI serving mode"""
+
+        start_time = time.time()
+        payload = self._build_payload(prompt, client_id, persona_id)
+        cache_key, cached = self._cache_lookup(payload, persona_id, start_time)
+        if cached:
+            yield cached["response"]
+            return
+        payload["stream"] = True
+
+        logger.info(f"Streaming local Mistral (async): {len(prompt)} chars")
+
+        tokens, finished = [], False
+        async with self.http.async_client.stream("POST", self.api_url, json=payload) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+            async for line in response.aiter_lines():
+                chunk = self._parse_stream_line(line)
+                if chunk is None:
+                    continue
+                if chunk.get("content"):
+                    tokens.append(chunk["content"])
+                    yield chunk["content"]
+                if chunk.get("stop"):
+                    self._record_prompt_tokens(chunk)
+                    finished = True
+                    break
+
+        if finished:
+            self._cache_store(cache_key, self._stream_result(tokens, start_time))
+
+    def _complete(self, payload: Dict[str, Any], cache_key: Optional[str], start_time: float) -> Dict[str, Any]:
+        """POST one completion to llama.cpp (through the micro-batcher when enabled)"""
+        try:
+            if self.batcher is not None:
+                # Wait no longer than the request deadline for the batch
+                result = self.batcher.run((payload, start_time), group=self._batch_group(payload),
+                                          timeout=cap_timeout(None))
+            else:
+                result = self._post_completion(payload, start_time)
+            return self._cache_store(cache_key, result)
+
+        except FutureTimeout:
+            return self._timeout_result(start_time)
+
+        except Exception as e:
+            return self._exception_result(e, start_time)
+
+    async def _complete_async(self, payload: Dict[str, Any], cache_key: Optional[str], start_time: float) -> Dict[str, Any]:
+        """POST one completion to llama.cpp on the event loop"""
+        if self.batcher is not None:
+            try:
+                result = await self.batcher.run_async((payload, start_time), group=self._batch_group(payload))
+            except Exception as e:
+                return self._exception_result(e, start_time)
+            return self._cache_store(cache_key, result)
+
+        try:
+            logger.info(f"Calling local Mistral (async): {len(payload['prompt'])} chars")
+
+            response = await self.http.async_client.post(self.api_url, json=payload)
+
+            return self._cache_store(cache_key, self._parse_response(response.status_code, response, start_time))
+
+        except httpx.TimeoutException:
+            return self._timeout_result(start_time)
+
+        except Exception as e:
+            return self._exception_result(e, start_time)
+
+    def _complete_batch(self, items: List[Tuple[Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """
+        Micro-batcher dispatch: one /completion call for several prompts
+
+        llama.cpp answers a list-valued "prompt" with one result per prompt,
+        decoding them together on its parallel slots. A batch of one keeps
+        its own payload (and slot affinity).
+        """
+        if len(items) == 1:
+            payload, start_time = items[0]
+            return [self._post_completion(payload, start_time)]
+
+        payloads = [payload for payload, _ in items]
+        body = {key: value for key, value in payloads[0].items() if key != "id_slot"}
+        body["prompt"] = [payload["prompt"] for payload in payloads]
+        logger.info(f"Calling local Mistral: batch of {len(items)}")
+
+        try:
+            response = self.http.post(self.api_url, json=body)
+        except requests.exceptions.Timeout:
+            return [self._timeout_result(start_time) for _, start_time in items]
+
+        if response.status_code != 200:
+            return [self._parse_response(response.status_code, response, start_time) for _, start_time in items]
+
+        results = response.json()
+        if isinstance(results, dict):
+            results = results.get("results", [results])
+        results = sorted(results, key=lambda r: r.get("index", 0))
+        if len(results) != len(items):
+            raise ValueError(f"llama.cpp returned {len(results)} completions for {len(items)} prompts")
+        return [self._success_result(result, start_time) for result, (_, start_time) in zip(results, items)]
+
+    def _post_completion(self, payload: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        try:
+            logger.info(f"Calling local Mistral: {len(payload['prompt'])} chars")
+            response = self.http.post(self.api_url, json=payload)
+            return self._parse_response(response.status_code, response, start_time)
+        except requests.exceptions.Timeout:
+            return self._timeout_result(start_time)
+
+    @staticmethod
+    def _batch_group(payload: Dict[str, Any]) -> str:
+        """Completions may share a batch when everything but the prompt (and slot) matches"""
+        return json.dumps({key: value for key, value in payload.items() if key not in ("prompt", "id_slot")},
+                          sort_keys=True)
+
+    @staticmethod
+    def _succeeded(result: Dict[str, Any]) -> bool:
+        return bool(result.get("success"))
+
+    def probe(self) -> bool:
+        """Cheap liveness check used by the cascade's circuit breaker"""
+        response = self.http.get(self.health_url, timeout=(self.http.config["connect_timeout"], 2))
+        return response.status_code == 200
+
+    def _parse_stream_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Decode one `data: {...}` line from a llama.cpp completion stream"""
+        if not line or not line.startswith("data: "):
+            return None
+        try:
+            return json.loads(line[len("data: "):])
+        except ValueError:
+            logger.warning(f"Malformed stream chunk: {line[:80]}")
+            return None
+
+    def _cache_lookup(self, payload: Dict[str, Any], persona_id: str, start_time: float):
+        """(cache_key, cached_result); key is None when the cache is off or bypassed"""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.key_for(payload, persona_id)
+        if cache_key is None:
+            return None, None
+        cached = self.cache.get(cache_key)
+        if cached:
+            logger.info("✓ Completion cache hit")
+            cached.update(cached=True, latency=time.time() - start_time)
+        return cache_key, cached
+
+    def _cache_store(self, cache_key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Remember successful results under cache_key; returns result unchanged"""
+        if cache_key and result.get("success"):
+            self.cache.put(cache_key, result)
+        return result
+
+    def _stream_result(self, tokens: list, start_time: float) -> Dict[str, Any]:
+        response_text = "".join(tokens).strip()
+        return {
+            "success": bool(response_text),
+            "response": response_text,
+            "latency": time.time() - start_time,
+            "tokens": len(response_text) // 4
+        }
+
+    def _build_payload(self, prompt: str, client_id: str = None, persona_id: str = None) -> Dict[str, Any]:
+        """Compose JSON payload for llama.cpp /completion"""
         payload = {
             "prompt": prompt,
             "n_predict": 256,
             "temperature": 0.7,
             "top_p": 0.9,
-            "stop": ["User:", "Assistant:"]
+            "stop": ["User:", "Assistant:"],
+            "cache_prompt": self.config["cache_prompt"]
         }
-        
-        try:
-            logger.info(f"Calling local Mistral: {len(prompt)} chars")
-            
-            response = requests.post(
-                self.api_url, 
-                json=payload, 
-                timeout=self.timeout
-            )
-            
-            latency = time.time() - start_time
-            
-            if response.status_code == 200:
-                result = response.json()
-                response_text = result.get("content", "").strip()
-                
-                logger.info(f"✓ Success: {latency:.2f}s")
-                
-                return {
-                    "success": True,
-                    "response": response_text,
-                    "latency": latency,
-                    "tokens": len(response_text) // 4  # Rough estimate
-                }
-            else:
-                error = f"HTTP {response.status_code}"
-                logger.error(f"✗ Server error: {error}")
-                
-                return {
-                    "success": False,
-                    "error": error,
-                    "latency": latency
-                }
-                
-        except requests.exceptions.Timeout:
-            latency = time.time() - start_time
-            logger.error(f"✗ Timeout after {latency:.2f}s")
-            
-            return {
-                "success": False,
-                "error": "Request timeout",
-                "latency": latency
-            }
-            
-        except Exception as e:
-            latency = time.time() - start_time
-            logger.error(f"✗ Exception: {e}")
-            
-            return {
-                "success": False,
-                "error": str(e),
-                "latency": latency
-            }
+        slot = self._slot_for(client_id, persona_id)
+        if slot is not None:
+            payload["id_slot"] = slot
+        return payload
+
+    def _slot_for(self, client_id: Optional[str], persona_id: Optional[str]) -> Optional[int]:
+        """
+        Stable llama.cpp slot for a client/persona session
+
+        A slot keeps the KV cache of its last prompt, so sending a session
+        back to the same slot lets the shared prefix be reused.
+        """
+        slots = self.config["slots"]
+        if not slots or client_id is None:
+            return None
+        return zlib.crc32(f"{client_id}:{persona_id}".encode()) % slots
+
+    def _record_prompt_tokens(self, body: Dict[str, Any]) -> Dict[str, int]:
+        """Count prompt tokens served from the KV cache vs evaluated, from a final response body"""
+        timings = body.get("timings") or {}
+        if "cache_n" in timings:
+            cached = timings.get("cache_n", 0)
+            total = cached + timings.get("prompt_n", 0)
+        elif "tokens_evaluated" in body:
+            total = body.get("tokens_evaluated", 0)
+            cached = min(body.get("tokens_cached", 0), total)
+        else:
+            return {}
+
+        with self._prompt_lock:
+            self.prompt_stats["completions"] += 1
+            self.prompt_stats["prompt_tokens"] += total
+            self.prompt_stats["cached_tokens"] += cached
+        PROMPT_TOKENS.labels(source="cached").inc(cached)
+        PROMPT_TOKENS.labels(source="evaluated").inc(total - cached)
+        return {"prompt_tokens": total, "cached_prompt_tokens": cached}
+
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """Share of prompt tokens served from llama.cpp's prompt cache"""
+        with self._prompt_lock:
+            stats = dict(self.prompt_stats)
+        stats["prefix_reuse"] = round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0
+        return {**stats, "config": self.config}
+
+    def _parse_response(self, status_code: int, response, start_time: float) -> Dict[str, Any]:
+        """Turn a completion HTTP response into the provider result dict"""
+        latency = time.time() - start_time
+
+        if status_code == 200:
+            return self._success_result(response.json(), start_time)
+
+        error = f"HTTP {status_code}"
+        logger.error(f"✗ Server error: {error}")
+
+        return {
+            "success": False,
+            "error": error,
+            "latency": latency
+        }
+
+    def _success_result(self, result: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Provider result dict for one completion body"""
+        latency = time.time() - start_time
+        response_text = result.get("content", "").strip()
+
+        logger.info(f"✓ Success: {latency:.2f}s")
+
+        return {
+            "success": True,
+            "response": response_text,
+            "latency": latency,
+            "tokens": len(response_text) // 4,  # Rough estimate
+            **self._record_prompt_tokens(result)
+        }
+
+    def _timeout_result(self, start_time: float) -> Dict[str, Any]:
+        latency = time.time() - start_time
+        logger.error(f"✗ Timeout after {latency:.2f}s")
+
+        return self._tag_deadline({
+            "success": False,
+            "error": "Request timeout",
+            "latency": latency
+        })
+
+    def _exception_result(self, e: Exception, start_time: float) -> Dict[str, Any]:
+        latency = time.time() - start_time
+        logger.error(f"✗ Exception: {e}")
+
+        return self._tag_deadline({
+            "success": False,
+            "error": str(e),
+            "latency": latency
+        })
+
+    @staticmethod
+    def _tag_deadline(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Mark a failure caused by the request deadline (the cascade does not count it against the server)"""
+        if not has_budget():
+            result["deadline_exceeded"] = True
+        return result
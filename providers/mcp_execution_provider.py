@@ -16,6 +16,7 @@ from pathlib import Path
 
 from memory.db import db
 from core.tool_manager import tool_manager
+from core.intent_engine import COMMAND_INTENTS, command_intent_engine
 
 logger = logging.getLogger("MCPExecutionProvider")
 
@@ -26,82 +27,37 @@ class MCPExecutionProvider:
     
     def __init__(self):
         self.command_patterns = self._load_command_patterns()
+        # All command patterns compiled into one alternation, scanned once per prompt
+        self.intent_engine = command_intent_engine(extractors={
+            intent: (lambda text, intent=intent: self._extract_parameters(text, intent))
+            for intent in self.command_patterns
+        })
         logger.info("⚡ MCPExecutionProvider initialized")
     
     def _load_command_patterns(self) -> Dict[str, Dict[str, Any]]:
         """Load command detection patterns and mappings"""
-        return {
-            "query_memory": {
-                "patterns": [
-                    r"what do you (?:know|remember) about.*",
-                    r"tell me about.*",
-                    r"search.*memory.*for.*",
-                    r"recall.*about.*",
-                    r"remember.*about.*",
-                    r"what.*memory.*about.*"
-                ],
-                "action": "query_memory"
-            },
-            "list_files": {
-                "patterns": [
-                    r"list files?.*in.*",
-                    r"show.*files.*in.*",
-                    r"what.*files.*in.*",
-                    r"directory.*contents.*",
-                    r"ls .*",
-                    r"dir .*"
-                ],
-                "action": "list_directory"
-            },
-            "read_file": {
-                "patterns": [
-                    r"read.*file.*",
-                    r"show.*contents?.*of.*",
-                    r"cat .*",
-                    r"type .*",
-                    r"open.*file.*"
-                ],
-                "action": "read_file"
-            },
-            "search_files": {
-                "patterns": [
-                    r"find.*files?.*",
-                    r"search.*for.*files?.*",
-                    r"locate.*files?.*"
-                ],
-                "action": "search_files"
-            },
-            "get_processes": {
-                "patterns": [
-                    r"list.*processes.*",
-                    r"show.*processes.*",
-                    r"what.*processes.*",
-                    r"running.*processes.*"
-                ],
-                "action": "list_processes"
-            }
-        }
+        return COMMAND_INTENTS
+    
+    def match_intent(self, prompt: str) -> Optional[str]:
+        """Name of the first command intent whose patterns match (no parameter extraction)"""
+        return self.intent_engine.match(prompt.strip())
     
     def detect_command_intent(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Analyze prompt to detect execution intent"""
-        prompt_lower = prompt.lower().strip()
+        # Matched intent plus its extracted parameters
+        match = self.intent_engine.classify(prompt.strip())
+        if match is None:
+            return None
         
-        for intent, config in self.command_patterns.items():
-            for pattern in config["patterns"]:
-                if re.search(pattern, prompt_lower):
-                    logger.info(f"Detected intent: {intent}")
-                    
-                    # Extract parameters based on intent type
-                    params = self._extract_parameters(prompt, intent)
-                    
-                    return {
-                        "intent": intent,
-                        "action": config["action"],
-                        "original_prompt": prompt,
-                        **params  # Merge extracted parameters
-                    }
+        intent, params = match
+        logger.info(f"Detected intent: {intent}")
         
-        return None
+        return {
+            "intent": intent,
+            "action": self.command_patterns[intent]["action"],
+            "original_prompt": prompt,
+            **params  # Merge extracted parameters
+        }
     
     def _extract_parameters(self, prompt: str, intent: str) -> Dict[str, Any]:
         """Extract parameters from prompt based on intent type"""
@@ -337,7 +293,8 @@ class MCPExecutionProvider:
                 return {
                     "success": False,
                     "error": "No execution intent detected",
-                    "provider": "mcp_execution"
+                    "provider": "mcp_execution",
+                    "declined": True
                 }
                 
         except Exception as e:
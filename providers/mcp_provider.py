@@ -5,54 +5,112 @@ Combines intelligent prompt composition with local LLM
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, AsyncIterator
 from core.mcp_runtime import MCPRuntime
+from core.async_runtime import run_blocking
 from providers.local_mistral import LocalMistralProvider
 
 logger = logging.getLogger("MCPProvider")
 
 class MCPProvider:
     """MCP Provider that combines MCPRuntime with LocalMistral"""
-    
-    def __init__(self):
+
+    def __init__(self, mistral_provider: LocalMistralProvider = None):
         self.mcp_runtime = MCPRuntime()
-        self.mistral_provider = LocalMistralProvider()
+        # Share the cascade's LocalMistral instance (and its connection pool)
+        self.mistral_provider = mistral_provider or LocalMistralProvider()
         logger.info("🔌 MCPProvider initialized")
-    
+
     def ask(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
         """
         Use MCPRuntime to compose prompt, then send to LocalMistral
         """
-        
+
         try:
             # Step 1: Compose prompt using MCPRuntime
             composition = self.mcp_runtime.compose_prompt(
                 prompt, client_id, persona_id, context_mode="balanced"
             )
-            
+
             final_prompt = composition["final_prompt"]
             metadata = composition["metadata"]
-            
+
             logger.info(f"Composed prompt: {metadata['token_estimate']} tokens")
-            
+
             # Step 2: Send to LocalMistral
             result = self.mistral_provider.ask(final_prompt, client_id, persona_id)
-            
-            if result["success"]:
-                logger.info("✓ MCP chain successful")
-                return {
-                    "success": True,
-                    "response": result["response"],
-                    "metadata": metadata,
-                    "latency": result.get("latency", 0)
-                }
-            else:
-                logger.error(f"✗ LocalMistral failed: {result.get('error')}")
-                return result
-                
+
+            return self._wrap_result(result, metadata)
+
+        except Exception as e:
+            logger.error(f"✗ MCP chain failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def ask_async(self, prompt: str, client_id: str, persona_id: str) -> Dict[str, Any]:
+        """
+        Async MCP chain: composition runs on the blocking executor (it is
+        DB-bound), the completion call is awaited on the loop
+        """
+
+        try:
+            composition = await run_blocking(
+                self.mcp_runtime.compose_prompt,
+                prompt, client_id, persona_id, context_mode="balanced"
+            )
+
+            final_prompt = composition["final_prompt"]
+            metadata = composition["metadata"]
+
+            logger.info(f"Composed prompt: {metadata['token_estimate']} tokens")
+
+            result = await self.mistral_provider.ask_async(final_prompt, client_id, persona_id)
+
+            return self._wrap_result(result, metadata)
+
         except Exception as e:
             logger.error(f"✗ MCP chain failed: {e}")
             return {
                 "success": False,
                 "error": str(e)
             }
+
+    def stream(self, prompt: str, client_id: str, persona_id: str) -> Iterator[str]:
+        """Compose the prompt, then relay LocalMistral's token stream"""
+        composition = self.mcp_runtime.compose_prompt(
+            prompt, client_id, persona_id, context_mode="balanced"
+        )
+        logger.info(f"Composed prompt: {composition['metadata']['token_estimate']} tokens (streaming)")
+
+        yield from self.mistral_provider.stream(composition["final_prompt"], client_id, persona_id)
+
+    async def stream_async(self, prompt: str, client_id: str, persona_id: str) -> AsyncIterator[str]:
+        """Async variant of stream()"""
+        composition = await run_blocking(
+            self.mcp_runtime.compose_prompt,
+            prompt, client_id, persona_id, context_mode="balanced"
+        )
+        logger.info(f"Composed prompt: {composition['metadata']['token_estimate']} tokens (streaming)")
+
+        async for token in self.mistral_provider.stream_async(composition["final_prompt"], client_id, persona_id):
+            yield token
+
+    def probe(self) -> bool:
+        """Liveness of the completion backend (composition is local)"""
+        return self.mistral_provider.probe()
+
+    def _wrap_result(self, result: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach composition metadata to a successful LocalMistral result"""
+        if result["success"]:
+            logger.info("✓ MCP chain successful")
+            return {
+                "success": True,
+                "response": result["response"],
+                "metadata": metadata,
+                "latency": result.get("latency", 0)
+            }
+
+        logger.error(f"✗ LocalMistral failed: {result.get('error')}")
+        return result
@@ -21,6 +21,12 @@ admin_bp = Blueprint('admin', __name__)
 # Admin API key (should be in environment)
 ADMIN_API_KEY = os.getenv('VALIS_ADMIN_KEY', 'valis_admin_2025')
 
+def has_admin_auth() -> bool:
+    """True when the current request carries the admin API key"""
+    # Check for API key in header or query parameter
+    api_key = request.headers.get('X-Admin-Key') or request.args.get('admin_key')
+    return bool(api_key) and api_key == ADMIN_API_KEY
+
 def require_admin_auth(f):
     """Decorator to require admin authentication"""
     @wraps(f)
@@ -28,11 +34,8 @@ def require_admin_auth(f):
         # Allow OPTIONS requests for CORS preflight
         if request.method == 'OPTIONS':
             return f(*args, **kwargs)
-            
-        # Check for API key in header or query parameter
-        api_key = request.headers.get('X-Admin-Key') or request.args.get('admin_key')
         
-        if not api_key or api_key != ADMIN_API_KEY:
+        if not has_admin_auth():
             abort(401, description='Admin authentication required')
         
         return f(*args, **kwargs)
@@ -377,6 +380,112 @@ def override_provider():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/startup', methods=['GET'])
+@require_admin_auth
+def startup_profile():
+    """Startup profile: import time per module, build time per lazy component"""
+    try:
+        from core.lazy_init import startup
+        top = request.args.get('top', default=25, type=int)
+
+        return jsonify({
+            'success': True,
+            'startup': startup.profile(top=top),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"Failed to get startup profile: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/api/admin/profile_cache', methods=['GET'])
+@require_admin_auth
+def profile_cache_stats():
+    """Persona/client profile cache hit rate, size and invalidations"""
+    try:
+        from memory.profile_cache import profile_cache
+
+        return jsonify({
+            'success': True,
+            'profile_cache': profile_cache.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"Failed to get profile cache stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/api/admin/profile_cache/invalidate', methods=['POST'])
+@require_admin_auth
+def invalidate_profile_cache():
+    """Drop every cached profile in all workers (after editing profiles directly in the database)"""
+    try:
+        from memory.profile_cache import profile_cache
+        profile_cache.invalidate_all()
+
+        return jsonify({
+            'success': True,
+            'profile_cache': profile_cache.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"Failed to invalidate profile cache: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/api/admin/providers', methods=['GET'])
+@require_admin_auth
+def provider_status():
+    """Provider cascade status including circuit breaker state"""
+    try:
+        import inference
+        if inference.provider_manager is None:
+            return jsonify({'success': False, 'error': 'System not initialized'}), 503
+        
+        return jsonify({
+            'success': True,
+            'providers': inference.provider_manager.get_status(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Failed to get provider status: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/api/admin/providers/<provider_name>/breaker', methods=['POST'])
+@require_admin_auth
+def provider_breaker(provider_name):
+    """Reset (close) or trip (open) a provider's circuit breaker"""
+    try:
+        import inference
+        manager = inference.provider_manager
+        if manager is None:
+            return jsonify({'success': False, 'error': 'System not initialized'}), 503
+        if provider_name not in manager.breakers:
+            return jsonify({'success': False, 'error': f'Unknown provider: {provider_name}'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        action = data.get('action', 'reset')
+        if action == 'reset':
+            breaker = manager.reset_breaker(provider_name)
+        elif action == 'trip':
+            breaker = manager.trip_breaker(provider_name)
+        else:
+            return jsonify({'success': False, 'error': "action must be 'reset' or 'trip'"}), 400
+        
+        logger.info(f"Admin {action} of circuit breaker for {provider_name}")
+        return jsonify({
+            'success': True,
+            'provider': provider_name,
+            'action': action,
+            'breaker': breaker
+        })
+        
+    except Exception as e:
+        logger.error(f"Failed to update circuit breaker: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @admin_bp.route('/api/admin/logs', methods=['GET'])
 @require_admin_auth
 def get_all_logs():
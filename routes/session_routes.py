@@ -68,6 +68,7 @@ def init_session():
         
         # Insert into database
         actual_client_id = db.insert('client_profiles', client_data)
+        memory.invalidate_client(actual_client_id)
         
         logger.info(f"Created new session: client_id={actual_client_id}, persona={assigned_persona['name']}")
         
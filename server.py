@@ -4,24 +4,35 @@ VALIS 2.0 Cloud-Hardened Server
 Flask server with rate limiting, health monitoring, and error tracking
 """
 
-from flask import Flask, request, jsonify, send_from_directory, g
+# Startup profiling starts before the heavy imports below
+from core.lazy_init import startup
+startup.begin()
+
+from flask import Flask, Response, request, jsonify, send_from_directory, g, stream_with_context
 from flask_cors import CORS
+import json
 import logging
 import sys
 import os
 import uuid
 import time
+import contextvars
 from pathlib import Path
-from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from functools import wraps
 
 from routes.session_routes import session_bp
-from routes.admin_routes import admin_bp
-from inference import run_inference, initialize
+from routes.admin_routes import admin_bp, has_admin_auth
+from inference import run_inference, run_inference_batch, stream_inference, initialize, BATCH_CONCURRENCY
 from memory.query_client import memory
 from memory.db import db
 from core.tool_manager import tool_manager
+from core.model_caps import MAX_CONTEXT_LIMITS
+from core.rate_limiter import RateLimiter
+from core.health_monitor import health_monitor
+from core import telemetry
+from core.deadline import start_deadline, clear_deadline, request_budget
+from cloud.watermark_engine import VALISWatermarkEngine
 
 # Configure logging with request tracking
 logging.basicConfig(
@@ -35,13 +46,19 @@ app = Flask(__name__)
 CORS(app, 
      origins=['http://localhost:3001', 'http://127.0.0.1:3001', 'http://localhost:*'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'X-Admin-Key', 'Authorization'],
+     allow_headers=['Content-Type', 'X-Admin-Key', 'Authorization', 'X-Request-Timeout'],
      supports_credentials=True)
 
-# Rate limiting storage (in production, use Redis)
-rate_limits = defaultdict(lambda: deque())
+# Rate limiting (VALIS_RATE_LIMIT_BACKEND=shared to enforce across workers)
 RATE_LIMIT_REQUESTS = 60  # requests per minute
 RATE_LIMIT_WINDOW = 60    # seconds
+chat_rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, name="chat")
+# Batch requests are charged per item, against their own budget
+BATCH_RATE_LIMIT_ITEMS = int(os.getenv('VALIS_BATCH_RATE_LIMIT', '1000'))  # items per minute
+batch_rate_limiter = RateLimiter(BATCH_RATE_LIMIT_ITEMS, RATE_LIMIT_WINDOW, name="chat_batch")
+
+# Request ID for code running outside a Flask request (ASGI serving mode)
+current_request_id = contextvars.ContextVar('current_request_id', default='no-context')
 
 class CloudHardenedFilter(logging.Filter):
     """Add request ID to log records"""
@@ -51,7 +68,7 @@ class CloudHardenedFilter(logging.Filter):
             record.request_id = getattr(g, 'request_id', 'no-request')
         except RuntimeError:
             # Outside of Flask application context
-            record.request_id = 'no-context'
+            record.request_id = current_request_id.get()
         return True
 
 # Add filter to all loggers
@@ -62,101 +79,105 @@ def add_request_id():
     """Add unique request ID to Flask g object"""
     g.request_id = str(uuid.uuid4())[:8]
 
+def check_rate_limit(client_ip: str) -> dict:
+    """Count a request for client_ip; returns the RateLimiter decision"""
+    decision = chat_rate_limiter.check(client_ip)
+    if not decision['allowed']:
+        logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+    return decision
+
 def rate_limit(f):
     """Rate limiting decorator"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-        now = time.time()
         
-        # Clean old entries
-        rate_limits[client_ip] = deque([
-            timestamp for timestamp in rate_limits[client_ip]
-            if now - timestamp < RATE_LIMIT_WINDOW
-        ])
-        
-        # Check rate limit
-        if len(rate_limits[client_ip]) >= RATE_LIMIT_REQUESTS:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+        decision = check_rate_limit(client_ip)
+        if not decision['allowed']:
             return jsonify({
                 'success': False,
                 'error': 'Rate limit exceeded',
-                'retry_after': 60
-            }), 429
-        
-        # Add current request
-        rate_limits[client_ip].append(now)
+                'retry_after': decision['retry_after']
+            }), 429, {'Retry-After': str(decision['retry_after'])}
         
         return f(*args, **kwargs)
     return decorated_function
 
+# Watermarks applied to streamed replies once the stream completes
+watermark_engine = VALISWatermarkEngine()
+
 # Add request ID to all requests
 @app.before_request
 def before_request():
     add_request_id()
+    g.request_start = time.perf_counter()
+    telemetry.start_request()
+    # End-to-end budget for everything this request does (see core.deadline);
+    # batch items are budgeted one by one in run_inference_batch
+    if request.endpoint == 'chat_batch':
+        clear_deadline()
+    else:
+        start_deadline(request_budget(request.headers.get('X-Request-Timeout')))
+
+@app.after_request
+def add_server_timing(response):
+    """Report request phases in Server-Timing and the request histogram"""
+    duration = time.perf_counter() - g.request_start
+    spans = telemetry.get_request_spans() or []
+    response.headers['Server-Timing'] = telemetry.server_timing_header(spans, total=duration)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    telemetry.observe_request(endpoint, request.method, response.status_code, duration)
+    return response
 
 # Register blueprints
 app.register_blueprint(session_bp)
 app.register_blueprint(admin_bp)
 
+def probe_database():
+    db.query("SELECT 1")
+    return {'status': 'healthy', 'type': 'postgresql'}
+
+def probe_tools():
+    tool_health = tool_manager.health_check()
+    return {
+        'status': tool_health['status'],
+        'available_tools': tool_health['available_tools']
+    }
+
+def probe_memory():
+    result = db.query("SELECT COUNT(*) AS personas FROM persona_profiles")
+    return {'status': 'healthy', 'personas': result[0]['personas']}
+
+health_monitor.register('database', probe_database)
+health_monitor.register('tools', probe_tools)
+health_monitor.register('memory', probe_memory)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Enhanced health check with component status"""
+    """
+    Component health, answered from the background probe cache
+
+    ?deep=1 forces a live probe of every component (admin key required,
+    so pollers cannot bypass the cache).
+    """
     try:
+        deep = request.args.get('deep') in ('1', 'true')
+        if deep and not has_admin_auth():
+            return jsonify({
+                'success': False,
+                'error': 'Admin authentication required for deep health checks',
+                'request_id': g.request_id
+            }), 401
+        snapshot = health_monitor.snapshot(deep=deep)
         health_data = {
             'success': True,
-            'status': 'healthy',
             'service': 'VALIS 2.0 Cloud Server',
             'version': '2.0',
             'timestamp': datetime.now().isoformat(),
             'request_id': g.request_id,
-            'components': {}
+            **snapshot
         }
         
-        # Test database connection
-        try:
-            db.query("SELECT 1")
-            health_data['components']['database'] = {
-                'status': 'healthy',
-                'type': 'postgresql'
-            }
-        except Exception as e:
-            health_data['components']['database'] = {
-                'status': 'unhealthy',
-                'error': str(e)
-            }
-            health_data['status'] = 'degraded'
-        
-        # Test tool manager
-        try:
-            tool_health = tool_manager.health_check()
-            health_data['components']['tools'] = {
-                'status': tool_health['status'],
-                'available_tools': tool_health['available_tools']
-            }
-            if tool_health['status'] != 'healthy':
-                health_data['status'] = 'degraded'
-        except Exception as e:
-            health_data['components']['tools'] = {
-                'status': 'unhealthy',
-                'error': str(e)
-            }
-            health_data['status'] = 'degraded'
-        
-        # Memory system status
-        try:
-            persona_count = len(db.query("SELECT id FROM persona_profiles"))
-            health_data['components']['memory'] = {
-                'status': 'healthy',
-                'personas': persona_count
-            }
-        except Exception as e:
-            health_data['components']['memory'] = {
-                'status': 'unhealthy',
-                'error': str(e)
-            }
-            health_data['status'] = 'degraded'
-        
         status_code = 200 if health_data['status'] == 'healthy' else 503
         return jsonify(health_data), status_code
         
@@ -169,6 +190,96 @@ def health_check():
             'request_id': getattr(g, 'request_id', 'unknown')
         }), 500
 
+def validate_chat_request(data, request_id: str):
+    """
+    Validate a chat payload and resolve its client and persona
+    
+    Returns (fields, None) on success, or (None, (body, status_code)) with a
+    JSON-serialisable error body. Framework-neutral so the ASGI server can
+    share the same messages and status codes.
+    """
+    if not data:
+        logger.warning("Chat request with no data")
+        return None, ({
+            'success': False, 
+            'error': 'No data provided',
+            'request_id': request_id
+        }, 400)
+    
+    # Extract required fields
+    message = data.get('message', '').strip()
+    client_id = data.get('client_id')
+    persona_id = data.get('persona_id')
+    context_mode = data.get('context_mode', 'balanced')
+    
+    # Validate required fields
+    if not message:
+        logger.warning(f"Empty message in chat request")
+        return None, ({
+            'success': False, 
+            'error': 'Message is required',
+            'request_id': request_id
+        }, 400)
+    if not client_id:
+        logger.warning(f"Missing client_id in chat request")
+        return None, ({
+            'success': False, 
+            'error': 'Client ID is required',
+            'request_id': request_id
+        }, 400)
+    if not persona_id:
+        logger.warning(f"Missing persona_id in chat request")
+        return None, ({
+            'success': False, 
+            'error': 'Persona ID is required',
+            'request_id': request_id
+        }, 400)
+    
+    # Validate client exists
+    try:
+        client = memory.get_client(client_id)
+        if not client:
+            logger.warning(f"Invalid client_id: {client_id}")
+            return None, ({
+                'success': False, 
+                'error': 'Invalid client ID',
+                'request_id': request_id
+            }, 400)
+    except Exception as e:
+        logger.error(f"Error validating client {client_id}: {e}")
+        return None, ({
+            'success': False, 
+            'error': 'Client validation failed',
+            'request_id': request_id
+        }, 500)
+    
+    # Validate persona exists
+    try:
+        persona = memory.get_persona(persona_id)
+        if not persona:
+            logger.warning(f"Invalid persona_id: {persona_id}")
+            return None, ({
+                'success': False, 
+                'error': 'Invalid persona ID',
+                'request_id': request_id
+            }, 400)
+    except Exception as e:
+        logger.error(f"Error validating persona {persona_id}: {e}")
+        return None, ({
+            'success': False, 
+            'error': 'Persona validation failed',
+            'request_id': request_id
+        }, 500)
+    
+    return {
+        'message': message,
+        'client_id': client_id,
+        'persona_id': persona_id,
+        'context_mode': context_mode,
+        'client': client,
+        'persona': persona
+    }, None
+
 @app.route('/api/chat', methods=['POST'])
 @rate_limit
 def chat():
@@ -178,89 +289,27 @@ def chat():
     try:
         logger.info(f"Chat request received from {request.remote_addr}")
         
-        data = request.get_json()
-        if not data:
-            logger.warning("Chat request with no data")
-            return jsonify({
-                'success': False, 
-                'error': 'No data provided',
-                'request_id': g.request_id
-            }), 400
-        
-        # Extract required fields
-        message = data.get('message', '').strip()
-        client_id = data.get('client_id')
-        persona_id = data.get('persona_id')
-        context_mode = data.get('context_mode', 'balanced')
-        
-        # Validate required fields
-        if not message:
-            logger.warning(f"Empty message in chat request")
-            return jsonify({
-                'success': False, 
-                'error': 'Message is required',
-                'request_id': g.request_id
-            }), 400
-        if not client_id:
-            logger.warning(f"Missing client_id in chat request")
-            return jsonify({
-                'success': False, 
-                'error': 'Client ID is required',
-                'request_id': g.request_id
-            }), 400
-        if not persona_id:
-            logger.warning(f"Missing persona_id in chat request")
-            return jsonify({
-                'success': False, 
-                'error': 'Persona ID is required',
-                'request_id': g.request_id
-            }), 400
-        
-        # Validate client exists
-        try:
-            client = memory.get_client(client_id)
-            if not client:
-                logger.warning(f"Invalid client_id: {client_id}")
-                return jsonify({
-                    'success': False, 
-                    'error': 'Invalid client ID',
-                    'request_id': g.request_id
-                }), 400
-        except Exception as e:
-            logger.error(f"Error validating client {client_id}: {e}")
-            return jsonify({
-                'success': False, 
-                'error': 'Client validation failed',
-                'request_id': g.request_id
-            }), 500
+        with telemetry.span('validate'):
+            fields, error = validate_chat_request(request.get_json(), g.request_id)
+        if error:
+            body, status_code = error
+            return jsonify(body), status_code
         
-        # Validate persona exists
-        try:
-            persona = memory.get_persona(persona_id)
-            if not persona:
-                logger.warning(f"Invalid persona_id: {persona_id}")
-                return jsonify({
-                    'success': False, 
-                    'error': 'Invalid persona ID',
-                    'request_id': g.request_id
-                }), 400
-        except Exception as e:
-            logger.error(f"Error validating persona {persona_id}: {e}")
-            return jsonify({
-                'success': False, 
-                'error': 'Persona validation failed',
-                'request_id': g.request_id
-            }), 500
+        message = fields['message']
+        client_id = fields['client_id']
+        persona_id = fields['persona_id']
+        persona = fields['persona']
         
         logger.info(f"Processing chat: {message[:50]}... (client: {client_id[:8]}, persona: {persona['name']})")
         
         # Run inference with persona-aware routing
         try:
-            result = run_inference(
-                prompt=message,
-                client_id=client_id,
-                persona_id=persona_id
-            )
+            with telemetry.span('inference'):
+                result = run_inference(
+                    prompt=message,
+                    client_id=client_id,
+                    persona_id=persona_id
+                )
         except Exception as e:
             logger.error(f"Inference failed for client {client_id}: {e}")
             return jsonify({
@@ -272,18 +321,19 @@ def chat():
         # Log session turn to database
         if result.get('success'):
             try:
-                memory.log_session_turn(
-                    client_id=client_id,
-                    persona_id=persona_id,
-                    user_input=message,
-                    assistant_reply=result.get('response', ''),
-                    session_id=f"public_chat_{client_id}",
-                    metadata={
-                        'request_id': g.request_id,
-                        'provider_used': result.get('provider_used'),
-                        'processing_time': time.time() - request_start
-                    }
-                )
+                with telemetry.span('log_turn'):
+                    memory.log_session_turn(
+                        client_id=client_id,
+                        persona_id=persona_id,
+                        user_input=message,
+                        assistant_reply=result.get('response', ''),
+                        session_id=f"public_chat_{client_id}",
+                        metadata={
+                            'request_id': g.request_id,
+                            'provider_used': result.get('provider_used'),
+                            'processing_time': time.time() - request_start
+                        }
+                    )
             except Exception as e:
                 logger.warning(f"Failed to log session turn: {e}")
         
@@ -316,6 +366,308 @@ def chat():
             'processing_time': round(processing_time, 3)
         }), 500
 
+# Batch chat limits (VALIS_BATCH_CONCURRENCY bounds provider calls in flight)
+BATCH_MAX_ITEMS = int(os.getenv('VALIS_BATCH_MAX_ITEMS', '500'))
+
+def validate_batch_items(items: list) -> tuple:
+    """
+    Field checks plus set-based client/persona lookups for a chat batch
+    
+    Returns (valid, errors, clients, personas): valid is a list of
+    (index, fields) with the same fields as validate_chat_request, errors
+    maps index -> message, clients/personas are the fetched rows by ID.
+    """
+    errors = {}
+    candidates = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = 'Item must be an object'
+            continue
+        message = (item.get('message') or '').strip()
+        client_id = item.get('client_id')
+        persona_id = item.get('persona_id')
+        if not message:
+            errors[index] = 'Message is required'
+        elif not client_id:
+            errors[index] = 'Client ID is required'
+        elif not persona_id:
+            errors[index] = 'Persona ID is required'
+        else:
+            candidates.append((index, message, client_id, persona_id, item.get('context_mode', 'balanced')))
+    
+    # One query per table for the whole batch
+    clients = memory.get_clients(c[2] for c in candidates)
+    personas = memory.get_personas(c[3] for c in candidates)
+    
+    valid = []
+    for index, message, client_id, persona_id, context_mode in candidates:
+        if client_id not in clients:
+            errors[index] = 'Invalid client ID'
+        elif persona_id not in personas:
+            errors[index] = 'Invalid persona ID'
+        else:
+            valid.append((index, {
+                'message': message,
+                'client_id': client_id,
+                'persona_id': persona_id,
+                'context_mode': context_mode,
+                'client': clients[client_id],
+                'persona': personas[persona_id]
+            }))
+    return valid, errors, clients, personas
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Batch chat endpoint for evaluation/replay jobs
+    
+    Body: {"items": [{"message", "client_id", "persona_id"}, ...],
+           "max_concurrency": int (optional, capped at VALIS_BATCH_CONCURRENCY)}
+    Items are answered independently; per-item failures do not fail the batch.
+    Rate limited per item (VALIS_BATCH_RATE_LIMIT items per minute).
+    """
+    request_start = time.time()
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'items must be a non-empty list',
+                'request_id': g.request_id
+            }), 400
+        # A batch larger than the per-window item budget could never be admitted
+        max_items = min(BATCH_MAX_ITEMS, batch_rate_limiter.limit)
+        if len(items) > max_items:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large (max {max_items} items)',
+                'request_id': g.request_id
+            }), 400
+        try:
+            max_concurrency = int(data.get('max_concurrency') or BATCH_CONCURRENCY)
+        except (TypeError, ValueError):
+            max_concurrency = 0
+        if max_concurrency < 1:
+            return jsonify({
+                'success': False,
+                'error': 'max_concurrency must be a positive integer',
+                'request_id': g.request_id
+            }), 400
+        max_concurrency = min(max_concurrency, BATCH_CONCURRENCY)
+        
+        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+        decision = batch_rate_limiter.check(client_ip, cost=len(items))
+        if not decision['allowed']:
+            logger.warning(f"Batch rate limit exceeded for IP: {client_ip} ({len(items)} items)")
+            return jsonify({
+                'success': False,
+                'error': 'Rate limit exceeded',
+                'retry_after': decision['retry_after']
+            }), 429, {'Retry-After': str(decision['retry_after'])}
+        
+        logger.info(f"Batch chat request received from {request.remote_addr}: {len(items)} items")
+        
+        with telemetry.span('validate'):
+            valid, errors, clients, personas = validate_batch_items(items)
+        
+        # Memory layers for every (persona, client) pair, loaded with set-based
+        # queries at the largest context-mode limits
+        pairs = [(fields['persona_id'], fields['client_id']) for _, fields in valid]
+        with memory.prefetch(
+            pairs,
+            canon_limit=MAX_CONTEXT_LIMITS['canon_memory'],
+            working_limit=MAX_CONTEXT_LIMITS['working_memory'],
+            personas=personas,
+            clients=clients
+        ):
+            with telemetry.span('inference'):
+                inference_results = run_inference_batch(
+                    [{'prompt': fields['message'], 'client_id': fields['client_id'], 'persona_id': fields['persona_id']}
+                     for _, fields in valid],
+                    max_concurrency=max_concurrency,
+                    item_timeout=request_budget(request.headers.get('X-Request-Timeout'))
+                )
+        
+        results = [{'index': index, 'success': False, 'error': error} for index, error in errors.items()]
+        turns = []
+        for (index, fields), result in zip(valid, inference_results):
+            entry = {
+                'index': index,
+                'success': result.get('success', False),
+                'response': result.get('response', ''),
+                'provider_used': result.get('provider_used', 'unknown'),
+                'client_id': fields['client_id'],
+                'persona_id': fields['persona_id'],
+                'persona_name': fields['persona']['name'],
+                'timestamp': result.get('timestamp')
+            }
+            if result.get('success'):
+                turns.append({
+                    'client_id': fields['client_id'],
+                    'persona_id': fields['persona_id'],
+                    'user_input': fields['message'],
+                    'assistant_reply': result.get('response', ''),
+                    'session_id': f"public_chat_{fields['client_id']}",
+                    'metadata': {
+                        'request_id': g.request_id,
+                        'provider_used': result.get('provider_used'),
+                        'processing_time': result.get('processing_time'),
+                        'batch': True
+                    }
+                })
+            else:
+                entry['error'] = result.get('error', 'Unknown error')
+            results.append(entry)
+        results.sort(key=lambda entry: entry['index'])
+        
+        # Queued for the turn logger, which writes them with multi-row inserts
+        try:
+            with telemetry.span('log_turn'):
+                memory.log_session_turns(turns)
+        except Exception as e:
+            logger.warning(f"Failed to log batch session turns: {e}")
+        
+        succeeded = sum(1 for entry in results if entry['success'])
+        processing_time = round(time.time() - request_start, 3)
+        logger.info(f"Batch chat response: {succeeded}/{len(results)} succeeded in {processing_time}s")
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'request_id': g.request_id,
+            'processing_time': processing_time
+        })
+        
+    except Exception as e:
+        processing_time = time.time() - request_start
+        logger.error(f"Batch chat endpoint error after {processing_time:.3f}s: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'request_id': getattr(g, 'request_id', 'unknown')
+        }), 500
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # Disable proxy buffering so tokens flush immediately
+}
+
+def finalize_stream_turn(fields: dict, done: dict, request_id: str, request_start: float) -> dict:
+    """
+    Post-stream work: watermark the full reply and log the session turn
+    
+    Runs once the token stream has completed; returns the payload for the
+    final `done` event. The tokens already sent are the bare reply, so the
+    event carries the watermark suffix (`watermark`) that completes the
+    content the tracking_id refers to.
+    """
+    client_id = fields['client_id']
+    persona_id = fields['persona_id']
+    
+    payload = {
+        'success': done.get('success', False),
+        'provider_used': done.get('provider_used', 'unknown'),
+        'client_id': client_id,
+        'persona_id': persona_id,
+        'persona_name': fields['persona']['name'],
+        'request_id': request_id,
+        'processing_time': round(time.time() - request_start, 3)
+    }
+    
+    if not done.get('success'):
+        payload['error'] = done.get('error', 'Unknown error')
+        return payload
+    
+    try:
+        reply = done.get('response', '')
+        watermarked = watermark_engine.embed_watermark(reply, persona_id, symbolic_type='chat_stream')
+        # embed_watermark appends to the reply, so the suffix is what the client has not seen
+        payload['watermark'] = watermarked['content'][len(reply):]
+        payload['tracking_id'] = watermarked['tracking_id']
+    except Exception as e:
+        logger.warning(f"Failed to watermark streamed response: {e}")
+    
+    try:
+        memory.log_session_turn(
+            client_id=client_id,
+            persona_id=persona_id,
+            user_input=fields['message'],
+            assistant_reply=done.get('response', ''),
+            session_id=f"public_chat_{client_id}",
+            metadata={
+                'request_id': request_id,
+                'provider_used': done.get('provider_used'),
+                'processing_time': time.time() - request_start,
+                'streamed': True,
+                'tracking_id': payload.get('tracking_id')
+            }
+        )
+    except Exception as e:
+        logger.warning(f"Failed to log session turn: {e}")
+    
+    return payload
+
+@app.route('/api/chat/stream', methods=['POST'])
+@rate_limit
+def chat_stream():
+    """Streaming chat endpoint - relays provider tokens as server-sent events"""
+    request_start = time.time()
+    
+    logger.info(f"Streaming chat request received from {request.remote_addr}")
+    
+    try:
+        with telemetry.span('validate'):
+            fields, error = validate_chat_request(request.get_json(), g.request_id)
+    except Exception as e:
+        logger.error(f"Streaming chat validation error: {e}")
+        fields, error = None, ({
+            'success': False,
+            'error': 'Internal server error',
+            'request_id': g.request_id
+        }, 500)
+    if error:
+        body, status_code = error
+        return jsonify(body), status_code
+    
+    request_id = g.request_id
+    
+    def generate():
+        done = None
+        try:
+            for event in stream_inference(
+                prompt=fields['message'],
+                client_id=fields['client_id'],
+                persona_id=fields['persona_id']
+            ):
+                if event['event'] == 'token':
+                    yield format_sse('token', {'content': event['content']})
+                else:
+                    done = event
+        except Exception as e:
+            logger.error(f"Streaming inference failed for client {fields['client_id']}: {e}")
+            done = {'success': False, 'error': 'AI processing failed'}
+        
+        payload = finalize_stream_turn(fields, done or {}, request_id, request_start)
+        logger.info(f"Chat stream complete: {payload['success']} in {payload['processing_time']}s")
+        yield format_sse('done', payload)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    payload, content_type = telemetry.metrics_payload()
+    return Response(payload, mimetype=content_type)
+
 # Frontend routes
 @app.route('/')
 def public_chat():
@@ -346,6 +698,9 @@ if __name__ == '__main__':
     # Initialize VALIS system
     if initialize():
         logger.info("VALIS system initialized successfully")
+        health_monitor.start()
+        # Components are built once the port is bound (VALIS_WARMUP)
+        startup.after_bind(3001)
         app.run(host='0.0.0.0', port=3001, debug=True)
     else:
         logger.error("Failed to initialize VALIS system")
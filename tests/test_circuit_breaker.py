@@ -0,0 +1,119 @@
+"""State transitions of core.circuit_breaker.CircuitBreaker"""
+
+import time
+
+from core.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+CONFIG = {"min_calls": 4, "error_rate_threshold": 0.5, "slow_call_seconds": 1.0,
+          "slow_rate_threshold": 0.75, "open_seconds": 60, "probe_interval_seconds": 0}
+
+
+def make_breaker(**overrides):
+    return CircuitBreaker("test", {**CONFIG, **overrides})
+
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure(0.1, "boom")
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_on_error_rate():
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1, "boom")
+    assert breaker.state == CLOSED
+    breaker.record_failure(0.1, "boom")
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 1
+    assert breaker.snapshot()["last_error"] == "boom"
+
+
+def test_opens_on_slow_rate():
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    for _ in range(3):
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+
+def test_open_skips_calls_until_probe():
+    breaker = make_breaker()
+    breaker.force(OPEN)
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["skipped_calls"] == 1
+    assert not breaker.due_for_probe()
+
+
+def test_due_for_probe_after_open_seconds():
+    breaker = make_breaker(open_seconds=0.05, probe_interval_seconds=60)
+    breaker.force(OPEN)
+    assert not breaker.due_for_probe()
+    time.sleep(0.06)
+    assert breaker.due_for_probe()
+    breaker.record_probe(healthy=False)
+    assert not breaker.due_for_probe()  # probed too recently
+
+
+def test_healthy_probe_half_opens_with_single_trial():
+    breaker = make_breaker()
+    breaker.force(OPEN)
+    breaker.record_probe(healthy=False)
+    assert breaker.state == OPEN
+    breaker.record_probe(healthy=True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one trial at a time
+
+
+def test_trial_success_closes_and_clears_window():
+    breaker = make_breaker()
+    breaker.force(OPEN)
+    breaker.record_probe(healthy=True)
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls_in_window"] == 0
+
+
+def test_trial_failure_reopens():
+    breaker = make_breaker()
+    breaker.force(OPEN)
+    breaker.record_probe(healthy=True)
+    assert breaker.allow_request()
+    breaker.record_failure(0.1, "still down")
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+
+
+def test_release_frees_the_trial_without_deciding():
+    breaker = make_breaker()
+    breaker.force(OPEN)
+    breaker.record_probe(healthy=True)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_abandoned_trial_expires():
+    breaker = make_breaker(open_seconds=0.05)
+    breaker.force(OPEN)
+    breaker.record_probe(healthy=True)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+
+
+def test_calls_outside_window_are_forgotten():
+    breaker = make_breaker(window_seconds=0.05)
+    for _ in range(3):
+        breaker.record_failure(0.1, "boom")
+    time.sleep(0.06)
+    breaker.record_failure(0.1, "boom")
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls_in_window"] == 1
@@ -0,0 +1,162 @@
+"""Exact-match completion cache (providers.completion_cache) and its use by LocalMistralProvider"""
+
+import json
+
+import pytest
+
+from providers import completion_cache as cc
+from providers.completion_cache import CompletionCache, completion_key
+from providers.local_mistral import LocalMistralProvider
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(cc.time, "time", clock.time)
+    return clock
+
+
+def payload(prompt="hi", **params):
+    return {"prompt": prompt, "temperature": 0, "top_p": 0.9, "n_predict": 256, "stop": ["User:"], **params}
+
+
+def test_key_covers_prompt_and_generation_params():
+    base = completion_key(payload())
+    assert completion_key(payload()) == base
+    assert completion_key(payload(cache_prompt=False, id_slot=3)) == base
+    assert completion_key(payload("other")) != base
+    for param, value in (("temperature", 0.1), ("top_p", 0.5), ("n_predict", 8), ("stop", [])):
+        assert completion_key(payload(**{param: value})) != base
+
+
+def test_lru_bound_evicts_least_recently_used(clock):
+    cache = CompletionCache(max_entries=2)
+    cache.put("a", {"response": "A"})
+    cache.put("b", {"response": "B"})
+    assert cache.get("a")["response"] == "A"   # a is now most recent
+    cache.put("c", {"response": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = CompletionCache(ttl_seconds=10)
+    cache.put("a", {"response": "A"})
+    clock.now += 10
+    assert cache.get("a")["response"] == "A"
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert cache.get_stats()["expired"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_hits_are_copies(clock):
+    cache = CompletionCache()
+    cache.put("a", {"response": "A"})
+    cache.get("a")["response"] = "changed"
+    assert cache.get("a")["response"] == "A"
+
+
+def test_sampling_bypasses_unless_persona_opts_in():
+    cache = CompletionCache(deterministic_personas=["faq"])
+    assert cache.key_for(payload(temperature=0.7), "chatty") is None
+    assert cache.key_for(payload(temperature=0.7), "faq") == completion_key(payload(temperature=0.7))
+    assert cache.key_for(payload(temperature=0), "chatty") == completion_key(payload())
+    assert cache.get_stats()["bypassed"] == 1
+
+
+def test_from_config():
+    assert CompletionCache.from_config({}) is None
+    assert CompletionCache.from_config({"enabled": False}) is None
+    cache = CompletionCache.from_config({"enabled": True, "max_entries": 5, "ttl_seconds": 1,
+                                         "deterministic_personas": ["faq"]})
+    assert (cache.max_entries, cache.ttl_seconds, cache.deterministic_personas) == (5, 1, {"faq"})
+
+
+@pytest.fixture
+def llama():
+    from benchmarks.stub_llama_server import start_stub_server
+    server = start_stub_server(port=0, latency="fixed:1", tokens_per_second=100000, n_tokens=4)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def served(server):
+    return server.RequestHandlerClass.behaviour.stats["requests"]
+
+
+def provider_for(server, **cache_config):
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    provider = LocalMistralProvider(cache=CompletionCache(**cache_config))
+    provider.api_url = f"{url}/completion"
+    provider.health_url = f"{url}/health"
+    return provider
+
+
+def test_provider_serves_repeat_prompts_from_cache(llama):
+    provider = provider_for(llama, deterministic_personas=["faq"])
+    first = provider.ask("hi", "c", "faq")
+    second = provider.ask("hi", "c", "faq")
+
+    assert first["success"] and not first.get("cached")
+    assert second["cached"] and second["response"] == first["response"]
+    assert served(llama) == 1
+
+
+def test_provider_bypasses_cache_for_sampled_personas(llama):
+    provider = provider_for(llama)
+    provider.ask("hi", "c", "chatty")
+    assert not provider.ask("hi", "c", "chatty").get("cached")
+    assert served(llama) == 2
+    assert provider.cache.get_stats()["entries"] == 0
+
+
+def test_completed_stream_is_cached(llama):
+    provider = provider_for(llama, deterministic_personas=["faq"])
+    streamed = "".join(provider.stream("hi", "c", "faq")).strip()
+    result = provider.ask("hi", "c", "faq")
+
+    assert result["cached"] and result["response"] == streamed
+    assert served(llama) == 1
+
+
+def test_abandoned_stream_is_not_cached(llama):
+    provider = provider_for(llama, deterministic_personas=["faq"])
+    tokens = provider.stream("hi", "c", "faq")
+    next(tokens)
+    tokens.close()
+    assert provider.cache.get_stats()["entries"] == 0
+
+
+class TruncatedStream:
+    """Streaming response whose connection ends before the stop chunk"""
+
+    status_code = 200
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self, decode_unicode=True):
+        yield "data: " + json.dumps({"content": "partial", "stop": False})
+
+
+def test_truncated_stream_is_not_cached(llama, monkeypatch):
+    provider = provider_for(llama, deterministic_personas=["faq"])
+    monkeypatch.setattr(provider.http, "post", lambda url, **kwargs: TruncatedStream())
+    assert list(provider.stream("hi", "c", "faq")) == ["partial"]
+    assert provider.cache.get_stats()["entries"] == 0
@@ -0,0 +1,126 @@
+"""Token-budgeted context packing (core.context_packer)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.context_packer import (LAYER_HEADERS, TokenCounter, build_candidates, estimate_tokens, pack,
+                                 token_budget)
+from core.deadline import clear_deadline, start_deadline
+
+NOW = datetime(2026, 1, 15, 12, 0)
+
+
+def candidates():
+    return build_candidates(
+        persona_bio=["A patient coach.", "Traits: calm"],
+        canon_rows=[
+            {"content": "Fresh relevant fact", "relevance_score": 1.0, "last_used": NOW, "emotion_weight": 0.5},
+            {"content": "Old weak fact", "relevance_score": 0.2, "last_used": NOW - timedelta(days=60)},
+        ],
+        client_facts={"name": "Sam", "hobby": "chess"},
+        working_rows=[{"content": "Asked about openings", "decay_score": 0.9, "importance": 8,
+                       "created_at": (NOW - timedelta(hours=1)).isoformat()}],
+        now=NOW,
+    )
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("a" * 9) == 3
+
+
+def test_scores_prefer_relevant_recent_items():
+    scored = {c["text"]: c["score"] for c in candidates()}
+    assert scored["- Fresh relevant fact\n"] > scored["- Old weak fact\n"]
+    assert scored["- A patient coach.\n"] > scored["- Traits: calm\n"]
+    assert scored["- name: Sam\n"] > scored["- hobby: chess\n"]
+
+
+def test_everything_fits_a_large_budget():
+    result = pack(candidates(), 10_000, TokenCounter("estimate"))
+    assert result["dropped"] == []
+    assert result["layers"]["canon_memory"] == ["Fresh relevant fact", "Old weak fact"]
+    assert result["layers"]["client_facts"] == [("name", "Sam"), ("hobby", "chess")]
+
+
+def test_tight_budget_keeps_best_items_in_original_order():
+    counter = TokenCounter("estimate")
+    items = candidates()
+    full = pack(candidates(), 10_000, counter)["used_tokens"]
+    result = pack(items, full - 1, counter)
+    assert result["used_tokens"] <= full - 1
+    assert len(result["dropped"]) >= 1
+    lowest = min(items, key=lambda c: c["score"])
+    assert {"layer": lowest["layer"], "position": lowest["position"]} in [
+        {"layer": d["layer"], "position": d["position"]} for d in result["dropped"]]
+
+
+def test_headers_are_charged_once_per_layer():
+    counter = TokenCounter("estimate")
+    items = [c for c in candidates() if c["layer"] == "canon_memory"]
+    result = pack(items, 10_000, counter)
+    expected = sum(counter.count(c["text"]) for c in items) + counter.count(LAYER_HEADERS["canon_memory"] + "\n")
+    assert result["used_tokens"] == expected
+
+
+def test_zero_budget_keeps_nothing():
+    result = pack(candidates(), 0, TokenCounter("estimate"))
+    assert all(values == [] for values in result["layers"].values())
+    assert result["used_tokens"] == 0
+
+
+def test_token_budget_never_negative():
+    assert token_budget("local_mistral", 10**9) == 0
+    assert token_budget("local_mistral", 0) > token_budget("local_mistral", 100)
+
+
+def test_counter_caches_per_text():
+    counter = TokenCounter("estimate")
+    counter.count("hello world")
+    counter.count("hello world")
+    counter.count("one-off", cache=False)
+    counter.count("one-off", cache=False)
+    assert counter.stats["cached"] == 1
+    assert counter.stats["estimated"] == 3
+
+
+class FailingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError("tokenizer down")
+
+
+@pytest.fixture
+def failing_tokenizer(monkeypatch):
+    import providers.http_client as http_client
+    client = FailingClient()
+    monkeypatch.setattr(http_client, "get_http_client", lambda name: client)
+    return client
+
+
+def test_tokenizer_failure_backs_off(failing_tokenizer):
+    clear_deadline()
+    counter = TokenCounter("llama")
+    assert counter.count("some text") == estimate_tokens("some text")
+    counter.count("other text")
+    assert failing_tokenizer.calls == 1
+    assert counter.source == "estimate"
+    assert counter.stats["failures"] == 1
+
+
+def test_expired_deadline_skips_tokenizer_without_back_off(failing_tokenizer):
+    counter = TokenCounter("llama")
+    start_deadline(0)
+    try:
+        assert counter.count("some text") == estimate_tokens("some text")
+    finally:
+        clear_deadline()
+    assert failing_tokenizer.calls == 0
+    assert counter.source == "llama"
+    # Estimates made for lack of time are not cached for the llama backend
+    assert counter.get_stats()["entries"] == 0
@@ -0,0 +1,143 @@
+"""Request deadlines, and their interaction with batch inference"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+import inference
+from core.deadline import (DeadlineExceeded, cap_timeout, check_deadline, clear_deadline, deadline_scope,
+                           get_deadline, has_budget, request_budget, start_deadline, within_deadline)
+
+
+@pytest.fixture(autouse=True)
+def isolated_context():
+    """Run each test in a fresh context so deadlines cannot leak between tests"""
+    context = contextvars.copy_context()
+    context.run(clear_deadline)
+    yield context
+
+
+def in_context(context, fn):
+    return context.run(fn)
+
+
+def test_no_deadline_leaves_timeouts_alone(isolated_context):
+    def check():
+        assert get_deadline() is None
+        assert cap_timeout(5.0) == 5.0
+        assert has_budget(1000)
+        check_deadline("test")
+    in_context(isolated_context, check)
+
+
+def test_cap_and_check(isolated_context):
+    def check():
+        start_deadline(0.5)
+        assert 0 < cap_timeout(5.0) <= 0.5
+        assert cap_timeout(0.1) == 0.1
+        assert not has_budget(1.0)
+        with pytest.raises(DeadlineExceeded):
+            check_deadline("test", minimum=1.0)
+    in_context(isolated_context, check)
+
+
+def test_deadline_scope_only_clears_what_it_started(isolated_context):
+    def check():
+        with deadline_scope(1.0) as deadline:
+            assert get_deadline() is deadline
+        assert get_deadline() is None
+
+        outer = start_deadline(2.0)
+        with deadline_scope(1.0) as deadline:
+            assert deadline is outer
+        assert get_deadline() is outer
+    in_context(isolated_context, check)
+
+
+def test_request_budget_is_clamped():
+    assert request_budget(None) == request_budget("") == request_budget("abc")
+    assert request_budget("0.5") == 0.5
+    assert request_budget("-3") == 0.0
+    assert request_budget("1e9") == request_budget(None)
+
+
+def test_request_budget_rejects_non_finite():
+    for value in ("nan", "NaN", "inf", "-inf"):
+        assert request_budget(value) == request_budget(None)
+
+
+def test_within_deadline_cancels(isolated_context):
+    def check():
+        start_deadline(0.05)
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(within_deadline(asyncio.sleep(1), "test"))
+    in_context(isolated_context, check)
+
+
+class FakeProviderManager:
+    """Records the deadline each ask() runs under"""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.seen = []
+        self._lock = threading.Lock()
+
+    def ask(self, prompt, client_id, persona_id):
+        deadline = get_deadline()
+        with self._lock:
+            self.seen.append((prompt, deadline, deadline.remaining() if deadline else None))
+        if prompt == self.fail_on:
+            raise RuntimeError("provider blew up")
+        time.sleep(self.delay)
+        return {"success": True, "response": prompt.upper()}
+
+
+@pytest.fixture
+def provider_manager(monkeypatch):
+    def install(**kwargs):
+        manager = FakeProviderManager(**kwargs)
+        monkeypatch.setattr(inference, "provider_manager", manager)
+        return manager
+    return install
+
+
+def items(*prompts):
+    return [{"prompt": prompt, "client_id": "c", "persona_id": "p"} for prompt in prompts]
+
+
+def test_batch_items_get_their_own_budget(provider_manager, isolated_context):
+    manager = provider_manager(delay=0.1)
+    results = in_context(isolated_context, lambda: inference.run_inference_batch(
+        items("a", "b", "c", "d"), max_concurrency=1, item_timeout=0.15))
+
+    assert [r["response"] for r in results] == ["A", "B", "C", "D"]
+    deadlines = [deadline for _, deadline, _ in manager.seen]
+    assert len({id(deadline) for deadline in deadlines}) == 4
+    # Queued behind 0.3s of earlier items, the last one still starts with its full budget
+    assert all(remaining > 0.1 for _, _, remaining in manager.seen)
+
+
+def test_batch_ignores_and_keeps_the_callers_deadline(provider_manager, isolated_context):
+    manager = provider_manager()
+
+    def run():
+        caller = start_deadline(0.01)
+        time.sleep(0.02)
+        results = inference.run_inference_batch(items("a", "b"), item_timeout=5.0)
+        assert get_deadline() is caller
+        return results
+
+    results = in_context(isolated_context, run)
+    assert all(r["success"] for r in results)
+    assert all(remaining > 4.0 for _, _, remaining in manager.seen)
+
+
+def test_batch_item_failure_is_isolated(provider_manager, isolated_context):
+    provider_manager(fail_on="b")
+    results = in_context(isolated_context, lambda: inference.run_inference_batch(items("a", "b", "c")))
+    assert [r["success"] for r in results] == [True, False, True]
+    assert "blew up" in results[1]["error"]
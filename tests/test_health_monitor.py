@@ -0,0 +1,163 @@
+"""Cached background health probes (core.health_monitor) and /api/health"""
+
+import threading
+import time
+
+import pytest
+
+from core.deadline import clear_deadline
+from core.health_monitor import HealthMonitor
+
+
+class Probe:
+    """Counts calls; blocks while gate is cleared"""
+
+    def __init__(self, status="healthy"):
+        self.status = status
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(5)
+        if self.status == "error":
+            raise ConnectionError("database down")
+        return {"status": self.status}
+
+
+@pytest.fixture
+def make_monitor():
+    monitors = []
+
+    def make(interval=60, **probes):
+        monitor = HealthMonitor(interval=interval)
+        for name, probe in probes.items():
+            monitor.register(name, probe)
+        monitors.append(monitor)
+        return monitor
+
+    yield make
+    for monitor in monitors:
+        for probe in monitor._probes.values():
+            probe.gate.set()
+        monitor.stop()
+
+
+def test_first_snapshot_starts_the_thread_and_probes(make_monitor):
+    probe = Probe()
+    monitor = make_monitor(db=probe)
+    snapshot = monitor.snapshot()
+
+    assert monitor.running
+    assert snapshot["status"] == "healthy"
+    assert snapshot["components"]["db"]["status"] == "healthy"
+    assert probe.calls >= 1
+
+
+def test_failing_probe_degrades_health(make_monitor):
+    monitor = make_monitor(db=Probe("error"), tools=Probe())
+    monitor.stop()
+    snapshot = monitor.snapshot()
+
+    assert snapshot["status"] == "degraded"
+    assert snapshot["components"]["db"]["status"] == "unhealthy"
+    assert snapshot["components"]["db"]["error"] == "database down"
+
+
+def test_fresh_cache_is_served_without_probing(make_monitor):
+    probe = Probe()
+    monitor = make_monitor(db=probe)
+    monitor.stop()
+    monitor.probe_all()
+
+    snapshot = monitor.snapshot()
+    assert snapshot["cached"] and probe.calls == 1
+
+
+def test_stale_cache_without_a_thread_is_reprobed(make_monitor):
+    probe = Probe()
+    monitor = make_monitor(db=probe)
+    monitor.stop()
+    monitor.probe_all()
+    monitor._checked_at -= monitor.stale_after + 1
+
+    snapshot = monitor.snapshot()
+    assert not snapshot["cached"]
+    assert probe.calls == 2
+    assert snapshot["age_seconds"] < 1 and "stale" not in snapshot
+
+
+def test_concurrent_stale_snapshots_share_one_reprobe(make_monitor):
+    probe = Probe()
+    monitor = make_monitor(db=probe)
+    monitor.stop()
+    monitor.probe_all()
+    monitor._checked_at -= monitor.stale_after + 1
+    probe.gate.clear()
+
+    snapshots = []
+    threads = [threading.Thread(target=lambda: snapshots.append(monitor.snapshot())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    probe.gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert probe.calls == 2
+    assert all(s["status"] == "healthy" for s in snapshots)
+
+
+def test_snapshot_does_not_wait_for_a_slow_background_probe(make_monitor):
+    probe = Probe()
+    monitor = make_monitor(interval=0.05, db=probe)
+    monitor.snapshot()
+    probe.gate.clear()
+    time.sleep(0.1)   # the thread is now stuck in its next probe
+
+    start = time.time()
+    snapshot = monitor.snapshot()
+    assert time.time() - start < 0.05
+    assert snapshot["cached"] and snapshot["status"] == "healthy"
+
+
+@pytest.fixture
+def health_client(make_monitor, monkeypatch):
+    import server
+
+    def client_for(interval):
+        probe = Probe()
+        monitor = make_monitor(interval=interval, db=probe)
+        monitor.snapshot()
+        monkeypatch.setattr(server, "health_monitor", monitor)
+        return server.app.test_client(), probe
+
+    yield client_for
+    # The test client serves requests on this thread; drop the deadline they started
+    clear_deadline()
+
+
+def test_health_endpoint_answers_from_the_cache(health_client):
+    client, probe = health_client(interval=0.05)
+    probe.gate.clear()
+    time.sleep(0.1)   # the background thread is stuck in a probe
+
+    start = time.time()
+    response = client.get("/api/health")
+    assert time.time() - start < 0.5
+    assert response.status_code == 200
+    assert response.get_json()["cached"] is True
+
+
+def test_deep_health_check_requires_admin_key(health_client):
+    from routes.admin_routes import ADMIN_API_KEY
+    client, probe = health_client(interval=60)
+
+    assert client.get("/api/health?deep=1").status_code == 401
+    assert probe.calls == 1
+
+    response = client.get("/api/health?deep=1", headers={"X-Admin-Key": ADMIN_API_KEY})
+    assert response.status_code == 200
+    assert response.get_json()["cached"] is False
+    assert probe.calls == 2
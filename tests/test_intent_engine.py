@@ -0,0 +1,75 @@
+"""The compiled intent engines agree with the original per-pattern loops"""
+
+import itertools
+
+import pytest
+
+from benchmarks.intent_bench import CORPUS, legacy_command_intent, legacy_should_plan
+from core.intent_engine import (COMMAND_INTENTS, COMPLEX_WORD_SETS, IntentEngine,
+                                command_intent_engine, planning_engine)
+
+EXTRA_PROMPTS = [
+    "",
+    "   ",
+    "LIST FILES IN /tmp",
+    "tell me about the files in my folder",           # query_memory outranks list_files
+    "show me the running processes and the files in /var",
+    "read the file\nthen list files in docs",         # '.' does not cross lines
+    "ls",
+    "cat notes.txt",
+    "typewriter history",
+    "analyze the data after we search it",            # word set in reverse order
+    "summarize what you find",
+    "I want to compare the list",
+    "report back once you check",
+    "evaluate and gather",
+    "searchanalyze",
+    "nothing to see here",
+    "explanation",                                    # contains 'plan'
+    "the next step",
+]
+
+PROMPTS = CORPUS + EXTRA_PROMPTS + [
+    f"please {a} the thing and {b} it" for a, b in itertools.permutations(
+        [word for words in COMPLEX_WORD_SETS for word in words], 2)
+]
+
+
+@pytest.fixture(scope="module")
+def commands():
+    return command_intent_engine()
+
+
+@pytest.fixture(scope="module")
+def planning():
+    return planning_engine()
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_command_intent_matches_legacy(commands, prompt):
+    assert commands.match(prompt.strip()) == legacy_command_intent(prompt)
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_planning_matches_legacy(planning, prompt):
+    assert (planning.match(prompt) is not None) == legacy_should_plan(prompt)
+
+
+def test_every_command_pattern_is_reachable(commands):
+    # Each intent is hit by text built from its own first pattern
+    samples = {"query_memory": "tell me about x", "list_files": "list files in x",
+               "read_file": "read the file x", "search_files": "find files x",
+               "get_processes": "list processes"}
+    assert set(samples) == set(COMMAND_INTENTS)
+    for intent, text in samples.items():
+        assert commands.match(text) == intent
+
+
+def test_classify_runs_extractor_on_original_text():
+    engine = IntentEngine({"greet": [r"hello"]}, {"greet": lambda text: {"text": text}})
+    assert engine.classify("HELLO There") == ("greet", {"text": "HELLO There"})
+    assert engine.classify("goodbye") is None
+
+
+def test_empty_table_matches_nothing():
+    assert IntentEngine({}).match("anything") is None
@@ -0,0 +1,110 @@
+"""Micro-batching dispatcher in core.micro_batch"""
+
+import asyncio
+import threading
+
+import pytest
+
+from core.micro_batch import MicroBatcher
+
+
+class Recorder:
+    """dispatch() that records each batch and doubles its items"""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        with self._lock:
+            self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(dispatch, **kwargs):
+        batcher = MicroBatcher("test", dispatch, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_full_batch_dispatches_immediately(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=60, max_batch=3)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [f.result(1) for f in futures] == [0, 2, 4]
+    assert dispatch.batches == [[0, 1, 2]]
+    assert batcher.get_stats()["full_flushes"] == 1
+
+
+def test_window_flushes_partial_batch(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=0.02, max_batch=10)
+    assert batcher.run(5, timeout=1) == 10
+    assert batcher.get_stats()["window_flushes"] == 1
+
+
+def test_groups_are_batched_separately(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=60, max_batch=2)
+    futures = [batcher.submit(1, group="a"), batcher.submit(2, group="b"),
+               batcher.submit(3, group="a"), batcher.submit(4, group="b")]
+    assert [f.result(1) for f in futures] == [2, 4, 6, 8]
+    assert sorted(dispatch.batches) == [[1, 3], [2, 4]]
+
+
+def test_dispatch_error_fails_the_whole_batch(make_batcher):
+    def failing(items):
+        raise RuntimeError("backend down")
+
+    batcher = make_batcher(failing, window_seconds=60, max_batch=2)
+    futures = [batcher.submit(1), batcher.submit(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(1)
+    assert batcher.get_stats()["failed_batches"] == 1
+
+
+def test_wrong_result_count_is_an_error(make_batcher):
+    batcher = make_batcher(lambda items: [0], window_seconds=60, max_batch=2)
+    futures = [batcher.submit(1), batcher.submit(2)]
+    with pytest.raises(ValueError):
+        futures[0].result(1)
+
+
+def test_cancelled_items_are_not_dispatched(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=60, max_batch=3)
+    dropped = batcher.submit(1)
+    dropped.cancel()
+    kept = [batcher.submit(2), batcher.submit(3)]
+    assert [f.result(1) for f in kept] == [4, 6]
+    assert dispatch.batches == [[2, 3]]
+    assert batcher.get_stats()["cancelled"] == 1
+
+
+def test_run_async(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=0.01, max_batch=4)
+
+    async def main():
+        return await asyncio.gather(*(batcher.run_async(i) for i in range(4)))
+
+    assert asyncio.run(main()) == [0, 2, 4, 6]
+
+
+def test_close_flushes_queue_and_rejects_new_items(make_batcher):
+    dispatch = Recorder()
+    batcher = make_batcher(dispatch, window_seconds=60, max_batch=10)
+    future = batcher.submit(7)
+    batcher.close()
+    assert future.result(1) == 14
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
@@ -0,0 +1,126 @@
+"""Profile cache lookups, invalidation and version guards (memory.profile_cache)"""
+
+import json
+
+import pytest
+
+from core.shared_store import LocalSharedStore
+from memory.profile_cache import PERSONA, ProfileCache
+
+
+@pytest.fixture
+def store():
+    return LocalSharedStore()
+
+
+def make_cache(store, **kwargs):
+    return ProfileCache(max_entries=kwargs.pop("max_entries", 16), ttl_seconds=kwargs.pop("ttl_seconds", 60),
+                        store=store, **kwargs)
+
+
+def test_read_through_and_copies(store):
+    cache = make_cache(store)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {"name": "Kai"}
+
+    first = cache.get_or_load(PERSONA, "kai", loader)
+    first["name"] = "mutated"
+    assert cache.get_or_load(PERSONA, "kai", loader) == {"name": "Kai"}
+    assert len(loads) == 1
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_missing_rows_are_cached(store):
+    cache = make_cache(store)
+    loads = []
+    assert cache.get_or_load(PERSONA, "ghost", lambda: loads.append(1)) is None
+    assert cache.get_or_load(PERSONA, "ghost", lambda: loads.append(1)) is None
+    assert len(loads) == 1
+
+
+def test_get_many_loads_only_misses(store):
+    cache = make_cache(store)
+    cache.get_or_load(PERSONA, "a", lambda: {"id": "a"})
+    requested = []
+
+    def loader(keys):
+        requested.extend(keys)
+        return {key: {"id": key} for key in keys if key != "gone"}
+
+    found = cache.get_many(PERSONA, ["a", "b", "gone"], loader)
+    assert sorted(requested) == ["b", "gone"]
+    assert found == {"a": {"id": "a"}, "b": {"id": "b"}}
+    assert cache.get_many(PERSONA, ["gone"], loader) == {}
+    assert sorted(requested) == ["b", "gone"]
+
+
+def test_lru_and_ttl(store):
+    cache = make_cache(store, max_entries=2, ttl_seconds=0)
+    cache.get_or_load(PERSONA, "a", lambda: 1)
+    assert cache.peek(PERSONA, "a") is None   # expired immediately
+
+    cache = make_cache(store, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_load(PERSONA, key, lambda: key)
+    assert cache.peek(PERSONA, "a") is None
+    assert cache.peek(PERSONA, "c") == "c"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_invalidation_reaches_other_workers(store):
+    writer, reader = make_cache(store), make_cache(store)
+    reader.get_or_load(PERSONA, "kai", lambda: {"v": 1})
+    writer.get_or_load(PERSONA, "kai", lambda: {"v": 1})
+
+    writer.invalidate(PERSONA, "kai")
+    assert reader.peek(PERSONA, "kai") is None
+    assert writer.peek(PERSONA, "kai") is None
+    assert reader.get_stats()["remote_invalidations"] == 1
+    assert writer.get_stats()["remote_invalidations"] == 0
+
+
+def test_load_racing_an_invalidation_is_not_stored(store):
+    cache = make_cache(store)
+
+    def loader():
+        cache.invalidate(PERSONA, "kai")   # a write lands while the row is being read
+        return {"v": "old"}
+
+    assert cache.get_or_load(PERSONA, "kai", loader) == {"v": "old"}
+    assert cache.peek(PERSONA, "kai") is None
+    assert cache.get_stats()["stale_loads"] == 1
+
+
+def test_put_respects_version(store):
+    cache = make_cache(store)
+    version = cache.version
+    cache.put(PERSONA, "kai", {"v": 1}, version)
+    assert cache.peek(PERSONA, "kai") == {"v": 1}
+
+    version = cache.version
+    cache.invalidate_all()
+    cache.put(PERSONA, "kai", {"v": "stale"}, version)
+    assert cache.peek(PERSONA, "kai") is None
+
+
+def test_malformed_invalidation_is_ignored(store):
+    cache = make_cache(store)
+    cache.get_or_load(PERSONA, "kai", lambda: 1)
+    store.publish(cache.channel, "not json")
+    store.publish(cache.channel, json.dumps({"origin": "elsewhere", "kind": PERSONA, "key": "other"}))
+    assert cache.peek(PERSONA, "kai") == 1
+
+
+def test_multiple_workers_need_a_shared_store(store):
+    cache = make_cache(store)
+    cache.get_or_load(PERSONA, "kai", lambda: 1)
+    assert cache.check_workers(1)
+    assert not cache.check_workers(2)
+    assert cache.get_stats()["entries"] == 0
+    assert cache.get_or_load(PERSONA, "kai", lambda: 2) == 2
+
+    # Any store other than the in-process stand-in (i.e. Redis) carries invalidations
+    assert make_cache(object()).check_workers(4)
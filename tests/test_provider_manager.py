@@ -0,0 +1,374 @@
+"""Cascade routing in core.provider_manager.ProviderManager"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from core import provider_manager as pm
+from core.adaptive_cascade import FAILED, SUCCESS
+from core.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from core.deadline import DeadlineExceeded, deadline_scope
+from core.provider_manager import ProviderManager
+
+
+class FakeProvider:
+    """Answers after delay seconds with result (or raises error)"""
+
+    def __init__(self, result=None, delay=0.0, error=None, healthy=True):
+        self.result = result if result is not None else {"success": True, "response": "ok"}
+        self.delay = delay
+        self.error = error
+        self.healthy = healthy
+        self.calls = 0
+
+    def ask(self, prompt, client_id, persona_id):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return dict(self.result)
+
+    def probe(self):
+        return self.healthy
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """ProviderManager over the given providers (cascade in dict order), stopped after the test"""
+    managers = []
+
+    def make(providers, **config):
+        config.setdefault("coalescing", {"enabled": False})
+        (tmp_path / "providers.json").write_text(json.dumps({"cascade": list(providers), **config}))
+        manager = ProviderManager(str(tmp_path))
+        manager.providers = dict(providers)
+        manager.cascade = list(providers)
+        manager.breakers = {name: CircuitBreaker(name, manager.breaker_config) for name in providers}
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.stop()
+
+
+def test_prober_half_opens_recovered_providers(make_manager, monkeypatch):
+    monkeypatch.setattr(pm, "BREAKER_PROBE_INTERVAL", 0.01)
+    manager = make_manager({"a": FakeProvider()}, circuit_breaker={"open_seconds": 0, "probe_interval_seconds": 0})
+    manager.stop()
+    manager._start_breaker_prober()
+    manager.trip_breaker("a")
+    time.sleep(0.1)
+    assert manager.breakers["a"].state == HALF_OPEN
+
+
+def test_stop_ends_the_prober(make_manager):
+    manager = make_manager({"a": FakeProvider()})
+    prober = manager._prober
+    assert prober.is_alive()
+    manager.stop()
+    assert not prober.is_alive()
+    manager.stop()   # idempotent
+
+
+def test_sequential_cascade_falls_through(make_manager):
+    failing = FakeProvider({"success": False, "error": "boom"})
+    manager = make_manager({"a": failing, "b": FakeProvider()})
+    result = manager.ask("hi", "c", "p")
+    assert result["success"] and result["provider_used"] == "b"
+    assert result["cascade_trace"] == ["a: failed - boom", "b: success"]
+
+
+def test_open_circuit_is_skipped(make_manager):
+    skipped = FakeProvider()
+    manager = make_manager({"a": skipped, "b": FakeProvider()})
+    manager.trip_breaker("a")
+    assert manager.ask("hi", "c", "p")["provider_used"] == "b"
+    assert skipped.calls == 0
+    manager.reset_breaker("a")
+    assert manager.breakers["a"].state == CLOSED
+    assert manager.ask("hi", "c", "p")["provider_used"] == "a"
+
+
+@pytest.fixture
+def slow_llama():
+    """Stub llama.cpp server answering after 0.8s"""
+    from benchmarks.stub_llama_server import start_stub_server
+    server = start_stub_server(port=0, latency="fixed:800", tokens_per_second=100000, n_tokens=4)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def llama_provider(url):
+    from providers.local_mistral import LocalMistralProvider
+    provider = LocalMistralProvider()
+    provider.api_url = f"{url}/completion"
+    provider.health_url = f"{url}/health"
+    return provider
+
+
+def test_deadline_cut_calls_do_not_open_the_circuit(make_manager, slow_llama):
+    manager = make_manager({"local_mistral": llama_provider(slow_llama)},
+                           circuit_breaker={"min_calls": 2}, adaptive_cascade={"enabled": True})
+    for _ in range(2):
+        with deadline_scope(0.4):
+            result = manager.ask("hi", "c", "p")
+        assert not result["success"]
+        assert result.get("deadline_exceeded")
+        assert "local_mistral: cancelled (deadline)" in result["cascade_trace"][-1]
+
+    breaker = manager.breakers["local_mistral"].snapshot()
+    assert breaker["state"] == CLOSED
+    assert breaker["calls_in_window"] == 0
+    assert manager.adaptive.summary("local_mistral", "chat")["samples"] == 0
+
+    with deadline_scope(5):
+        result = manager.ask("hi", "c", "p")
+    assert result["success"] and result["provider_used"] == "local_mistral"
+
+
+def test_provider_tags_deadline_failures(slow_llama):
+    provider = llama_provider(slow_llama)
+    with deadline_scope(0.4):
+        assert provider.ask("hi", "c", "p").get("deadline_exceeded")
+    with deadline_scope(5):
+        assert provider.ask("hi", "c", "p")["success"]
+
+
+class SlowStreamProvider:
+    """Streams a token every delay seconds"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def stream(self, prompt, client_id, persona_id):
+        for token in ("a", "b", "c", "d"):
+            time.sleep(self.delay)
+            yield token
+
+    async def stream_async(self, prompt, client_id, persona_id):
+        for token in ("a", "b", "c", "d"):
+            await asyncio.sleep(self.delay)
+            yield token
+
+
+def test_deadline_mid_stream_releases_the_breaker(make_manager):
+    manager = make_manager({"a": SlowStreamProvider(0.15)}, circuit_breaker={"min_calls": 1})
+    with deadline_scope(0.4):
+        events = list(manager.stream("hi", "c", "p"))
+    done = events[-1]
+    assert not done["success"]
+    assert done["error"] == "Stream interrupted: request deadline exceeded"
+    assert any(e["event"] == "token" for e in events)
+    assert manager.breakers["a"].snapshot()["calls_in_window"] == 0
+
+
+def test_deadline_mid_async_stream_releases_the_breaker(make_manager):
+    manager = make_manager({"a": SlowStreamProvider(0.15)}, circuit_breaker={"min_calls": 1})
+
+    async def collect():
+        with deadline_scope(0.4):
+            return [event async for event in manager.stream_async("hi", "c", "p")]
+
+    events = asyncio.run(collect())
+    assert events[-1]["error"] == "Stream interrupted: request deadline exceeded"
+    assert manager.breakers["a"].state == CLOSED
+    assert manager.breakers["a"].snapshot()["calls_in_window"] == 0
+
+
+def test_timeout_after_the_deadline_is_not_a_failure_async(make_manager):
+    # Raises the provider's own timeout error once the budget is gone
+    manager = make_manager({"a": FakeProvider(delay=0.5, error=TimeoutError("read timed out"))},
+                           circuit_breaker={"min_calls": 1})
+
+    async def ask():
+        with deadline_scope(0.3):
+            return await manager.ask_async("hi", "c", "p")
+
+    result = asyncio.run(ask())
+    assert not result["success"]
+    assert manager.providers["a"].calls == 1
+    assert manager.breakers["a"].snapshot()["calls_in_window"] == 0
+
+
+def test_real_failures_still_count(make_manager):
+    manager = make_manager({"a": FakeProvider({"success": False, "error": "HTTP 500"})},
+                           circuit_breaker={"min_calls": 2})
+    with deadline_scope(5):
+        manager.ask("hi", "c", "p")
+        manager.ask("hi", "c", "p")
+    assert manager.breakers["a"].state == OPEN
+
+
+HEDGED = {"dispatch": {"mode": "hedged", "hedge_after_ms": 100, "max_parallel": 2}}
+
+
+def ask(manager, deadline=5, use_async=False):
+    """One cascade request under a deadline, via ask() or ask_async()"""
+    if not use_async:
+        with deadline_scope(deadline):
+            return manager.ask("hi", "c", "p")
+
+    async def run():
+        with deadline_scope(deadline):
+            return await manager.ask_async("hi", "c", "p")
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_hedge_fires_after_the_delay(make_manager, use_async):
+    slow, fast = FakeProvider(delay=0.5), FakeProvider()
+    manager = make_manager({"a": slow, "b": fast}, **HEDGED)
+    result = ask(manager, use_async=use_async)
+
+    assert result["success"] and result["provider_used"] == "b"
+    assert result["dispatch"] == "hedged"
+    hedge = next(step for step in result["cascade_trace"] if step.startswith("b: started"))
+    assert int(hedge.split("hedge after ")[1].rstrip("ms)")) >= 100
+    assert "a: cancelled (lost)" in result["cascade_trace"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_no_hedge_when_the_primary_is_fast(make_manager, use_async):
+    backup = FakeProvider()
+    manager = make_manager({"a": FakeProvider(delay=0.02), "b": backup}, **HEDGED)
+    result = ask(manager, use_async=use_async)
+
+    assert result["provider_used"] == "a"
+    assert backup.calls == 0
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_race_first_success_wins(make_manager, use_async):
+    manager = make_manager({"a": FakeProvider({"success": True, "response": "slow"}, delay=0.3),
+                            "b": FakeProvider({"success": False, "error": "boom"}),
+                            "c": FakeProvider({"success": True, "response": "fast"}, delay=0.05)},
+                           dispatch={"mode": "race"})
+    result = ask(manager, use_async=use_async)
+
+    assert result["response"] == "fast" and result["provider_used"] == "c"
+    assert result["dispatch"] == "race"
+    assert "b: failed - boom" in result["cascade_trace"]
+    assert all(p.calls == 1 for p in manager.providers.values())
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_loser_releases_its_breaker(make_manager, use_async):
+    loser = FakeProvider({"success": False, "error": "late"}, delay=0.3)
+    manager = make_manager({"a": loser, "b": FakeProvider()}, **HEDGED)
+    manager.breakers["a"].force(HALF_OPEN)
+    result = ask(manager, use_async=use_async)
+    time.sleep(0.4)   # let the abandoned call finish
+
+    assert result["provider_used"] == "b"
+    breaker = manager.breakers["a"]
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats["last_error"] is None
+    assert breaker.allow_request()   # trial slot was released
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_deadline_stops_hedging(make_manager, use_async):
+    # Budget 0.4s, hedges every 0.1s: c's hedge at 0.2s would leave under MIN_PROVIDER_BUDGET
+    providers = {name: FakeProvider({"success": False, "error": "late"}, delay=0.6) for name in "abc"}
+    manager = make_manager(providers, dispatch={"mode": "hedged", "hedge_after_ms": 100, "max_parallel": 3})
+    result = ask(manager, deadline=0.4, use_async=use_async)
+    time.sleep(0.4)
+
+    assert not result["success"] and result["deadline_exceeded"]
+    assert providers["c"].calls == 0
+    assert "c: skipped (deadline)" in result["cascade_trace"]
+    for name in "ab":
+        assert manager.breakers[name].snapshot()["calls_in_window"] == 0
+
+
+def test_hedges_are_staggered(make_manager):
+    providers = {"a": FakeProvider(delay=0.5), "b": FakeProvider(delay=0.5), "c": FakeProvider()}
+    manager = make_manager(providers, dispatch={"mode": "hedged", "hedge_after_ms": 100, "max_parallel": 3})
+    result = ask(manager)
+
+    assert result["provider_used"] == "c"
+    hedges = [int(step.split("hedge after ")[1].rstrip("ms)"))
+              for step in result["cascade_trace"] if "hedge after" in step]
+    assert hedges[0] >= 100 and hedges[1] >= 200
+
+
+ADAPTIVE = {"enabled": True, "min_samples": 3, "explore_rate": 0.0}
+
+
+def seed(manager, provider_name, outcomes, latency):
+    for outcome in outcomes:
+        manager.adaptive.record(provider_name, "chat", outcome, latency)
+
+
+def test_adaptive_cascade_prefers_the_faster_provider(make_manager):
+    slow, fast = FakeProvider(), FakeProvider()
+    manager = make_manager({"slow": slow, "fast": fast}, adaptive_cascade=ADAPTIVE)
+    seed(manager, "slow", [SUCCESS] * 3, 0.5)
+    seed(manager, "fast", [SUCCESS] * 3, 0.1)
+
+    assert ask(manager)["provider_used"] == "fast"
+    assert slow.calls == 0
+
+
+def test_adaptive_cascade_weighs_latency_by_success_rate(make_manager):
+    manager = make_manager({"flaky": FakeProvider(), "steady": FakeProvider()}, adaptive_cascade=ADAPTIVE)
+    seed(manager, "flaky", [SUCCESS] + [FAILED] * 4, 0.1)   # 0.1s / 0.2 = 0.5s per answer
+    seed(manager, "steady", [SUCCESS] * 5, 0.3)
+
+    assert ask(manager)["provider_used"] == "steady"
+
+
+def test_no_reordering_before_min_samples(make_manager):
+    manager = make_manager({"slow": FakeProvider(), "fast": FakeProvider()}, adaptive_cascade=ADAPTIVE)
+    seed(manager, "slow", [SUCCESS] * 3, 0.5)
+    seed(manager, "fast", [SUCCESS] * 2, 0.1)
+
+    assert ask(manager)["provider_used"] == "slow"
+
+
+def test_provider_that_always_falls_through_is_skipped_then_explored(make_manager):
+    failing = FakeProvider({"success": False, "error": "boom"})
+    manager = make_manager({"a": failing, "b": FakeProvider()}, adaptive_cascade=ADAPTIVE,
+                           circuit_breaker={"min_calls": 100})
+    for _ in range(3):
+        assert ask(manager)["provider_used"] == "b"
+    assert manager.adaptive.summary("a", "chat")["fallthrough_rate"] == 1.0
+
+    result = ask(manager)
+    assert "a: skipped (chat)" in result["cascade_trace"]
+    assert failing.calls == 3
+
+    # The exploration share still tries it, keeping its stats fresh
+    manager.adaptive.config["explore_rate"] = 1.0
+    failing.result = {"success": True, "response": "recovered"}
+    result = ask(manager)
+    assert result["provider_used"] == "a"
+    assert manager.adaptive.summary("a", "chat")["samples"] == 4
+    assert manager.adaptive.stats["explored"] == 1
+
+
+def test_never_skip_and_pinned_last_are_honoured(make_manager):
+    config = {**ADAPTIVE, "never_skip": ["a"], "pinned_last": ["fallback"]}
+    manager = make_manager({"fallback": FakeProvider(), "a": FakeProvider(), "b": FakeProvider()},
+                           adaptive_cascade=config)
+    seed(manager, "a", [FAILED] * 3, 0.1)
+    seed(manager, "b", [SUCCESS] * 3, 0.1)
+    seed(manager, "fallback", [SUCCESS] * 3, 0.01)
+
+    assert manager._adapt_cascade(manager.cascade, "hi", []) == ["b", "a", "fallback"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_deadline_cancellations_stay_out_of_adaptive_stats(make_manager, use_async):
+    manager = make_manager({"a": FakeProvider(error=DeadlineExceeded("provider.a")),
+                            "b": FakeProvider({"success": False, "error": "late"}, delay=0.5)},
+                           adaptive_cascade=ADAPTIVE)
+    ask(manager, use_async=use_async)
+    ask(manager, deadline=0.3, use_async=use_async)
+
+    assert manager.adaptive.summary("a", "chat")["samples"] == 0
+    assert manager.adaptive.summary("b", "chat")["samples"] == 0
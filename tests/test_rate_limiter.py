@@ -0,0 +1,98 @@
+"""Sliding-window rate limiting in core.rate_limiter"""
+
+import pytest
+
+from core import rate_limiter as rl
+from core.rate_limiter import InMemoryRateLimitBackend, RateLimiter, SharedStoreRateLimitBackend
+from core.shared_store import LocalSharedStore
+
+
+WINDOW_START = 60 * 16667.0
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(WINDOW_START + 20)   # 1/3 into a 60s window
+    monkeypatch.setattr(rl.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(params=["memory", "shared"])
+def backend(request):
+    if request.param == "memory":
+        return InMemoryRateLimitBackend(idle_ttl=120)
+    return SharedStoreRateLimitBackend(LocalSharedStore(), prefix="test")
+
+
+def test_allows_up_to_limit_then_rejects(clock, backend):
+    limiter = RateLimiter(3, 60, backend=backend)
+    decisions = [limiter.check("ip") for _ in range(4)]
+    assert [d["allowed"] for d in decisions] == [True, True, True, False]
+    assert [d["remaining"] for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3]["retry_after"] >= 1
+    assert limiter.check("other-ip")["allowed"]
+
+
+def test_rejected_requests_are_not_counted(clock, backend):
+    limiter = RateLimiter(2, 60, backend=backend)
+    for _ in range(5):
+        limiter.check("ip")
+    # Next window, 1/3 in: the previous count is 2 (not 5), weighted 2/3
+    clock.now += 60
+    assert limiter.check("ip")["allowed"]
+    assert not limiter.check("ip")["allowed"]
+
+
+def test_previous_window_slides_out(clock, backend):
+    limiter = RateLimiter(10, 60, backend=backend)
+    for _ in range(10):
+        assert limiter.check("ip")["allowed"]
+    assert not limiter.check("ip")["allowed"]
+    clock.now = WINDOW_START + 60 + 40   # 2/3 into the next window: previous weight 1/3
+    allowed = sum(limiter.check("ip")["allowed"] for _ in range(10))
+    assert allowed == 10 - int(10 / 3)
+
+
+def test_cost_counts_as_many_requests(clock, backend):
+    limiter = RateLimiter(10, 60, backend=backend)
+    assert limiter.check("ip", cost=6)["remaining"] == 4
+    rejected = limiter.check("ip", cost=5)
+    assert not rejected["allowed"]
+    assert limiter.check("ip", cost=4)["allowed"]
+    assert not limiter.check("ip")["allowed"]
+
+
+def test_cost_above_limit_is_refused_up_front(clock, backend):
+    limiter = RateLimiter(5, 60, backend=backend)
+    with pytest.raises(ValueError, match="exceeds the rate limit"):
+        limiter.check("ip", cost=6)
+    assert limiter.check("ip", cost=5)["allowed"]   # the refused request was not counted
+
+
+def test_batch_endpoint_rejects_batches_over_the_item_budget(monkeypatch):
+    import server
+    from core.deadline import clear_deadline
+    monkeypatch.setattr(server, "batch_rate_limiter", RateLimiter(3, 60, backend=InMemoryRateLimitBackend(idle_ttl=120)))
+    items = [{"message": "hi", "client_id": "c", "persona_id": "p"}] * 4
+    try:
+        response = server.app.test_client().post("/api/chat/batch", json={"items": items})
+    finally:
+        clear_deadline()   # the test client runs the request on this thread
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Batch too large (max 3 items)"
+
+
+def test_memory_backend_evicts_idle_keys():
+    backend = InMemoryRateLimitBackend(idle_ttl=10, max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.increment(key, 0, 60)
+    assert backend.size() == 2
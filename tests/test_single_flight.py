@@ -0,0 +1,157 @@
+"""Request coalescing in core.single_flight"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.deadline import DeadlineExceeded, deadline_scope
+from core.single_flight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results, errors = [None] * count, [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"response": "hi"}
+
+    results, _ = run_concurrently(5, lambda: flight.do("k", slow))
+    assert len(calls) == 1
+    assert sum(1 for r in results if r.get("coalesced")) == 4
+    assert all(r["response"] == "hi" for r in results)
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight("test")
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    _, errors = run_concurrently(3, lambda: flight.do("k", failing))
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.stats["leaders"] == 1
+
+
+def test_distinct_keys_do_not_coalesce():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats["leaders"] == 2
+
+
+def test_window_reuses_only_retained_results():
+    flight = SingleFlight("test", window_seconds=60)
+    flight.do("ok", lambda: {"success": True}, retain=lambda r: r["success"])
+    assert flight.do("ok", lambda: pytest.fail("should reuse")) == {"success": True, "coalesced": True}
+
+    flight.do("bad", lambda: {"success": False}, retain=lambda r: r["success"])
+    assert flight.do("bad", lambda: {"success": True}) == {"success": True}
+
+
+def test_no_window_by_default():
+    flight = SingleFlight("test")
+    flight.do("k", lambda: 1)
+    assert flight.do("k", lambda: 2) == 2
+
+
+def test_async_waiters_share_one_task():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "hi"}
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", slow) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sum(1 for r in results if r.get("coalesced")) == 3
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_task():
+    flight = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do_async("k", slow))
+        second = asyncio.ensure_future(flight.do_async("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    outcome = {}
+
+    def slow():
+        started.set()
+        time.sleep(0.4)
+        return "done"
+
+    leader = threading.Thread(target=lambda: outcome.setdefault("leader", flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    begin = time.time()
+    with deadline_scope(0.1):
+        with pytest.raises(DeadlineExceeded):
+            flight.do("k", slow)
+    assert time.time() - begin < 0.3
+    leader.join()
+    assert outcome["leader"] == "done"
+
+
+def test_async_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return "done"
+
+    async def follower():
+        with deadline_scope(0.05):
+            return await flight.do_async("k", slow)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await follower()
+        return await leader
+
+    assert asyncio.run(main()) == "done"
+    assert len(calls) == 1
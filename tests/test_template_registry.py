@@ -0,0 +1,100 @@
+"""Compiled prompt templates render exactly like str.format"""
+
+import os
+
+import pytest
+
+from core.template_registry import DEFAULT_TEMPLATE, TEMPLATE_DIR, PromptTemplate, TemplateRegistry
+
+PERSONA = {"name": "Kai", "role": "a coach {not a field}", "bio": "Likes {braces} and 100% effort"}
+VALUES = {"memory_context": "Key Facts:\n- {literal}", "user_input": "what is {x}?"}
+
+TEMPLATES = [
+    DEFAULT_TEMPLATE,
+    "{user_input}",
+    "No fields at all",
+    "{{escaped}} {persona_name} {{user_input}}\n{memory_context}\nUser: {user_input}",
+    "{persona_name}:{persona_name} {persona_role}\n\nUser: {user_input}\n\n{memory_context}\n{persona_bio}",
+    "Spec {persona_name:>10} | {user_input!r}\n{memory_context}",   # not compilable: str.format path
+    "",
+]
+
+
+def expected(source):
+    return source.format(persona_name=PERSONA["name"], persona_role=PERSONA["role"],
+                         persona_bio=PERSONA["bio"], **VALUES)
+
+
+@pytest.mark.parametrize("source", TEMPLATES)
+def test_render_matches_str_format(source):
+    bound = PromptTemplate("t", source).bind(PERSONA)
+    assert bound.render(**VALUES) == expected(source)
+
+
+def test_shipped_templates_match_str_format():
+    paths = sorted(TEMPLATE_DIR.glob("*.txt")) if TEMPLATE_DIR.is_dir() else []
+    for path in paths:
+        source = path.read_text()
+        assert PromptTemplate(path.stem, source).bind(PERSONA).render(**VALUES) == expected(source), path
+
+
+def test_plain_fields_compile_and_specs_do_not():
+    assert PromptTemplate("t", DEFAULT_TEMPLATE).compiled
+    assert not PromptTemplate("t", "{persona_name:>10}").compiled
+    assert not PromptTemplate("t", "{persona.name}").compiled
+
+
+def test_bind_defaults_and_caches():
+    template = PromptTemplate("t", DEFAULT_TEMPLATE)
+    assert template.bind({}).render("", "hi").startswith("You are Assistant, AI Assistant.")
+    assert template.bind(PERSONA) is template.bind(dict(PERSONA))
+
+
+@pytest.mark.parametrize("source", [DEFAULT_TEMPLATE, TEMPLATES[4], "{persona_name:>10}\n{memory_context}\nUser: {user_input}"])
+def test_render_layered_splits_before_the_turn(source):
+    stable, volatile = PromptTemplate("t", source).bind(PERSONA).render_layered("STABLE", "VOLATILE", "hello")
+    assert "STABLE" in stable and "hello" not in stable
+    assert volatile.startswith("VOLATILE") and "hello" in volatile
+
+
+def write(path, text):
+    path.write_text(text)
+    # Distinct signature even within the filesystem's mtime granularity
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_registry_loads_reloads_and_removes(tmp_path):
+    write(tmp_path / "p1.txt", "One {user_input}")
+    registry = TemplateRegistry(tmp_path, poll_seconds=0)
+    assert registry.template_for("p1").source == "One {user_input}"
+    assert registry.template_for("other") is registry.default
+
+    write(tmp_path / "p1.txt", "Two {user_input}!")
+    assert registry.refresh() == {"loaded": 0, "reloaded": 1, "removed": 0}
+    assert registry.template_for("p1").bind({}).render("", "x") == "Two x!"
+
+    (tmp_path / "p1.txt").unlink()
+    assert registry.refresh()["removed"] == 1
+    assert registry.template_for("p1") is registry.default
+
+
+def test_malformed_file_keeps_previous_version(tmp_path):
+    write(tmp_path / "p1.txt", "Good {user_input}")
+    write(tmp_path / "p2.txt", "Never good {user_input")
+    registry = TemplateRegistry(tmp_path, poll_seconds=0)
+    assert registry.stats["errors"] == 1
+    assert registry.template_for("p2") is registry.default
+
+    write(tmp_path / "p1.txt", "Broken {user_input")
+    registry.refresh()
+    assert registry.stats["errors"] == 2
+    assert registry.template_for("p1").source == "Good {user_input}"
+
+    # Not retried until the file changes again
+    registry.refresh()
+    assert registry.stats["errors"] == 2
+
+    write(tmp_path / "p1.txt", "Fixed {user_input}")
+    assert registry.refresh()["reloaded"] == 1
+    assert registry.template_for("p1").source == "Fixed {user_input}"
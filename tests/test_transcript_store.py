@@ -0,0 +1,137 @@
+"""Bounded session transcripts and their spill table (memory.transcript_store)"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from memory import transcript_store as ts
+from memory.transcript_store import SessionTranscriptStore
+
+
+class FakeDB:
+    """The spill table as a list, with the DatabaseClient calls the store uses"""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    def execute(self, sql, params=None):
+        if self.down:
+            raise ConnectionError("database down")
+        return 0
+
+    def insert_many(self, table, rows):
+        if self.down:
+            raise ConnectionError("database down")
+        assert table == ts.SPILL_TABLE
+        self.rows.extend(rows)
+        return len(rows)
+
+    @contextmanager
+    def get_connection(self):
+        yield FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params):
+        assert sql.startswith(f"DELETE FROM {ts.SPILL_TABLE}")
+        matched = [row for row in self.db.rows if row["session_id"] == params[0]]
+        self.db.rows = [row for row in self.db.rows if row["session_id"] != params[0]]
+        self._result = [(row["spilled_at"], row["turns"]) for row in matched]
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(ts, "db", fake)
+    # Spills are written explicitly by the tests
+    monkeypatch.setattr(SessionTranscriptStore, "_start_writer", lambda self: None)
+    return fake
+
+
+def users(turns):
+    return [turn["user"] for turn in turns]
+
+
+def test_ring_buffer_keeps_latest_turns(fake_db):
+    store = SessionTranscriptStore(turns_per_session=3, max_chars=10_000)
+    for i in range(5):
+        store.append("s1", f"u{i}", "ai", feedback={"n": i} if i % 2 == 0 else None)
+    turns, feedback = store.take("s1")
+    assert users(turns) == ["u2", "u3", "u4"]
+    assert feedback == [{"n": 2}, {"n": 4}]
+    assert store.take("s1") == ([], [])
+    assert store.get_stats()["chars"] == 0
+
+
+def test_capacity_evicts_least_recently_active(fake_db):
+    store = SessionTranscriptStore(turns_per_session=10, max_chars=25)
+    store.append("old", "aaaaa", "aaaaa")
+    store.append("new", "bbbbb", "bbbbb")
+    store.append("new", "ccccc", "ccccc")   # 30 chars: "old" is spilled
+    stats = store.get_stats()
+    assert stats["sessions"] == 1 and stats["pending_spills"] == 1
+
+    store.append("old", "ddddd", "")
+    turns, _ = store.take("old")
+    # Spilled turns come back ahead of the ones recorded since
+    assert users(turns) == ["aaaaa", "ddddd"]
+    assert store.get_stats()["pending_spills"] == 0
+
+
+def test_written_spills_are_consumed_once(fake_db):
+    store = SessionTranscriptStore(turns_per_session=10, max_chars=10)
+    store.append("s1", "first", "reply")
+    store.append("s2", "other", "reply")    # spills s1
+    assert store._write_pending()
+    assert len(fake_db.rows) == 1 and store.get_stats()["pending_spills"] == 0
+
+    turns, _ = store.take("s1")
+    assert users(turns) == ["first"]
+    assert fake_db.rows == []
+    assert store.take("s1") == ([], [])
+
+
+def test_spills_stay_pending_while_database_is_down(fake_db):
+    store = SessionTranscriptStore(turns_per_session=10, max_chars=10)
+    fake_db.down = True
+    store.append("s1", "first", "reply")
+    store.append("s2", "other", "reply")
+    assert not store._write_pending()
+    assert store.stats["spill_failures"] == 1
+    turns, _ = store.take("s1")
+    assert users(turns) == ["first"]
+
+
+def test_unwritten_spills_are_capped(fake_db):
+    store = SessionTranscriptStore(turns_per_session=10, max_chars=10)
+    fake_db.down = True
+    for i in range(4):
+        store.append(f"s{i}", "0123456789", "")
+    assert store.stats["dropped_spills"] >= 1
+    assert store._pending_chars <= store.max_chars
+
+
+def test_spill_all_writes_every_session(fake_db):
+    store = SessionTranscriptStore(turns_per_session=10, max_chars=10_000)
+    store.append("s1", "a", "b")
+    store.append("s2", "c", "d")
+    store.spill_all()
+    assert sorted(row["session_id"] for row in fake_db.rows) == ["s1", "s2"]
+    assert users(store.take("s2")[0]) == ["c"]
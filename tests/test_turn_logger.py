@@ -0,0 +1,131 @@
+"""Write-behind session turn logging, spool replay and quarantine (memory.turn_logger)"""
+
+import json
+import threading
+
+import psycopg2
+import pytest
+
+from memory import turn_logger as tl
+from memory.turn_logger import SessionTurnLogger
+
+
+class FakeDB:
+    """session_logs as a list; rows with user_input "bad" are rejected for their data"""
+
+    def __init__(self, fail_after=None):
+        self.rows = []
+        self.fail_after = fail_after   # inserts accepted before the database goes down
+        self.inserts = 0
+
+    def insert_many(self, table, rows):
+        if table != "session_logs":
+            return 0
+        if self.fail_after is not None and self.inserts >= self.fail_after:
+            raise ConnectionError("database down")
+        if any(row["user_input"] == "bad" for row in rows):
+            raise psycopg2.DataError("invalid byte sequence")
+        self.inserts += 1
+        self.rows.extend(rows)
+        return len(rows)
+
+    def ids(self):
+        return [row["id"] for row in self.rows]
+
+
+def turn(turn_id, user_input="hi"):
+    return {"log": {"id": turn_id, "client_id": "c", "persona_id": "p", "user_input": user_input,
+                    "assistant_reply": "hello", "session_id": "s"}, "correlations": []}
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(tl, "db", db)
+    return db
+
+
+@pytest.fixture
+def turn_logger(tmp_path):
+    logger = SessionTurnLogger(batch_size=2, flush_interval=0.01, spool_path=str(tmp_path / "turns.spool"))
+    yield logger
+    logger.stop()
+
+
+def write_spool(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+
+def test_bad_turn_is_quarantined_and_its_neighbours_written(turn_logger, fake_db):
+    unwritten, error = turn_logger._write_isolating([turn(1), turn(2, "bad"), turn(3)])
+
+    assert (unwritten, error) == ([], None)
+    assert fake_db.ids() == [1, 3]
+    [entry] = read_lines(turn_logger.spool_path + ".bad")
+    assert entry["turn"]["log"]["id"] == 2
+    assert "invalid byte sequence" in entry["error"]
+    assert turn_logger.stats["quarantined"] == 1
+
+
+def test_undecodable_spool_lines_are_quarantined(turn_logger, fake_db):
+    write_spool(turn_logger.spool_path, [turn(1), '{"log": {"id": 2, "cli', "[1, 2]", turn(3)])
+
+    turn_logger._replay_spool()
+
+    assert fake_db.ids() == [1, 3]
+    bad = read_lines(turn_logger.spool_path + ".bad")
+    assert [entry["line"] for entry in bad] == ['{"log": {"id": 2, "cli', "[1, 2]"]
+    assert all(entry["error"] == "undecodable spool line" for entry in bad)
+    assert turn_logger.stats["replayed"] == 2
+
+
+def test_interrupted_replay_is_resumed_first(turn_logger, fake_db, tmp_path):
+    write_spool(turn_logger.spool_path + ".replay", [turn(1), turn(2)])
+    write_spool(turn_logger.spool_path, [turn(3)])
+
+    turn_logger._replay_spool()
+    assert fake_db.ids() == [1, 2]
+    assert not (tmp_path / "turns.spool.replay").exists()
+
+    turn_logger._replay_spool()
+    assert fake_db.ids() == [1, 2, 3]
+    assert not (tmp_path / "turns.spool").exists()
+
+
+def test_outage_during_replay_respools_the_remainder(turn_logger, fake_db, tmp_path):
+    fake_db.fail_after = 1
+    write_spool(turn_logger.spool_path, [turn(i) for i in range(1, 6)])
+
+    turn_logger._replay_spool()
+
+    assert fake_db.ids() == [1, 2]
+    assert [t["log"]["id"] for t in read_lines(turn_logger.spool_path)] == [3, 4, 5]
+    assert not (tmp_path / "turns.spool.replay").exists()
+    assert turn_logger.stats["replayed"] == 2
+    assert turn_logger._next_replay > 0
+
+
+def test_stats_are_exact_under_concurrent_producers(turn_logger, fake_db):
+    turn_logger.batch_size = 50
+
+    def produce(offset):
+        for i in range(200):
+            turn_logger.enqueue(turn(offset + i))
+
+    threads = [threading.Thread(target=produce, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert turn_logger.flush()
+
+    stats = turn_logger.get_stats()
+    assert stats["enqueued"] + stats["spooled"] == 1600
+    assert stats["written"] == stats["enqueued"] == len(fake_db.rows)
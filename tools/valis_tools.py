@@ -16,6 +16,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from memory.query_client import memory
 from memory.db import db
+from core.lazy_init import lazy
 
 logger = logging.getLogger("ValisTools")
 
@@ -615,4 +616,4 @@ class ValisToolSuite:
 
 
 # Global instance for use by MCPExecutionProvider
-valis_tools = ValisToolSuite()
+valis_tools = lazy("valis_tools", ValisToolSuite)
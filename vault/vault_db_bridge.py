@@ -15,6 +15,7 @@ sys.path.append('C:\\VALIS\\valis2')
 sys.path.append('C:\\VALIS\\vault')
 
 from memory.db import db
+from memory.query_client import memory
 from persona_vault import PersonaVault
 
 class VaultDBBridge:
@@ -82,6 +83,7 @@ class VaultDBBridge:
         
         # Insert into main database
         persona_id = db.insert('persona_profiles', persona_data)
+        memory.invalidate_persona(persona_id)
         
         # Create agent record if table exists
         agent_data = self._create_agent_record(persona_id, blueprint)